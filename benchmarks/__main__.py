@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+#
+#  __main__.py
+"""
+Run dependency-dash's benchmarks.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from typing import Any, Optional
+
+__all__ = ["main", "run_benchmark"]
+
+
+def run_benchmark(setup: Any, repeat: int = 5) -> dict[str, Any]:
+	"""
+	Time a benchmark.
+
+	:param setup: The benchmark's setup function, which returns the callable to time.
+	:param repeat: The number of times to repeat the measurement.
+
+	:returns: The number of calls per measurement, the number of measurements,
+		and the best, mean and standard deviation of the time per call (in seconds).
+	"""
+
+	timer = timeit.Timer(setup())
+
+	# Calls per measurement, chosen so each measurement takes at least 0.2 seconds.
+	number, _ = timer.autorange()
+	per_call = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+
+	return {
+			"number": number,
+			"repeat": repeat,
+			"best": min(per_call),
+			"mean": statistics.mean(per_call),
+			"stdev": statistics.stdev(per_call) if repeat > 1 else 0.0,
+			}
+
+
+def _format_time(seconds: float) -> str:
+	for unit, scale in [("s", 1), ("ms", 1e-3), ("us", 1e-6)]:
+		if seconds >= scale:
+			return f"{seconds / scale:.2f} {unit}"
+
+	return f"{seconds / 1e-9:.0f} ns"
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+	"""
+	Entry point for ``python -m benchmarks``.
+
+	:param argv: The command-line arguments. Defaults to :py:data:`sys.argv`.
+	"""
+
+	parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip())
+	parser.add_argument(
+			"-k",
+			"--filter",
+			help="Only run benchmarks whose names match this regular expression.",
+			)
+	parser.add_argument(
+			"-r",
+			"--repeat",
+			type=int,
+			default=5,
+			help="The number of times to repeat each measurement (default: %(default)s).",
+			)
+	parser.add_argument(
+			"-o",
+			"--output",
+			help="Write the results to this file as JSON.",
+			)
+	parser.add_argument(
+			"--compare",
+			help="Compare the results against those in this JSON file, from an earlier run.",
+			)
+	parser.add_argument(
+			"--list",
+			action="store_true",
+			help="List the benchmarks and exit.",
+			)
+
+	args = parser.parse_args(argv)
+
+	# Importing dependency-dash requires a token, though the benchmarks make no requests to GitHub.
+	os.environ.setdefault("GITHUB_TOKEN", "benchmarks")
+
+	with tempfile.TemporaryDirectory() as cache_dir:
+		# Start with an empty cache, and leave the real one untouched.
+		os.environ["DD_CACHE_DIR"] = cache_dir
+
+		# this package
+		from benchmarks.cases import BENCHMARKS
+
+		benchmarks = BENCHMARKS
+		if args.filter:
+			benchmarks = [benchmark for benchmark in benchmarks if re.search(args.filter, benchmark.name)]
+
+		if args.list:
+			for benchmark in benchmarks:
+				print(benchmark.name)
+			return 0
+
+		baseline: dict[str, dict[str, Any]] = {}
+		if args.compare:
+			with open(args.compare, encoding="UTF-8") as fp:
+				baseline = {result["name"]: result for result in json.load(fp)["results"]}
+
+		results = []
+		name_width = max((len(benchmark.name) for benchmark in benchmarks), default=0)
+
+		for benchmark in benchmarks:
+			result = {"name": benchmark.name, **run_benchmark(benchmark.setup, repeat=args.repeat)}
+			results.append(result)
+
+			line = (
+					f"{benchmark.name:<{name_width}}  {_format_time(result['best']):>10}  "
+					f"(mean {_format_time(result['mean'])} ± {_format_time(result['stdev'])})"
+					)
+
+			if benchmark.name in baseline:
+				line += f"  {result['best'] / baseline[benchmark.name]['best']:.2f}x baseline"
+
+			print(line, flush=True)
+
+	if args.output:
+		# this package
+		from dependency_dash import __version__
+
+		output = {
+				"timestamp": time.time(),
+				"version": __version__,
+				"python": platform.python_version(),
+				"implementation": platform.python_implementation(),
+				"platform": platform.platform(),
+				"results": results,
+				}
+
+		with open(args.output, 'w', encoding="UTF-8") as fp:
+			json.dump(output, fp, indent=2)
+			fp.write('\n')
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
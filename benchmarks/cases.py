@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+#
+#  cases.py
+"""
+The benchmarks.
+
+Each benchmark's setup function prepares its inputs and returns the callable to be timed.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import time
+from collections.abc import Iterator
+from typing import Any, Callable, NamedTuple, cast
+
+# 3rd party
+from shippinglabel.requirements import ComparableRequirement
+
+# this package
+from benchmarks.corpus import (
+		LARGE,
+		SMALL,
+		make_metadata,
+		make_project_urls,
+		make_pyproject_toml,
+		make_requirements,
+		make_requirements_txt,
+		make_setup_cfg,
+		make_setup_py,
+		make_versions
+		)
+from dependency_dash import app
+from dependency_dash.badges import _get_etag, make_badge, render_badge, serve_badge
+from dependency_dash.github import (
+		parse_pyproject_toml,
+		parse_requirements_txt,
+		parse_setup_cfg,
+		parse_setup_py
+		)
+from dependency_dash.pypi import (
+		DependencyMetadata,
+		MEMORY_CACHE,
+		VERSION_INDEX_CACHE,
+		_get_status,
+		_sort_versions,
+		format_project_links,
+		get_dependency_status
+		)
+
+__all__ = ["BENCHMARKS", "Benchmark"]
+
+#: The number of releases of each project in the :func:`~.get_dependency_status` benchmarks.
+RELEASES = 300
+
+
+class Benchmark(NamedTuple):
+	"""
+	A benchmark.
+	"""
+
+	#: The benchmark's name, e.g. ``'parse_setup_py[large]'``.
+	name: str
+
+	#: Prepares the benchmark's inputs, and returns the callable to time.
+	setup: Callable[[], Callable[[], Any]]
+
+
+def _parse_benchmarks() -> Iterator[Benchmark]:
+	parsers = [
+			(parse_requirements_txt, make_requirements_txt),
+			(parse_pyproject_toml, make_pyproject_toml),
+			(parse_setup_cfg, make_setup_cfg),
+			(parse_setup_py, make_setup_py),
+			]
+
+	for parse_func, make_content in parsers:
+		for size, count in [("small", SMALL), ("large", LARGE)]:
+
+			def setup(parse_func: Callable = parse_func, content: bytes = make_content(count)) -> Callable[[], Any]:
+				# Bypass the cache of parse results to time the parser itself.
+				return lambda: parse_func.__wrapped__(content)  # type: ignore[attr-defined]
+
+			yield Benchmark(f"{parse_func.__name__}[{size}]", setup)
+
+	def setup_cached() -> Callable[[], Any]:
+		content = make_requirements_txt(LARGE)
+		parse_requirements_txt(content)
+		return lambda: parse_requirements_txt(content)
+
+	yield Benchmark("parse_requirements_txt[large,cached]", setup_cached)
+
+
+def _prepare_metadata(count: int) -> list[ComparableRequirement]:
+	# Populate the in-memory cache, so the metadata is used without any requests to PyPI.
+	requirements = list(map(ComparableRequirement, make_requirements(count)))
+	versions = make_versions(RELEASES)
+	expires = time.time() + 86400
+
+	for req in requirements:
+		MEMORY_CACHE.set(req.name, cast(DependencyMetadata, make_metadata(req.name, versions)), expires=expires)
+
+	return requirements
+
+
+def _status_benchmarks() -> Iterator[Benchmark]:
+	for size, count in [("small", SMALL), ("large", LARGE)]:
+
+		def setup(count: int = count) -> Callable[[], Any]:
+			requirements = _prepare_metadata(count)
+			return lambda: list(get_dependency_status(requirements))
+
+		yield Benchmark(f"get_dependency_status[{size}]", setup)
+
+	def setup_cold() -> Callable[[], Any]:
+		requirements = _prepare_metadata(LARGE)
+
+		def run() -> None:
+			# As if each project's metadata had just been fetched.
+			VERSION_INDEX_CACHE.clear()
+			_get_status.cache_clear()
+			list(get_dependency_status(requirements))
+
+		return run
+
+	yield Benchmark("get_dependency_status[large,cold]", setup_cold)
+
+
+def _version_benchmarks() -> Iterator[Benchmark]:
+	for count in [RELEASES, 3000]:
+
+		def setup(count: int = count) -> Callable[[], Any]:
+			versions = make_versions(count)
+			return lambda: _sort_versions(*versions)
+
+		yield Benchmark(f"_sort_versions[{count}]", setup)
+
+
+def _setup_format_project_links() -> Callable[[], Any]:
+	project_urls = make_project_urls()
+
+	def run() -> None:
+		# The templates' context includes the request's form.
+		with app.test_request_context():
+			format_project_links(project_urls)
+
+	return run
+
+
+def _badge_benchmarks() -> Iterator[Benchmark]:
+
+	def setup_make_badge() -> Callable[[], Any]:
+		dependency_data = list(get_dependency_status(_prepare_metadata(LARGE)))
+		return lambda: make_badge(dependency_data)
+
+	def setup_render_badge() -> Callable[[], Any]:
+		return lambda: render_badge.__wrapped__("dependencies", "12 outdated", "orange")
+
+	def setup_serve_badge() -> Callable[[], Any]:
+		badge_svg = render_badge("dependencies", "up-to-date", "#82B805")
+
+		def run() -> None:
+			with app.test_request_context():
+				serve_badge(badge_svg)
+
+		return run
+
+	def setup_serve_badge_not_modified() -> Callable[[], Any]:
+		badge_svg = render_badge("dependencies", "up-to-date", "#82B805")
+		headers = {"If-None-Match": _get_etag(badge_svg)}
+
+		def run() -> None:
+			with app.test_request_context(headers=headers):
+				serve_badge(badge_svg)
+
+		return run
+
+	yield Benchmark("make_badge[large]", setup_make_badge)
+	yield Benchmark("render_badge[uncached]", setup_render_badge)
+	yield Benchmark("serve_badge", setup_serve_badge)
+	yield Benchmark("serve_badge[not-modified]", setup_serve_badge_not_modified)
+
+
+#: All the benchmarks, in the order they are run.
+BENCHMARKS: list[Benchmark] = [
+		*_parse_benchmarks(),
+		*_status_benchmarks(),
+		*_version_benchmarks(),
+		Benchmark("format_project_links", _setup_format_project_links),
+		*_badge_benchmarks(),
+		]
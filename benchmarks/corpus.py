@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+#
+#  corpus.py
+"""
+Fixed inputs for the benchmarks.
+
+The corpora are generated deterministically, so results from different runs are comparable.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import time
+from typing import Any
+
+# 3rd party
+from packaging.version import Version
+
+__all__ = [
+		"LARGE",
+		"SMALL",
+		"make_metadata",
+		"make_project_urls",
+		"make_pyproject_toml",
+		"make_requirements",
+		"make_requirements_txt",
+		"make_setup_cfg",
+		"make_setup_py",
+		"make_versions",
+		]
+
+#: The number of requirements in the small manifests.
+SMALL = 8
+
+#: The number of requirements in the large manifests.
+LARGE = 400
+
+# Requirements in the small manifests, covering the common forms of specifiers, extras and markers.
+_COMMON_REQUIREMENTS = [
+		"apeye>=1.0.0",
+		"domdf-python-tools>=2.9.1",
+		"flask[async]>=2.2.0",
+		"packaging>=21.0",
+		'importlib-metadata>=3.6.0; python_version < "3.9"',
+		"requests>=2.26.0,<3",
+		"typing-extensions!=4.7.0,>=3.7.4.3",
+		"click~=8.0",
+		]
+
+
+def make_requirements(count: int) -> list[str]:
+	"""
+	Returns ``count`` requirement strings.
+
+	:param count:
+	"""
+
+	requirements = _COMMON_REQUIREMENTS[:count]
+
+	for idx in range(len(requirements), count):
+		name = f"project-{idx:04d}"
+
+		if idx % 7 == 0:
+			requirements.append(f'{name}>={idx % 5}.{idx % 11}; python_version < "3.{idx % 4 + 9}"')
+		elif idx % 5 == 0:
+			requirements.append(f"{name}[extra-{idx % 3}]>={idx % 5}.0,<{idx % 5 + 2}")
+		elif idx % 3 == 0:
+			requirements.append(f"{name}=={idx % 5}.{idx % 9}.{idx % 4}")
+		else:
+			requirements.append(f"{name}>={idx % 5}.{idx % 9}")
+
+	return requirements
+
+
+def make_requirements_txt(count: int) -> bytes:
+	"""
+	Returns a ``requirements.txt`` file with ``count`` requirements, comments and an invalid line.
+
+	:param count:
+	"""
+
+	lines = ["# Generated for benchmarking", '']
+	for idx, requirement in enumerate(make_requirements(count)):
+		lines.append(requirement)
+		if idx % 25 == 24:
+			lines.extend(['', f"# Group {idx // 25}"])
+
+	lines.append("not a valid requirement!")
+	return '\n'.join(lines).encode("UTF-8")
+
+
+def make_pyproject_toml(count: int) -> bytes:
+	"""
+	Returns a ``pyproject.toml`` file with ``count`` requirements in ``project.dependencies``.
+
+	:param count:
+	"""
+
+	lines = [
+			"[build-system]",
+			'requires = [ "whey",]',
+			'build-backend = "whey"',
+			'',
+			"[project]",
+			'name = "benchmark-project"',
+			'version = "1.0.0"',
+			'description = "A project for benchmarking."',
+			"dependencies = [",
+			]
+	lines.extend(f"    {requirement!r}," for requirement in make_requirements(count))
+	lines.extend([
+			']',
+			'',
+			"[tool.mypy]",
+			"strict = true",
+			])
+	return '\n'.join(lines).encode("UTF-8")
+
+
+def make_setup_cfg(count: int) -> bytes:
+	"""
+	Returns a ``setup.cfg`` file with ``count`` requirements in ``options.install_requires``.
+
+	:param count:
+	"""
+
+	lines = [
+			"[metadata]",
+			"name = benchmark-project",
+			"version = 1.0.0",
+			'',
+			"[options]",
+			"python_requires = >=3.9",
+			"install_requires =",
+			]
+	lines.extend(f"    {requirement}" for requirement in make_requirements(count))
+	lines.extend([
+			'',
+			"[flake8]",
+			"max-line-length = 120",
+			])
+	return '\n'.join(lines).encode("UTF-8")
+
+
+def make_setup_py(count: int) -> bytes:
+	"""
+	Returns a ``setup.py`` file with ``count`` requirements passed to ``setup`` through a variable.
+
+	:param count:
+	"""
+
+	lines = [
+			"#!/usr/bin/env python",
+			"import setuptools",
+			'',
+			"install_requires = [",
+			]
+	lines.extend(f"    {requirement!r}," for requirement in make_requirements(count))
+	lines.extend([
+			']',
+			'',
+			"setuptools.setup(",
+			'    name="benchmark-project",',
+			'    version="1.0.0",',
+			"    install_requires=install_requires,",
+			'    extras_require={"docs": ["sphinx>=3.0"]},',
+			')',
+			])
+	return '\n'.join(lines).encode("UTF-8")
+
+
+def make_versions(count: int) -> list[str]:
+	"""
+	Returns ``count`` version strings, including pre-releases, post-releases and an invalid version.
+
+	:param count:
+	"""
+
+	versions = []
+
+	for idx in range(count):
+		major, minor, micro = idx // 100, idx // 10 % 10, idx % 10
+
+		if micro == 9:
+			versions.append(f"{major}.{minor}.0rc{idx % 3}")
+		elif micro == 8:
+			versions.append(f"{major}.{minor}.{micro}.post1")
+		else:
+			versions.append(f"{major}.{minor}.{micro}")
+
+	versions.append("not-a-version")
+	return versions
+
+
+def make_project_urls() -> dict[str, str]:
+	"""
+	Returns a typical set of project URLs, covering each kind of link.
+	"""
+
+	return {
+			"Homepage": "https://example.com/project",
+			"Documentation": "https://project.readthedocs.io/en/latest",
+			"Issue Tracker": "https://github.com/example/project/issues",
+			"Source Code": "https://github.com/example/project",
+			"Changelog": "https://example.com/project/changes",
+			"Mirror": "https://gitlab.com/example/project",
+			"Funding": "https://example.com/donate",
+			}
+
+
+def make_metadata(name: str, versions: list[str]) -> dict[str, Any]:
+	"""
+	Returns metadata for the project ``name``, in the form returned by :func:`dependency_dash.pypi.get_data`.
+
+	:param name:
+	:param versions: The project's versions, as returned by :func:`~.make_versions`.
+	"""
+
+	valid_versions = sorted((version for version in versions if version != "not-a-version"), key=Version)
+	final_versions = [version for version in valid_versions if not Version(version).is_prerelease]
+
+	return {
+			"name": name,
+			"version": final_versions[-1],
+			"home_page": f"https://example.com/{name}",
+			"license": "MIT",
+			"package_url": f"https://pypi.org/project/{name}/",
+			"dependency_dash_url": None,
+			"project_urls": make_project_urls(),
+			"all_versions": valid_versions,
+			"etag": f'"{name}-{len(valid_versions)}"',
+			"last_modified": time.time(),
+			"last_serial": 1,
+			"changelog_serial": None,
+			}
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+#
+#  load/__main__.py
+"""
+Load test dependency-dash against local stand-ins for GitHub and PyPI.
+
+The app is started in a subprocess, with an empty cache, and sent the same sequence of requests twice:
+first with cold caches, then with warm caches.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import argparse
+import json
+import os
+import platform
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+# 3rd party
+import requests
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from benchmarks.load.traffic import DEFAULT_MIX, Targets, plan_requests, send_requests, summarise
+from benchmarks.load.upstream import Faults, Recording, StandIn, start_stand_ins
+from benchmarks.load.world import World
+
+__all__ = ["DEFAULT_APP_COMMAND", "app_environment", "main", "resolve_branches", "start_app"]
+
+#: The command used to run the app. ``{python}`` and ``{port}`` are replaced with the Python executable and the port.
+DEFAULT_APP_COMMAND = "{python} -m flask --app dependency_dash run --port {port} --with-threads --no-reload --no-debugger"
+
+
+def app_environment(
+		stand_ins: dict[str, StandIn],
+		cache_dir: str,
+		pypi_refresh: str = "conditional",
+		graphql: bool = False,
+		) -> dict[str, str]:
+	"""
+	Returns the environment variables which configure the app to use the stand-ins.
+
+	:param stand_ins:
+	:param cache_dir: The directory for the app's cache.
+	:param pypi_refresh: How stale PyPI metadata is refreshed (see ``DD_PYPI_REFRESH``).
+	:param graphql: Whether the app fetches repositories' files from the GraphQL API (see ``DD_GITHUB_GRAPHQL``).
+	"""
+
+	env = dict(os.environ)
+	env.setdefault("GITHUB_TOKEN", "load-test")
+	env.update({
+			"DD_CACHE_DIR": cache_dir,
+			"DD_GITHUB_API_URL": stand_ins["github-api"].url,
+			"DD_GITHUB_RAW_URL": stand_ins["github-raw"].url,
+			"DD_GITHUB_GRAPHQL_URL": f"{stand_ins['github-api'].url}/graphql",
+			"DD_PYPI_ENDPOINT": f"{stand_ins['pypi'].url}/pypi",
+			"DD_PYPI_XMLRPC_URL": f"{stand_ins['pypi'].url}/pypi",
+			"DD_PYPI_REFRESH": pypi_refresh,
+			})
+
+	if graphql:
+		env["DD_GITHUB_GRAPHQL"] = '1'
+	else:
+		env.pop("DD_GITHUB_GRAPHQL", None)
+
+	return env
+
+
+def _free_port() -> int:
+	with socket.socket() as sock:
+		sock.bind(("127.0.0.1", 0))
+		return sock.getsockname()[1]
+
+
+def start_app(command: str, env: dict[str, str], log_file: PathPlus, timeout: float = 60) -> tuple[subprocess.Popen, str]:
+	"""
+	Start the app, and wait until it is ready to serve requests.
+
+	:param command: The command to run the app, as :py:data:`~.DEFAULT_APP_COMMAND`.
+	:param env: The app's environment variables.
+	:param log_file: The file to write the app's output to.
+	:param timeout: The maximum time, in seconds, to wait for the app to start.
+
+	:returns: The app's process and URL.
+	"""
+
+	port = _free_port()
+	args = shlex.split(command.format(python=shlex.quote(sys.executable), port=port))
+
+	with log_file.open('w') as log:
+		process = subprocess.Popen(args, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+	url = f"http://127.0.0.1:{port}"
+	deadline = time.monotonic() + timeout
+
+	while time.monotonic() < deadline:
+		if process.poll() is not None:
+			raise RuntimeError(f"The app exited with code {process.returncode}:\n{log_file.read_text()}")
+
+		try:
+			if requests.get(f"{url}/about/", timeout=5).status_code == 200:
+				return process, url
+		except requests.ConnectionError:
+			time.sleep(0.2)
+
+	process.terminate()
+	raise RuntimeError(f"The app didn't start within {timeout} seconds:\n{log_file.read_text()}")
+
+
+def resolve_branches(github_api_url: str, repositories: list[str], token: Optional[str] = None) -> dict[str, str]:
+	"""
+	Returns the default branches of the given repositories, as reported by the GitHub API (or its stand-in).
+
+	Repositories which don't exist are omitted.
+
+	:param github_api_url:
+	:param repositories: The repositories' full names.
+	:param token: The GitHub token to authenticate with.
+	"""
+
+	headers = {"Authorization": f"token {token}"} if token else {}
+
+	def get_branch(full_name: str) -> Optional[str]:
+		response = requests.get(f"{github_api_url}/repos/{full_name}", headers=headers, timeout=30)
+		return response.json()["default_branch"] if response.status_code == 200 else None
+
+	with ThreadPoolExecutor(max_workers=16) as executor:
+		branches = dict(zip(repositories, executor.map(get_branch, repositories)))
+
+	return {full_name: branch for full_name, branch in branches.items() if branch is not None}
+
+
+def _parse_mix(value: str) -> dict[str, float]:
+	mix = {}
+
+	for entry in value.split(','):
+		kind, _, weight = entry.partition('=')
+		if kind.strip() not in DEFAULT_MIX:
+			raise argparse.ArgumentTypeError(f"Unknown kind of request {kind.strip()!r}")
+		mix[kind.strip()] = float(weight or 1)
+
+	return mix
+
+
+def _format_ms(seconds: float) -> str:
+	return f"{seconds * 1000:.1f}"
+
+
+def _print_phase(phase: str, data: dict[str, Any]) -> None:
+	overall = data["summary"]["all"]
+	print(
+			f"\n{phase}: {overall['requests']} requests in {data['duration']:.1f} s "
+			f"({overall['throughput']:.1f} req/s), {overall['errors']} errors"
+			)
+	print(f"  {'kind':<20} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+
+	for kind, row in data["summary"].items():
+		print(
+				f"  {kind:<20} {row['requests']:>8} {row['errors']:>6} {row['throughput']:>8.1f} "
+				f"{_format_ms(row['p50']):>8} {_format_ms(row['p90']):>8} "
+				f"{_format_ms(row['p99']):>8} {_format_ms(row['max']):>8}"
+				)
+
+	upstream = ", ".join(
+			f"{name} {counts['requests']} ({counts['errors']} errors)" for name, counts in data["upstream"].items()
+			)
+	print(f"  upstream requests: {upstream}")
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+	"""
+	Entry point for ``python -m benchmarks.load``.
+
+	:param argv: The command-line arguments. Defaults to :py:data:`sys.argv`.
+	"""
+
+	parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description=__doc__.strip())
+	parser.add_argument(
+			"--mode",
+			choices=["synthetic", "record", "replay"],
+			default="synthetic",
+			help="Serve generated repositories and projects, record responses from the real services, "
+			"or replay recorded responses (default: %(default)s).",
+			)
+	parser.add_argument(
+			"--recording",
+			type=PathPlus,
+			help="The directory responses are recorded to and replayed from. Required for record and replay modes.",
+			)
+	parser.add_argument(
+			"--targets",
+			type=PathPlus,
+			help="A file listing the repositories (<user>/<repo>) and PyPI projects to request, most popular first. "
+			"Required in record mode. In replay mode defaults to those recorded.",
+			)
+	parser.add_argument(
+			"--users",
+			type=int,
+			default=20,
+			help="The number of GitHub users in synthetic mode (default: %(default)s).",
+			)
+	parser.add_argument(
+			"--repositories",
+			type=int,
+			default=10,
+			help="The number of repositories per user in synthetic mode (default: %(default)s).",
+			)
+	parser.add_argument(
+			"-n",
+			"--requests",
+			type=int,
+			default=1000,
+			help="The number of requests in each phase (default: %(default)s).",
+			)
+	parser.add_argument(
+			"-c",
+			"--concurrency",
+			type=int,
+			default=16,
+			help="The number of requests in flight at once (default: %(default)s).",
+			)
+	parser.add_argument(
+			"--mix",
+			type=_parse_mix,
+			default=DEFAULT_MIX,
+			help="The kinds of request to send and their relative frequencies, e.g. 'github-badge=3,api-pypi=1'. "
+			f"Kinds are {', '.join(DEFAULT_MIX)}.",
+			)
+	parser.add_argument(
+			"--skew",
+			type=float,
+			default=1.1,
+			help="How much more often popular targets are requested; 0 requests every target equally often "
+			"(default: %(default)s).",
+			)
+	parser.add_argument(
+			"--latency",
+			type=float,
+			default=0.0,
+			help="Milliseconds added to every upstream response (default: %(default)s).",
+			)
+	parser.add_argument(
+			"--jitter",
+			type=float,
+			default=0.0,
+			help="Up to this many milliseconds, chosen at random, added to every upstream response (default: %(default)s).",
+			)
+	parser.add_argument(
+			"--error-rate",
+			type=float,
+			default=0.0,
+			help="The fraction of upstream requests answered with an error (default: %(default)s).",
+			)
+	parser.add_argument(
+			"--error-status",
+			type=int,
+			default=502,
+			help="The HTTP status code of the injected errors (default: %(default)s).",
+			)
+	parser.add_argument(
+			"--pypi-refresh",
+			choices=["conditional", "serial"],
+			default="conditional",
+			help="How the app refreshes stale PyPI metadata (default: %(default)s).",
+			)
+	parser.add_argument(
+			"--graphql",
+			action="store_true",
+			help="Have the app fetch repositories' files with the GraphQL API.",
+			)
+	parser.add_argument("--seed", type=int, default=0, help="Seed for the random number generators.")
+	parser.add_argument(
+			"--app-command",
+			default=DEFAULT_APP_COMMAND,
+			help="The command to run the app, e.g. "
+			"'gunicorn dependency_dash:app -w 4 -k gthread --threads 8 -b 127.0.0.1:{port}' (default: %(default)s).",
+			)
+	parser.add_argument("-o", "--output", help="Write the results to this file as JSON.")
+
+	args = parser.parse_args(argv)
+
+	world: Optional[World] = None
+	recording: Optional[Recording] = None
+
+	if args.mode == "synthetic":
+		world = World(users=args.users, repositories=args.repositories, seed=args.seed)
+		targets = Targets.from_file(args.targets) if args.targets else world.targets()
+	else:
+		if args.recording is None:
+			parser.error(f"--recording is required in {args.mode} mode")
+
+		recording = Recording(args.recording)
+		targets_file = recording.directory / "targets.txt"
+
+		if args.mode == "record":
+			if args.targets is None:
+				parser.error("--targets is required in record mode")
+			if "GITHUB_TOKEN" not in os.environ:
+				parser.error("The GITHUB_TOKEN environment variable is required in record mode")
+
+			targets = Targets.from_file(args.targets)
+			targets_file.parent.maybe_make(parents=True)
+			targets.write(targets_file)
+		else:
+			targets = Targets.from_file(args.targets or targets_file)
+
+	faults = Faults(args.latency / 1000, args.jitter / 1000, args.error_rate, args.error_status)
+	stand_ins = start_stand_ins(args.mode, world=world, recording=recording, faults=faults, seed=args.seed)
+
+	try:
+		if world is not None:
+			branches = {repo.full_name: repo.default_branch for repo in world.repositories.values()}
+		else:
+			branches = resolve_branches(
+					stand_ins["github-api"].url,
+					targets.repositories,
+					token=os.getenv("GITHUB_TOKEN"),
+					)
+
+		plan = plan_requests(targets, branches, args.requests, mix=args.mix, skew=args.skew, seed=args.seed)
+
+		with tempfile.TemporaryDirectory() as tmpdir:
+			log_file = PathPlus(tmpdir) / "app.log"
+			env = app_environment(
+					stand_ins,
+					cache_dir=os.path.join(tmpdir, "cache"),
+					pypi_refresh=args.pypi_refresh,
+					graphql=args.graphql,
+					)
+			process, url = start_app(args.app_command, env, log_file)
+
+			try:
+				for stand_in in stand_ins.values():
+					stand_in.reset_counts()
+
+				phases = {}
+				for phase in ["cold", "warm"]:
+					results, duration = send_requests(url, plan, concurrency=args.concurrency)
+
+					upstream = {}
+					for name, stand_in in stand_ins.items():
+						requests_count, errors = stand_in.reset_counts()
+						upstream[name] = {"requests": requests_count, "errors": errors}
+
+					phases[phase] = {"duration": duration, "summary": summarise(results, duration), "upstream": upstream}
+					_print_phase(phase, phases[phase])
+
+			finally:
+				process.terminate()
+				process.wait()
+
+	finally:
+		for stand_in in stand_ins.values():
+			stand_in.stop()
+
+	if args.output:
+		output = {
+				"timestamp": time.time(),
+				"python": platform.python_version(),
+				"platform": platform.platform(),
+				"mode": args.mode,
+				"requests": args.requests,
+				"concurrency": args.concurrency,
+				"mix": args.mix,
+				"faults": faults._asdict(),
+				"phases": phases,
+				}
+
+		with open(args.output, 'w', encoding="UTF-8") as fp:
+			json.dump(output, fp, indent=2)
+			fp.write('\n')
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+#
+#  load/traffic.py
+"""
+Generating and sending a mix of requests to the app, and summarising the response times.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import random
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple, Optional
+
+# 3rd party
+import requests
+from domdf_python_tools.paths import PathPlus
+
+__all__ = ["DEFAULT_MIX", "Result", "Targets", "plan_requests", "send_requests", "summarise"]
+
+#: The kinds of request sent, and their relative frequencies.
+DEFAULT_MIX: dict[str, float] = {
+		"github-badge": 40,
+		"htmx-github-badge": 10,
+		"htmx-github-file": 10,
+		"htmx-github-user": 5,
+		"htmx-pypi": 15,
+		"api-github": 10,
+		"api-pypi": 10,
+		}
+
+# The files requested for each repository by the ``htmx-github-file`` requests,
+# as listed on a repository's page if it has no configuration.
+_CANDIDATE_FILES = ("requirements.txt", "pyproject.toml", "setup.cfg", "setup.py")
+
+
+class Targets(NamedTuple):
+	"""
+	The GitHub repositories and PyPI projects requests are made for.
+
+	Earlier entries are requested more often than later ones.
+	"""
+
+	#: The repositories' full names, in the form ``<user>/<repo>``.
+	repositories: list[str]
+
+	#: The PyPI projects' names.
+	packages: list[str]
+
+	@property
+	def users(self) -> list[str]:
+		"""
+		The owners of the repositories, in order of their first repository.
+		"""
+
+		return list(dict.fromkeys(full_name.split('/')[0] for full_name in self.repositories))
+
+	@classmethod
+	def from_file(cls, filename: PathPlus) -> "Targets":
+		"""
+		Read targets from a file.
+
+		Each line of the file contains either a repository's full name (``<user>/<repo>``) or a PyPI project's name.
+		Blank lines and lines starting with ``#`` are ignored.
+
+		:param filename:
+		"""
+
+		repositories, packages = [], []
+
+		for line in filename.read_lines():
+			line = line.strip()
+			if not line or line.startswith('#'):
+				continue
+			elif '/' in line:
+				repositories.append(line)
+			else:
+				packages.append(line)
+
+		return cls(repositories, packages)
+
+	def write(self, filename: PathPlus) -> None:
+		"""
+		Write the targets to a file, in the format read by :meth:`~.Targets.from_file`.
+
+		:param filename:
+		"""
+
+		filename.write_lines([*self.repositories, *self.packages])
+
+
+class Result(NamedTuple):
+	"""
+	The outcome of a request to the app.
+	"""
+
+	#: The kind of request, e.g. ``'github-badge'``.
+	kind: str
+
+	#: The HTTP status code, or ``0`` if no response was received.
+	status: int
+
+	#: The time taken to receive the whole response, in seconds.
+	elapsed: float
+
+
+def plan_requests(
+		targets: Targets,
+		branches: dict[str, str],
+		count: int,
+		mix: Optional[dict[str, float]] = None,
+		skew: float = 1.1,
+		seed: int = 0,
+		) -> list[tuple[str, str]]:
+	"""
+	Returns a sequence of requests to send.
+
+	:param targets:
+	:param branches: Mapping of repository full names to their default branches.
+	:param count: The number of requests.
+	:param mix: The kinds of request to send, and their relative frequencies. Defaults to :py:data:`~.DEFAULT_MIX`.
+	:param skew: The exponent of the Zipf distribution of the targets' popularity.
+		``0`` requests every target equally often.
+	:param seed: Seed for the random number generator, so the same arguments always give the same requests.
+
+	:returns: A list of ``(kind, path)`` tuples.
+	"""
+
+	rng = random.Random(seed)
+	mix = mix or DEFAULT_MIX
+	kinds = rng.choices(list(mix), list(mix.values()), k=count)
+
+	# Popularity follows a Zipf distribution, so a few targets receive most of the requests.
+	weights = [1 / (rank + 1)**skew for rank in range(max(len(targets.repositories), len(targets.packages)))]
+
+	def choose(population: Sequence[str]) -> str:
+		return rng.choices(population, weights[:len(population)])[0]
+
+	plan = []
+
+	for kind in kinds:
+		if kind in {"api-pypi", "htmx-pypi"}:
+			package = choose(targets.packages)
+			path = f"/api/pypi/{package}/" if kind == "api-pypi" else f"/htmx/pypi/{package}/"
+
+		elif kind == "htmx-github-user":
+			path = f"/htmx/github/{choose(targets.users)}/"
+
+		else:
+			repository = choose(targets.repositories)
+			branch = branches.get(repository, "master")
+
+			if kind == "github-badge":
+				path = f"/github/{repository}/badge.svg"
+			elif kind == "api-github":
+				path = f"/api/github/{repository}/"
+			elif kind == "htmx-github-badge":
+				path = f"/htmx/github/{repository}/{branch}/badge/"
+			elif kind == "htmx-github-file":
+				path = f"/htmx/github/{repository}/{branch}/files/{rng.choice(_CANDIDATE_FILES)}"
+			else:
+				raise ValueError(f"Unknown kind of request {kind!r}")
+
+		plan.append((kind, path))
+
+	return plan
+
+
+def send_requests(
+		base_url: str,
+		plan: Iterable[tuple[str, str]],
+		concurrency: int = 16,
+		timeout: float = 60,
+		) -> tuple[list[Result], float]:
+	"""
+	Send the given requests to the app, with up to ``concurrency`` requests in flight at once.
+
+	:param base_url: The app's URL, e.g. ``'http://127.0.0.1:5000'``.
+	:param plan: The requests to send, as returned by :func:`~.plan_requests`.
+	:param concurrency:
+	:param timeout: The timeout for each request, in seconds.
+
+	:returns: The result of each request, and the total time taken in seconds.
+	"""
+
+	local = threading.local()
+
+	def send(kind: str, path: str) -> Result:
+		if not hasattr(local, "session"):
+			local.session = requests.Session()
+
+		start = time.perf_counter()
+		try:
+			response = local.session.get(base_url + path, timeout=timeout)
+		except requests.RequestException:
+			return Result(kind, 0, time.perf_counter() - start)
+
+		return Result(kind, response.status_code, time.perf_counter() - start)
+
+	start = time.perf_counter()
+
+	with ThreadPoolExecutor(max_workers=concurrency) as executor:
+		futures = [executor.submit(send, kind, path) for kind, path in plan]
+		results = [future.result() for future in futures]
+
+	return results, time.perf_counter() - start
+
+
+def _percentile(ordered: Sequence[float], percent: float) -> float:
+	# Nearest-rank percentile of the sorted values.
+	if not ordered:
+		return 0.0
+
+	rank = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+	return ordered[rank]
+
+
+def _summarise(results: Sequence[Result], duration: float) -> dict[str, Any]:
+	elapsed = sorted(result.elapsed for result in results)
+
+	return {
+			"requests": len(results),
+			# Responses with 4xx statuses are expected, e.g. for missing repositories.
+			"errors": sum(1 for result in results if result.status == 0 or result.status >= 500),
+			"throughput": len(results) / duration if duration else 0.0,
+			"p50": _percentile(elapsed, 50),
+			"p90": _percentile(elapsed, 90),
+			"p99": _percentile(elapsed, 99),
+			"max": elapsed[-1] if elapsed else 0.0,
+			}
+
+
+def summarise(results: Sequence[Result], duration: float) -> dict[str, Any]:
+	"""
+	Summarise the results of a run.
+
+	:param results:
+	:param duration: The total time taken by the run, in seconds.
+
+	:returns: The number of requests and errors (no response, or a 5xx status),
+		the throughput (in requests per second) and the 50th, 90th and 99th percentile and maximum latencies
+		(in seconds), both overall (``'all'``) and for each kind of request.
+		The throughput of each kind is its share of the overall throughput.
+	"""
+
+	summary = {"all": _summarise(results, duration)}
+
+	for kind in sorted({result.kind for result in results}):
+		summary[kind] = _summarise([result for result in results if result.kind == kind], duration)
+
+	return summary
@@ -0,0 +1,857 @@
+#!/usr/bin/env python3
+#
+#  load/upstream.py
+"""
+HTTP servers standing in for the GitHub REST and GraphQL APIs, ``raw.githubusercontent.com``,
+the PyPI JSON API and ``files.pythonhosted.org``.
+
+Each stand-in either serves a synthetic :class:`~.World`, forwards requests to the real service
+and records its responses, or replays responses recorded earlier.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import base64
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import xmlrpc.client
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# 3rd party
+import requests
+from domdf_python_tools.paths import PathPlus
+from packaging.utils import canonicalize_name
+
+# this package
+from benchmarks.corpus import make_project_urls
+from benchmarks.load.world import World
+
+__all__ = [
+		"ORIGINS",
+		"Faults",
+		"Recorder",
+		"Recording",
+		"Replayer",
+		"Reply",
+		"StandIn",
+		"SyntheticFiles",
+		"SyntheticGitHubAPI",
+		"SyntheticGitHubRaw",
+		"SyntheticPyPI",
+		"start_stand_ins",
+		]
+
+#: The services the stand-ins replace, and their base URLs.
+ORIGINS = {
+		"github-api": "https://api.github.com",
+		"github-raw": "https://raw.githubusercontent.com",
+		"pypi": "https://pypi.org",
+		"files": "https://files.pythonhosted.org",
+		}
+
+# Request headers passed on to the real services when recording.
+_FORWARDED_HEADERS = {"accept", "authorization", "content-type", "range", "user-agent"}
+
+# Response headers kept in recordings.
+_RECORDED_HEADERS = {
+		"accept-ranges",
+		"cache-control",
+		"content-length",
+		"content-range",
+		"content-type",
+		"date",
+		"etag",
+		"expires",
+		"last-modified",
+		"link",
+		"location",
+		"x-pypi-last-serial",
+		}
+
+
+class Reply(NamedTuple):
+	"""
+	A response from a stand-in.
+	"""
+
+	#: The HTTP status code.
+	status: int
+
+	#: The response headers, with lowercase names.
+	headers: dict[str, str]
+
+	#: The response body.
+	body: bytes = b''
+
+
+#: A function which takes the request's method, path (including the query string), headers and body,
+#: and returns the reply.
+Handler = Callable[[str, str, dict[str, str], bytes], Reply]
+
+
+class Faults(NamedTuple):
+	"""
+	Delays and errors injected into a stand-in's responses.
+	"""
+
+	#: The time, in seconds, added to every response.
+	latency: float = 0.0
+
+	#: Up to this many seconds (chosen at random) are added to every response, in addition to :attr:`~.latency`.
+	jitter: float = 0.0
+
+	#: The fraction of requests answered with :attr:`~.error_status` instead of the real response.
+	error_rate: float = 0.0
+
+	#: The HTTP status code of the injected errors.
+	error_status: int = 502
+
+
+class StandIn:
+	"""
+	An HTTP server on localhost, run in a background thread.
+
+	:param name: The name of the service the server stands in for, e.g. ``'pypi'``.
+	:param handler: The function which produces the response to each request.
+	:param faults: Delays and errors to inject.
+	:param seed: Seed for the random number generator used to inject faults.
+	"""
+
+	def __init__(self, name: str, handler: Handler, faults: Faults = Faults(), seed: int = 0):
+		self.name = name
+		self.handler = handler
+		self.faults = faults
+
+		self._rng = random.Random(seed)
+		self._lock = threading.Lock()
+		self._requests = 0
+		self._errors = 0
+
+		self._server = _Server(("127.0.0.1", 0), _RequestHandler)
+		self._server.stand_in = self
+		self._thread: Optional[threading.Thread] = None
+
+	@property
+	def url(self) -> str:
+		"""
+		The server's base URL.
+		"""
+
+		return f"http://127.0.0.1:{self._server.server_port}"
+
+	def start(self) -> None:
+		"""
+		Start serving requests.
+		"""
+
+		self._thread = threading.Thread(target=self._server.serve_forever, name=f"stand-in-{self.name}", daemon=True)
+		self._thread.start()
+
+	def stop(self) -> None:
+		"""
+		Stop serving requests.
+		"""
+
+		self._server.shutdown()
+		self._server.server_close()
+
+	def reset_counts(self) -> tuple[int, int]:
+		"""
+		Returns the number of requests received, and the number of those answered with an error, since the last reset.
+		"""
+
+		with self._lock:
+			counts = (self._requests, self._errors)
+			self._requests = self._errors = 0
+
+		return counts
+
+	def respond(self, method: str, path: str, headers: dict[str, str], body: bytes = b'') -> Reply:
+		"""
+		Returns the reply to a request, after injecting any faults.
+
+		:param method:
+		:param path: The path, including the query string.
+		:param headers: The request headers, with lowercase names.
+		:param body: The request body.
+		"""
+
+		with self._lock:
+			self._requests += 1
+			delay = self.faults.latency + self._rng.uniform(0, self.faults.jitter)
+			inject_error = self._rng.random() < self.faults.error_rate
+
+		if delay:
+			time.sleep(delay)
+
+		if inject_error:
+			reply = Reply(self.faults.error_status, {"content-type": "text/plain"}, b"Injected error")
+		else:
+			try:
+				reply = self.handler(method, path, headers, body)
+			except Exception as e:
+				reply = Reply(500, {"content-type": "text/plain"}, repr(e).encode("UTF-8"))
+
+		if reply.status >= 500:
+			with self._lock:
+				self._errors += 1
+
+		return reply
+
+
+class _Server(ThreadingHTTPServer):
+	daemon_threads = True
+	stand_in: StandIn
+
+	def handle_error(self, request: Any, client_address: Any) -> None:
+		# Clients closing idle keep-alive connections isn't an error.
+		if not isinstance(sys.exc_info()[1], ConnectionError):
+			super().handle_error(request, client_address)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	server: _Server
+
+	def _handle(self) -> None:
+		body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+		headers = {name.lower(): value for name, value in self.headers.items()}
+		reply = self.server.stand_in.respond(self.command, self.path, headers, body)
+
+		self.send_response_only(reply.status)
+
+		if "date" not in reply.headers:
+			self.send_header("Date", self.date_time_string())
+
+		for name, value in reply.headers.items():
+			if name != "content-length":
+				self.send_header(name, value)
+
+		if self.command == "HEAD" and "content-length" in reply.headers:
+			self.send_header("Content-Length", reply.headers["content-length"])
+		else:
+			self.send_header("Content-Length", str(len(reply.body)))
+
+		self.end_headers()
+
+		if self.command != "HEAD":
+			self.wfile.write(reply.body)
+
+	do_GET = do_HEAD = do_POST = _handle
+
+	def log_message(self, format: str, *args: Any) -> None:  # noqa: A002  # pylint: disable=redefined-builtin
+		pass
+
+
+def _json_reply(data: Any, **headers: str) -> Reply:
+	return Reply(200, {"content-type": "application/json", **headers}, json.dumps(data).encode("UTF-8"))
+
+
+def _not_found() -> Reply:
+	return Reply(404, {"content-type": "application/json"}, b'{"message": "Not Found"}')
+
+
+def _id(text: str) -> int:
+	# A stable numeric ID for a user or repository.
+	return int(hashlib.sha256(text.encode("UTF-8")).hexdigest()[:6], 16)
+
+
+def _etag(*parts: Any) -> str:
+	return '"' + hashlib.sha256(repr(parts).encode("UTF-8")).hexdigest()[:32] + '"'
+
+
+def _oid(files: dict[str, bytes]) -> str:
+	# A stable commit SHA for a repository's files.
+	return hashlib.sha1(repr(sorted(files.items())).encode("UTF-8")).hexdigest()
+
+
+def _conditional(headers: dict[str, str], reply: Reply) -> Reply:
+	# Answer conditional requests for unchanged resources with "304 Not Modified".
+
+	if reply.status == 200 and "etag" in reply.headers and headers.get("if-none-match") == reply.headers["etag"]:
+		return Reply(304, {name: value for name, value in reply.headers.items() if name != "content-type"})
+
+	return reply
+
+
+def _byte_range(headers: dict[str, str], reply: Reply) -> Reply:
+	# Answer range requests, as used to read the metadata from wheels without downloading them.
+
+	if reply.status != 200 or not headers.get("range", '').startswith("bytes="):
+		return reply
+
+	start_text, end_text = headers["range"][6:].split(',')[0].split('-')
+	size = len(reply.body)
+
+	if not start_text:
+		start, end = max(0, size - int(end_text)), size - 1
+	else:
+		start, end = int(start_text), min(int(end_text), size - 1) if end_text else size - 1
+
+	return Reply(
+			206,
+			{**reply.headers, "content-range": f"bytes {start}-{end}/{size}"},
+			reply.body[start:end + 1],
+			)
+
+
+class SyntheticGitHubAPI:
+	"""
+	Serves the users and repositories in a :class:`~.World` from the endpoints of the GitHub REST API
+	used by dependency-dash, and their files from the GraphQL API (at ``/graphql``).
+
+	:param world:
+	:param urls: Mapping of service names to the URLs of their stand-ins.
+	"""
+
+	def __init__(self, world: World, urls: dict[str, str]):
+		self.world = world
+		self.urls = urls
+
+	def _user(self, login: str) -> dict[str, Any]:
+		url = f"{self.urls['github-api']}/users/{login}"
+
+		user = {
+				"login": login,
+				"id": _id(login),
+				"type": "User",
+				"site_admin": False,
+				"gravatar_id": '',
+				"avatar_url": f"{url}/avatar",
+				"html_url": f"https://github.com/{login}",
+				"url": url,
+				}
+
+		for field in ["events", "followers", "following", "gists", "organizations", "received_events", "repos"]:
+			user[f"{field}_url"] = f"{url}/{field}"
+
+		user["starred_url"] = f"{url}/starred{{/owner}}{{/repo}}"
+		user["subscriptions_url"] = f"{url}/subscriptions"
+		return user
+
+	def _repository(self, full_name: str) -> dict[str, Any]:
+		repo = self.world.repositories[full_name.lower()]
+		owner, name = repo.full_name.split('/')
+		url = f"{self.urls['github-api']}/repos/{repo.full_name}"
+
+		data = {
+				"id": _id(repo.full_name),
+				"name": name,
+				"full_name": repo.full_name,
+				"owner": self._user(owner),
+				"private": False,
+				"fork": False,
+				"description": "A repository for load testing.",
+				"default_branch": repo.default_branch,
+				"html_url": f"https://github.com/{repo.full_name}",
+				"url": url,
+				}
+
+		for field in [
+				"archive",
+				"assignees",
+				"blobs",
+				"branches",
+				"collaborators",
+				"comments",
+				"commits",
+				"compare",
+				"contents",
+				"contributors",
+				"deployments",
+				"downloads",
+				"events",
+				"forks",
+				"git_commits",
+				"git_refs",
+				"git_tags",
+				"hooks",
+				"issue_comment",
+				"issue_events",
+				"issues",
+				"keys",
+				"labels",
+				"languages",
+				"merges",
+				"milestones",
+				"notifications",
+				"pulls",
+				"releases",
+				"stargazers",
+				"statuses",
+				"subscribers",
+				"subscription",
+				"tags",
+				"teams",
+				"trees",
+				]:
+			data[f"{field}_url"] = f"{url}/{field}"
+
+		return data
+
+	def _graphql(self, body: bytes) -> Reply:
+		# Answers the repository queries built by dependency_dash.github.graphql.
+		# Each repository field is followed by its file fields, up to the next repository field.
+
+		request = json.loads(body)
+		query, variables = request["query"], request["variables"]
+		repository_fields = list(re.finditer(r"(\w+): repository\(owner: \$(\w+), name: \$(\w+)\)", query))
+		data: dict[str, Any] = {}
+
+		for idx, match in enumerate(repository_fields):
+			alias, owner, name = match.groups()
+			repo = self.world.repositories.get(f"{variables[owner]}/{variables[name]}".lower())
+
+			if repo is None:
+				data[alias] = None
+				continue
+
+			oid = _oid(repo.files)
+			data[alias] = {
+					"nameWithOwner": repo.full_name,
+					"defaultBranchRef": {"name": repo.default_branch, "target": {"oid": oid}},
+					}
+
+			end = repository_fields[idx + 1].start() if idx + 1 < len(repository_fields) else len(query)
+			for file_alias, expression in re.findall(r"(\w+): object\(expression: \$(\w+)\)", query[match.end():end]):
+				ref, filename = variables[expression].split(':', 1)
+				if ref in {"HEAD", repo.default_branch, oid} and filename in repo.files:
+					data[alias][file_alias] = {"text": repo.files[filename].decode("UTF-8"), "isTruncated": False}
+				else:
+					data[alias][file_alias] = None
+
+		return _json_reply({"data": data})
+
+	def __call__(self, method: str, path: str, headers: dict[str, str], body: bytes = b'') -> Reply:  # noqa: D102
+		url = urlsplit(path)
+		parts = url.path.strip('/').split('/')
+
+		if method == "POST" and parts == ["graphql"]:
+			return self._graphql(body)
+
+		elif parts[0] == "users" and len(parts) == 2 and parts[1].lower() in self.world.users:
+			login = parts[1].lower()
+			user = {
+					**self._user(login),
+					"name": login,
+					"company": None,
+					"blog": '',
+					"location": None,
+					"email": None,
+					"hireable": None,
+					"bio": None,
+					"public_repos": len(self.world.users[login]),
+					"public_gists": 0,
+					"followers": 0,
+					"following": 0,
+					"created_at": "2020-01-01T00:00:00Z",
+					"updated_at": "2021-01-01T00:00:00Z",
+					}
+			return _conditional(headers, _json_reply(user, etag=_etag(user)))
+
+		elif parts[0] == "users" and len(parts) == 3 and parts[2] == "repos" and parts[1].lower() in self.world.users:
+			page = int(parse_qs(url.query).get("page", ['1'])[0])
+			per_page = int(parse_qs(url.query).get("per_page", ["30"])[0])
+			full_names = self.world.users[parts[1].lower()][(page - 1) * per_page:page * per_page]
+			return _json_reply(list(map(self._repository, full_names)))
+
+		elif parts[0] == "repos" and len(parts) == 3 and '/'.join(parts[1:]).lower() in self.world.repositories:
+			repo = self._repository('/'.join(parts[1:]))
+			return _conditional(headers, _json_reply(repo, etag=_etag(repo)))
+
+		return _not_found()
+
+
+class SyntheticGitHubRaw:
+	"""
+	Serves the files in the repositories of a :class:`~.World`, as ``raw.githubusercontent.com`` does,
+	from either the default branch or the commit given by the GraphQL stand-in.
+
+	:param world:
+	"""
+
+	def __init__(self, world: World):
+		self.world = world
+
+	def __call__(self, method: str, path: str, headers: dict[str, str], body: bytes = b'') -> Reply:  # noqa: D102
+		try:
+			username, repository, ref, filename = urlsplit(path).path.strip('/').split('/', 3)
+		except ValueError:
+			return _not_found()
+
+		repo = self.world.repositories.get(f"{username}/{repository}".lower())
+		if repo is None or ref not in {repo.default_branch, _oid(repo.files)} or filename not in repo.files:
+			return _not_found()
+
+		content = repo.files[filename]
+		now = time.time()
+
+		reply = Reply(
+				200,
+				{
+						"content-type": "text/plain; charset=utf-8",
+						"etag": _etag(content),
+						"date": formatdate(now, usegmt=True),
+						"expires": formatdate(now + 300, usegmt=True),
+						"cache-control": "max-age=300",
+						},
+				content,
+				)
+
+		return _conditional(headers, reply)
+
+
+class SyntheticPyPI:
+	"""
+	Serves the projects in a :class:`~.World` from the PyPI JSON API,
+	and their changes from the changelog methods of the XML-RPC API.
+
+	:param world:
+	:param urls: Mapping of service names to the URLs of their stand-ins.
+	"""
+
+	def __init__(self, world: World, urls: dict[str, str]):
+		self.world = world
+		self.urls = urls
+
+	def __call__(self, method: str, path: str, headers: dict[str, str], body: bytes = b'') -> Reply:  # noqa: D102
+		parts = urlsplit(path).path.strip('/').split('/')
+
+		if method == "POST" and parts == ["pypi"]:
+			return self._xmlrpc(body)
+
+		if len(parts) != 3 or parts[0] != "pypi" or parts[2] != "json":
+			return _not_found()
+
+		project = self.world.projects.get(canonicalize_name(parts[1]))
+		if project is None:
+			return _not_found()
+
+		def file(version: str) -> dict[str, Any]:
+			filename = project.wheel_filename(version)
+			return {
+					"filename": filename,
+					"packagetype": "bdist_wheel",
+					"url": f"{self.urls['files']}/packages/{filename}",
+					"digests": {"sha256": hashlib.sha256(filename.encode("UTF-8")).hexdigest()},
+					}
+
+		latest_version = project.latest_version
+		serial = self.world.serials[canonicalize_name(project.name)]
+
+		data = {
+				"info": {
+						"name": project.name,
+						"version": latest_version,
+						"summary": "A project for load testing.",
+						"home_page": '',
+						"license": "MIT",
+						"package_url": f"{self.urls['pypi']}/project/{project.name}/",
+						"project_urls": make_project_urls(),
+						"requires_dist": project.requires_dist,
+						},
+				"last_serial": serial,
+				"releases": {version: [file(version)] for version in project.versions},
+				"urls": [file(latest_version)],
+				"vulnerabilities": [],
+				}
+
+		reply = _json_reply(
+				data,
+				etag=_etag(project.name, serial),
+				date=formatdate(usegmt=True),
+				**{"x-pypi-last-serial": str(serial)},
+				)
+
+		return _conditional(headers, reply)
+
+	def _xmlrpc(self, body: bytes) -> Reply:
+		params, method = xmlrpc.client.loads(body)
+
+		if method == "changelog_last_serial":
+			result: Any = self.world.serial
+		elif method == "changelog_since_serial":
+			since: int = params[0]  # type: ignore[assignment]
+			result = [list(entry) for entry in self.world.changelog if entry[4] > since]
+		else:
+			fault = xmlrpc.client.Fault(1, f"No such method {method!r}")
+			return Reply(200, {"content-type": "text/xml"}, xmlrpc.client.dumps(fault).encode("UTF-8"))
+
+		response = xmlrpc.client.dumps((result, ), methodresponse=True)
+		return Reply(200, {"content-type": "text/xml"}, response.encode("UTF-8"))
+
+
+class SyntheticFiles:
+	"""
+	Serves the wheels of the projects in a :class:`~.World`, as ``files.pythonhosted.org`` does.
+
+	:param world:
+	"""
+
+	def __init__(self, world: World):
+		self.world = world
+
+	def __call__(self, method: str, path: str, headers: dict[str, str], body: bytes = b'') -> Reply:  # noqa: D102
+		wheel = self.world.wheel(urlsplit(path).path.rpartition('/')[2])
+		if wheel is None:
+			return _not_found()
+
+		reply = Reply(200, {"content-type": "binary/octet-stream", "accept-ranges": "bytes"}, wheel)
+		if method == "HEAD":
+			return reply._replace(headers={**reply.headers, "content-length": str(len(wheel))}, body=b'')
+
+		return _byte_range(headers, reply)
+
+
+class Recording:
+	"""
+	Responses from the real services, saved in a directory.
+
+	:param directory:
+	"""
+
+	def __init__(self, directory: PathPlus):
+		self.directory = PathPlus(directory)
+
+	def _filename(self, name: str, method: str, path: str, headers: dict[str, str], body: bytes) -> PathPlus:
+		# Requests for different parts of a file, and XML-RPC calls with different parameters, are recorded separately.
+		request = f"{method} {path} {headers.get('range', '')}"
+		if body:
+			request += f" {hashlib.sha256(body).hexdigest()}"
+		return self.directory / name / f"{hashlib.sha256(request.encode('UTF-8')).hexdigest()[:32]}.json"
+
+	def save(
+			self,
+			name: str,
+			method: str,
+			path: str,
+			headers: dict[str, str],
+			reply: Reply,
+			body: bytes = b'',
+			) -> None:
+		"""
+		Save the reply to a request.
+
+		:param name: The name of the service.
+		:param method:
+		:param path:
+		:param headers: The request headers, with lowercase names.
+		:param reply:
+		:param body: The request body.
+		"""
+
+		filename = self._filename(name, method, path, headers, body)
+		filename.parent.maybe_make(parents=True)
+		filename.dump_json({
+				"request": f"{method} {path}",
+				"status": reply.status,
+				"headers": reply.headers,
+				"body": base64.b64encode(reply.body).decode("ASCII"),
+				})
+
+	def load(self, name: str, method: str, path: str, headers: dict[str, str], body: bytes = b'') -> Optional[Reply]:
+		"""
+		Returns the recorded reply to a request, or :py:obj:`None` if it wasn't recorded.
+
+		:param name: The name of the service.
+		:param method:
+		:param path:
+		:param headers: The request headers, with lowercase names.
+		:param body: The request body.
+		"""
+
+		filename = self._filename(name, method, path, headers, body)
+		if not filename.is_file():
+			return None
+
+		data = filename.load_json()
+		return Reply(data["status"], data["headers"], base64.b64decode(data["body"]))
+
+
+def _rewrite(reply: Reply, urls: dict[str, str]) -> Reply:
+	# Point links to the real services (e.g. wheel URLs from PyPI) at the stand-ins.
+
+	def rewrite(text: str) -> str:
+		for name, origin in ORIGINS.items():
+			text = text.replace(origin, urls[name])
+		return text
+
+	headers = {name: rewrite(value) if name in {"link", "location"} else value for name, value in reply.headers.items()}
+
+	body = reply.body
+	if "json" in reply.headers.get("content-type", ''):
+		body = rewrite(body.decode("UTF-8")).encode("UTF-8")
+
+	return reply._replace(headers=headers, body=body)
+
+
+def _refresh_dates(reply: Reply) -> Reply:
+	# Move the recorded dates to the present, keeping the same time between the Date and Expires headers.
+
+	if "date" not in reply.headers:
+		return reply
+
+	now = time.time()
+	headers = {**reply.headers, "date": formatdate(now, usegmt=True)}
+
+	if "expires" in reply.headers:
+		max_age = parsedate_to_datetime(reply.headers["expires"]) - parsedate_to_datetime(reply.headers["date"])
+		headers["expires"] = formatdate(now + max_age.total_seconds(), usegmt=True)
+
+	return reply._replace(headers=headers)
+
+
+class Recorder:
+	"""
+	Forwards requests to a real service, and records the responses.
+
+	:param name: The name of the service.
+	:param recording:
+	:param urls: Mapping of service names to the URLs of their stand-ins.
+	"""
+
+	def __init__(self, name: str, recording: Recording, urls: dict[str, str]):
+		self.name = name
+		self.recording = recording
+		self.urls = urls
+		self._session = requests.Session()
+
+	def __call__(self, method: str, path: str, headers: dict[str, str], body: bytes = b'') -> Reply:  # noqa: D102
+		# Conditional headers aren't passed on, so the full response is always recorded.
+		response = self._session.request(
+				method,
+				ORIGINS[self.name] + path,
+				headers={name: value for name, value in headers.items() if name in _FORWARDED_HEADERS},
+				data=body or None,
+				allow_redirects=False,
+				timeout=30,
+				)
+
+		reply_headers = {name.lower(): value for name, value in response.headers.items()}
+		if method != "HEAD":
+			# The body is stored decompressed.
+			reply_headers.pop("content-length", None)
+
+		reply = Reply(
+				response.status_code,
+				{name: value for name, value in reply_headers.items() if name in _RECORDED_HEADERS},
+				response.content,
+				)
+
+		if reply.status < 500:
+			self.recording.save(self.name, method, path, headers, reply, body)
+
+		return _conditional(headers, _rewrite(reply, self.urls))
+
+
+class Replayer:
+	"""
+	Replays the responses recorded from a real service.
+
+	Requests which weren't recorded are answered with ``404 Not Found``.
+
+	:param name: The name of the service.
+	:param recording:
+	:param urls: Mapping of service names to the URLs of their stand-ins.
+	"""
+
+	def __init__(self, name: str, recording: Recording, urls: dict[str, str]):
+		self.name = name
+		self.recording = recording
+		self.urls = urls
+
+		#: The number of requests which weren't recorded.
+		self.missing = 0
+
+	def __call__(self, method: str, path: str, headers: dict[str, str], body: bytes = b'') -> Reply:  # noqa: D102
+		reply = self.recording.load(self.name, method, path, headers, body)
+
+		if reply is None:
+			self.missing += 1
+			return Reply(404, {"content-type": "text/plain"}, b"Not recorded")
+
+		return _conditional(headers, _rewrite(_refresh_dates(reply), self.urls))
+
+
+def start_stand_ins(
+		mode: str,
+		world: Optional[World] = None,
+		recording: Optional[Recording] = None,
+		faults: Faults = Faults(),
+		seed: int = 0,
+		) -> dict[str, StandIn]:
+	"""
+	Start a stand-in for each of the services in :py:data:`~.ORIGINS`.
+
+	:param mode: ``'synthetic'`` to serve ``world``, ``'record'`` to forward requests to the real services
+		and record the responses in ``recording``, or ``'replay'`` to replay the responses in ``recording``.
+	:param world:
+	:param recording:
+	:param faults: Delays and errors to inject into every stand-in's responses.
+	:param seed: Seed for the random number generators used to inject faults.
+
+	:returns: Mapping of service names to their stand-ins.
+	"""
+
+	# Filled in once the servers have started.
+	urls: dict[str, str] = {}
+	handlers: dict[str, Handler]
+
+	if mode == "synthetic":
+		if world is None:
+			raise TypeError("'world' must be given in synthetic mode")
+
+		handlers = {
+				"github-api": SyntheticGitHubAPI(world, urls),
+				"github-raw": SyntheticGitHubRaw(world),
+				"pypi": SyntheticPyPI(world, urls),
+				"files": SyntheticFiles(world),
+				}
+
+	elif mode in {"record", "replay"}:
+		if recording is None:
+			raise TypeError(f"'recording' must be given in {mode} mode")
+
+		handler_type = Recorder if mode == "record" else Replayer
+		handlers = {name: handler_type(name, recording, urls) for name in ORIGINS}
+
+	else:
+		raise ValueError(f"Unknown mode {mode!r}")
+
+	stand_ins = {}
+
+	for idx, (name, handler) in enumerate(handlers.items()):
+		stand_ins[name] = StandIn(name, handler, faults, seed=seed + idx)
+		stand_ins[name].start()
+		urls[name] = stand_ins[name].url
+
+	return stand_ins
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+#
+#  load/world.py
+"""
+A synthetic set of GitHub repositories and PyPI projects for the stand-in servers to serve.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import hashlib
+import io
+import random
+import time
+import zipfile
+from typing import Callable, NamedTuple, Optional
+
+# 3rd party
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion, Version
+
+# this package
+from benchmarks.corpus import (
+		LARGE,
+		make_pyproject_toml,
+		make_requirements,
+		make_requirements_txt,
+		make_setup_cfg,
+		make_setup_py,
+		make_versions
+		)
+from benchmarks.load.traffic import Targets
+
+__all__ = ["Project", "Repository", "World"]
+
+# The file each repository's requirements are in, and the function which generates it, chosen in rotation.
+_MANIFESTS: list[tuple[str, Callable[[int], bytes]]] = [
+		("requirements.txt", make_requirements_txt),
+		("pyproject.toml", make_pyproject_toml),
+		("setup.cfg", make_setup_cfg),
+		("setup.py", make_setup_py),
+		]
+
+
+class Repository(NamedTuple):
+	"""
+	A GitHub repository.
+	"""
+
+	#: The repository's full name, in the form ``<user>/<repo>``.
+	full_name: str
+
+	#: The name of the repository's default branch.
+	default_branch: str
+
+	#: Mapping of paths to the content of the files in the repository.
+	files: dict[str, bytes]
+
+
+class Project(NamedTuple):
+	"""
+	A project on PyPI.
+	"""
+
+	#: The project's name.
+	name: str
+
+	#: The project's versions, including pre-releases.
+	versions: list[str]
+
+	#: The requirements listed in the project's wheels.
+	requires_dist: list[str]
+
+	@property
+	def latest_version(self) -> str:
+		"""
+		The newest version which isn't a pre-release.
+		"""
+
+		final_versions = []
+
+		for version in self.versions:
+			try:
+				if not Version(version).is_prerelease:
+					final_versions.append(version)
+			except InvalidVersion:
+				continue
+
+		return max(final_versions, key=Version)
+
+	def wheel_filename(self, version: str) -> str:
+		"""
+		Returns the filename of the project's wheel for ``version``.
+
+		:param version:
+		"""
+
+		return f"{self.name.replace('-', '_')}-{version}-py3-none-any.whl"
+
+
+class World:
+	"""
+	GitHub users with repositories, and the PyPI projects they depend on.
+
+	The repositories' requirements are generated by :mod:`benchmarks.corpus`,
+	so every repository depends on the same few popular projects and a varying number of less popular ones.
+
+	:param users: The number of GitHub users.
+	:param repositories: The number of repositories each user has.
+	:param seed: Seed for the random number generator, so the same arguments always give the same world.
+	"""
+
+	def __init__(self, users: int = 20, repositories: int = 10, seed: int = 0):
+		rng = random.Random(seed)
+
+		#: Mapping of lowercased repository full names to repositories.
+		self.repositories: dict[str, Repository] = {}
+
+		#: Mapping of lowercased user names to the full names of their repositories.
+		self.users: dict[str, list[str]] = {}
+
+		#: Mapping of normalized project names to projects.
+		self.projects: dict[str, Project] = {}
+
+		#: The PyPI changelog serial of the latest change.
+		self.serial = 0
+
+		#: Mapping of normalized project names to the serial of their latest change.
+		self.serials: dict[str, int] = {}
+
+		#: The changes made with :meth:`~.World.release`,
+		#: as ``(name, version, timestamp, action, serial)`` tuples in the order they were made.
+		self.changelog: list[tuple[str, str, int, str, int]] = []
+
+		self._wheels: dict[str, bytes] = {}
+
+		project_names = [Requirement(requirement).name for requirement in make_requirements(LARGE)]
+
+		for name in project_names:
+			requires_dist = rng.sample([other for other in project_names[:40] if other != name], rng.randint(0, 6))
+			versions = make_versions(rng.randint(5, 300))
+			self.projects[canonicalize_name(name)] = Project(name, versions, sorted(requires_dist))
+			self.serial += 1
+			self.serials[canonicalize_name(name)] = self.serial
+
+		for user_idx in range(users):
+			username = f"user-{user_idx:03d}"
+			self.users[username] = []
+
+			for repo_idx in range(repositories):
+				full_name = f"{username}/repo-{repo_idx:03d}"
+				default_branch = "main" if repo_idx % 2 else "master"
+
+				if repo_idx % 10 == 9:
+					# No supported files.
+					files = {"README.md": b"# Nothing to see here\n"}
+				else:
+					filename, make_content = _MANIFESTS[(user_idx + repo_idx) % len(_MANIFESTS)]
+					files = {filename: make_content(rng.randint(3, 60))}
+
+				self.repositories[full_name.lower()] = Repository(full_name, default_branch, files)
+				self.users[username].append(full_name)
+
+	def targets(self, missing: int = 5) -> Targets:
+		"""
+		Returns the world's repositories and projects, as targets for the load test.
+
+		:param missing: The number of repositories and projects to add which don't exist.
+		"""
+
+		repositories = [repo.full_name for repo in self.repositories.values()]
+		repositories.extend(f"missing-user/missing-{idx}" for idx in range(missing))
+
+		packages = [project.name for project in self.projects.values()]
+		packages.extend(f"missing-project-{idx}" for idx in range(missing))
+
+		return Targets(repositories, packages)
+
+	def release(self, name: str, version: str) -> int:
+		"""
+		Add a new version of a project, and record it in the changelog.
+
+		:param name: The project's name.
+		:param version:
+
+		:returns: The serial of the change.
+		"""
+
+		project = self.projects[canonicalize_name(name)]
+		project.versions.append(version)
+
+		self.serial += 1
+		self.serials[canonicalize_name(name)] = self.serial
+		self.changelog.append((project.name, version, int(time.time()), "new release", self.serial))
+
+		return self.serial
+
+	def wheel(self, filename: str) -> Optional[bytes]:
+		"""
+		Returns the content of the wheel with the given filename, or :py:obj:`None` if there is no such wheel.
+
+		:param filename:
+		"""
+
+		if filename in self._wheels:
+			return self._wheels[filename]
+
+		try:
+			distribution, version, *_ = filename.split('-')
+		except ValueError:
+			return None
+
+		project = self.projects.get(canonicalize_name(distribution))
+		if project is None or version not in project.versions:
+			return None
+
+		# Named as PyPI names the project, which is how dependency-dash finds the metadata.
+		dist_info = f"{project.name}-{version}.dist-info"
+		metadata = [
+				"Metadata-Version: 2.1",
+				f"Name: {project.name}",
+				f"Version: {version}",
+				"Summary: A project for load testing.",
+				*(f"Requires-Dist: {requirement}" for requirement in project.requires_dist),
+				'',
+				]
+		files = {
+				f"{distribution}/__init__.py": b'',
+				f"{dist_info}/METADATA": '\n'.join(metadata).encode("UTF-8"),
+				f"{dist_info}/WHEEL": b"Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+				}
+
+		record = [f"{path},sha256={hashlib.sha256(content).hexdigest()},{len(content)}" for path, content in files.items()]
+		record.append(f"{dist_info}/RECORD,,")
+		files[f"{dist_info}/RECORD"] = '\n'.join(record).encode("UTF-8")
+
+		buffer = io.BytesIO()
+		with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as wheel_zip:
+			for path, content in files.items():
+				wheel_zip.writestr(path, content)
+
+		self._wheels[filename] = buffer.getvalue()
+		return self._wheels[filename]
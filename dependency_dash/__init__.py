@@ -26,18 +26,12 @@ A fully Open Source dependency dashboard.
 #  OR OTHER DEALINGS IN THE SOFTWARE.
 #
 
-# 3rd party
-import restx_monkey as monkey  # type: ignore[import-untyped]
+# stdlib
+from typing import TYPE_CHECKING, Any
 
-monkey.patch_restx()
-
-# this package
-import dependency_dash.github.api  # noqa: E402
-import dependency_dash.pypi.api  # noqa: E402
-from dependency_dash import routes  # noqa: F401,E402
-from dependency_dash._app import api, app  # noqa: E402
-from dependency_dash.github import routes as _github_routes  # noqa: F401,E402
-from dependency_dash.pypi import routes as _pypi_routes  # noqa: F401,E402
+if TYPE_CHECKING:
+	# this package
+	from dependency_dash.wsgi import app
 
 __author__: str = "Dominic Davis-Foster"
 __copyright__: str = "2021 Dominic Davis-Foster"
@@ -47,5 +41,15 @@ __email__: str = "dominic@davis-foster.co.uk"
 
 __all__ = ["app"]
 
-api.add_namespace(dependency_dash.github.api.api)
-api.add_namespace(dependency_dash.pypi.api.api)
+
+def __getattr__(name: str) -> Any:
+	# The app is only set up when it's first used (e.g. by the WSGI server), so the cache maintenance commands
+	# in __main__.py don't need its configuration (such as GITHUB_TOKEN) and don't start its background tasks.
+
+	if name == "app":
+		# this package
+		from dependency_dash.wsgi import app
+
+		return app
+
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+#
+#  __main__.py
+"""
+Command-line tools for maintaining the dependency-dash cache.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import argparse
+import os
+import sys
+from typing import Optional
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from dependency_dash.storage import (
+		CACHE_ROOT,
+		EVICTION_POLICY,
+		MAX_BYTES,
+		MAX_IDLE,
+		collect_garbage,
+		import_file_cache,
+		)
+from dependency_dash.warm import GITHUB_RATE, PYPI_RATE, read_targets, warm
+
+__all__ = ["main"]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+	"""
+	Entry point for ``python -m dependency_dash``.
+
+	:param argv: The command-line arguments. Defaults to :py:data:`sys.argv`.
+	"""
+
+	parser = argparse.ArgumentParser(prog="python -m dependency_dash", description=__doc__.strip())
+	subparsers = parser.add_subparsers(dest="command", required=True)
+
+	migrate_parser = subparsers.add_parser(
+			"migrate",
+			help="Import a file cache (as used before the SQLite cache) into the configured cache backend.",
+			)
+	migrate_parser.add_argument(
+			"directory",
+			nargs='?',
+			type=PathPlus,
+			default=CACHE_ROOT,
+			help="The directory containing the file cache (default: %(default)s).",
+			)
+
+	gc_parser = subparsers.add_parser(
+			"gc",
+			help="Remove expired and unused entries from the cache, and evict entries to keep within its size limit.",
+			)
+	gc_parser.add_argument(
+			"--max-bytes",
+			type=int,
+			default=MAX_BYTES,
+			help="The maximum total size of the GitHub and PyPI caches (default: %(default)s).",
+			)
+	gc_parser.add_argument(
+			"--policy",
+			choices=["lru", "lfu"],
+			default=EVICTION_POLICY,
+			help="Evict the least recently used or least frequently used entries first (default: %(default)s).",
+			)
+	gc_parser.add_argument(
+			"--max-idle",
+			type=float,
+			default=MAX_IDLE,
+			help="Remove entries not used for this many seconds (default: %(default)s).",
+			)
+
+	warm_parser = subparsers.add_parser(
+			"warm",
+			help="Fill the cache with the requirements of the given repositories and packages, and their dependencies.",
+			)
+	warm_parser.add_argument(
+			"file",
+			type=PathPlus,
+			help="A file listing GitHub repositories (<user>/<repo> or their URLs) and PyPI packages, one per line.",
+			)
+	warm_parser.add_argument(
+			"-j",
+			"--workers",
+			type=int,
+			default=8,
+			help="The maximum number of lookups in progress at once (default: %(default)s).",
+			)
+	warm_parser.add_argument(
+			"--github-rate",
+			type=float,
+			default=GITHUB_RATE,
+			help="The maximum number of repositories looked up per second, or 0 for no limit (default: %(default)s).",
+			)
+	warm_parser.add_argument(
+			"--pypi-rate",
+			type=float,
+			default=PYPI_RATE,
+			help="The maximum number of PyPI lookups per second, or 0 for no limit (default: %(default)s).",
+			)
+	warm_parser.add_argument(
+			"--no-dependencies",
+			dest="dependencies",
+			action="store_false",
+			help="Don't fetch the metadata of the repositories' and packages' dependencies.",
+			)
+	warm_parser.add_argument(
+			"-q",
+			"--quiet",
+			action="store_true",
+			help="Only report failures.",
+			)
+
+	args = parser.parse_args(argv)
+
+	if args.command == "migrate":
+		count = import_file_cache(args.directory)
+		print(f"Imported {count} entries from {args.directory}")
+
+	elif args.command == "gc":
+		result = collect_garbage(max_bytes=args.max_bytes, policy=args.policy, max_idle=args.max_idle)
+		print(f"Removed {result.expired} expired entries and evicted {result.evicted} entries")
+		print(f"Reclaimed {result.reclaimed} bytes")
+
+	elif args.command == "warm":
+		try:
+			repositories, packages = read_targets(args.file)
+		except ValueError as e:
+			parser.error(str(e))
+
+		if repositories and not os.getenv("GITHUB_TOKEN"):
+			parser.error("The GITHUB_TOKEN environment variable is required to look up repositories")
+
+		def progress(label: str, error: Optional[Exception], finished: int, submitted: int) -> None:
+			if error is not None:
+				print(f"[{finished}/{submitted}] {label}: {str(error) or type(error).__name__}", file=sys.stderr, flush=True)
+			elif not args.quiet:
+				print(f"[{finished}/{submitted}] {label}", flush=True)
+
+		warm_result = warm(
+				repositories,
+				packages,
+				max_workers=args.workers,
+				github_rate=args.github_rate,
+				pypi_rate=args.pypi_rate,
+				dependencies=args.dependencies,
+				progress=progress,
+				)
+		print(
+				f"Cached {warm_result.succeeded} repositories and packages "
+				f"and {warm_result.dependencies} dependencies, {len(warm_result.failed)} failed"
+				)
+
+		if warm_result.failed:
+			return 1
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -27,30 +27,107 @@ Badge generation and serving.
 #
 
 # stdlib
+import functools
 import hashlib
+import os
 from collections import Counter
-from collections.abc import Iterator
+from collections.abc import Iterable
 from datetime import timedelta
 from http import HTTPStatus
 from operator import itemgetter
+from typing import Optional, TypedDict
 
 # 3rd party
 from flask import Response, request
+from packaging.requirements import InvalidRequirement
 from pybadges import badge
+from shippinglabel import normalize
 from shippinglabel.requirements import ComparableRequirement
 
 # this package
-from dependency_dash.pypi import DependencyMetadata
+from dependency_dash.caching import LRUCache
+from dependency_dash.metrics import record_cache, watch_memory_cache
+from dependency_dash.pypi import DependencyMetadata, get_data
+from dependency_dash.storage import get_cache
 from dependency_dash.utils import utcnow
 
-__all__ = ["make_badge", "serve_badge"]
+__all__ = ["CachedBadge", "get_cached_badge", "make_badge", "prewarm_badges", "render_badge", "serve_badge"]
 
 
-def make_badge(dependency_data: Iterator[tuple[ComparableRequirement, str, DependencyMetadata]]) -> str:
+class CachedBadge(TypedDict):
+	"""
+	A badge, and the inputs it was made from.
+	"""
+
+	#: Identifies the project's own data the badge was made from (e.g. the ETags of the repository's files).
+	source: str
+
+	#: Mapping of the (normalized) names of the dependencies to the ETags of their PyPI metadata.
+	dependencies: dict[str, str]
+
+	#: The badge's ETag.
+	etag: str
+
+	#: The SVG badge.
+	svg: str
+
+
+#: Recently served badges, keyed by project.
+BADGE_CACHE: LRUCache[str, CachedBadge] = LRUCache(maxsize=int(os.getenv("DD_BADGE_CACHE_SIZE", 4096)))
+watch_memory_cache("badges", BADGE_CACHE.stats)
+
+#: Cache key prefix for badges shared between workers. Change the version if the badges' content changes.
+BADGE_CACHE_PREFIX = "badges/v1"
+
+
+@functools.lru_cache(maxsize=512)
+def render_badge(left_text: str, right_text: str, right_color: str) -> str:
+	"""
+	Render a badge as SVG.
+
+	There are only a handful of distinct badges, so the output is cached.
+
+	:param left_text:
+	:param right_text:
+	:param right_color:
+	"""
+
+	return badge(left_text=left_text, right_text=right_text, right_color=right_color)
+
+
+@functools.lru_cache(maxsize=512)
+def _get_etag(badge_svg: str) -> str:
+	return hashlib.sha256(badge_svg.encode("UTF-8")).hexdigest()
+
+
+def prewarm_badges(max_count: int = 50) -> None:
+	"""
+	Render the most common badges in advance.
+
+	:param max_count: Render the ``outdated`` and ``insecure`` badges for up to this many dependencies.
+	"""
+
+	badges = [
+			("dependencies", "up-to-date", "#82B805"),
+			("repository", "not found", "silver"),
+			("repository", "unsupported", "silver"),
+			("package", "not found", "silver"),
+			("package", "unsupported", "silver"),
+			]
+
+	for count in range(1, max_count + 1):
+		badges.append(("dependencies", f"{count} outdated", "orange"))
+		badges.append(("dependencies", f"{count} insecure", "red"))
+
+	for args in badges:
+		_get_etag(render_badge(*args))
+
+
+def make_badge(dependency_data: Iterable[tuple[ComparableRequirement, str, DependencyMetadata]]) -> str:
 	"""
 	Construct a badge from the given dependency data.
 
-	:param dependency_data: An iterator over ``(requirement, status, metadata)`` tuples.
+	:param dependency_data: An iterable of ``(requirement, status, metadata)`` tuples.
 
 	:returns: The SVG badge.
 	"""
@@ -58,30 +135,14 @@ def make_badge(dependency_data: Iterator[tuple[ComparableRequirement, str, Depen
 	status_counts = Counter(map(itemgetter(1), list(dependency_data)))
 
 	if status_counts.get("insecure", 0):
-		return badge(
-				left_text="dependencies",
-				right_text=f'{status_counts["insecure"]} insecure',
-				right_color="red",
-				)
+		return render_badge("dependencies", f'{status_counts["insecure"]} insecure', "red")
 	elif status_counts.get("outdated", 0):
-		return badge(
-				left_text="dependencies",
-				right_text=f'{status_counts["outdated"]} outdated',
-				right_color="orange",
-				)
+		return render_badge("dependencies", f'{status_counts["outdated"]} outdated', "orange")
 	else:
-		return badge(left_text="dependencies", right_text="up-to-date", right_color="#82B805")
+		return render_badge("dependencies", "up-to-date", "#82B805")
 
 
-def serve_badge(badge_svg: str) -> Response:
-	"""
-	Serve the given badge with flask.
-
-	:param badge_svg:
-	"""
-
-	etag = hashlib.sha256(badge_svg.encode("UTF-8")).hexdigest()
-
+def _make_response(badge_svg: str, etag: str) -> Response:
 	if request.headers.get("If-None-Match") == etag:
 		resp = Response(status=HTTPStatus.NOT_MODIFIED)
 	else:
@@ -93,3 +154,72 @@ def serve_badge(badge_svg: str) -> Response:
 	expires = (utcnow() + timedelta(seconds=cache_duration)).strftime("%a, %d %b %Y %H:%M:%S GMT")
 	resp.headers["Expires"] = expires
 	return resp
+
+
+def _get_dependency_etag(project_name: str) -> str:
+	try:
+		return get_data(project_name)["etag"]
+	except InvalidRequirement:
+		# The same as the metadata of invalid requirements.
+		return ''
+
+
+def get_cached_badge(cache_key: str, source: str) -> Optional[Response]:
+	"""
+	Serve the badge made for the project identified by ``cache_key``, if none of its inputs have changed since.
+
+	This allows requests (including conditional requests) to be answered without parsing the project's requirements
+	or determining their statuses.
+
+	:param cache_key: A string uniquely identifying the project, e.g. ``'github/<username>/<repository>'``.
+	:param source: Identifies the project's own data, as passed to :func:`~.serve_badge`.
+	"""
+
+	cached = BADGE_CACHE.get(cache_key)
+	if cached is None:
+		cached = get_cache().get_json(f"{BADGE_CACHE_PREFIX}/{cache_key}.json")
+
+	if cached is None or cached["source"] != source:
+		record_cache("badges", "miss")
+		return None
+
+	for project_name, etag in cached["dependencies"].items():
+		if _get_dependency_etag(project_name) != etag:
+			record_cache("badges", "miss")
+			return None
+
+	record_cache("badges", "hit")
+	BADGE_CACHE.set(cache_key, cached)
+	return _make_response(cached["svg"], cached["etag"])
+
+
+def serve_badge(
+		badge_svg: str,
+		cache_key: Optional[str] = None,
+		source: str = '',
+		dependency_data: Iterable[tuple[ComparableRequirement, str, DependencyMetadata]] = (),
+		) -> Response:
+	"""
+	Serve the given badge with flask.
+
+	:param badge_svg:
+	:param cache_key: A string uniquely identifying the project the badge is for.
+		If given the badge is cached for use by :func:`~.get_cached_badge`.
+	:param source: Identifies the project's own data the badge was made from,
+		e.g. the ETags of a repository's files or of a package's PyPI metadata.
+	:param dependency_data: The ``(requirement, status, metadata)`` tuples the badge was made from.
+	"""
+
+	etag = _get_etag(badge_svg)
+
+	if cache_key is not None:
+		cached: CachedBadge = {
+				"source": source,
+				"dependencies": {normalize(req.name): metadata["etag"] for req, _, metadata in dependency_data},
+				"etag": etag,
+				"svg": badge_svg,
+				}
+		BADGE_CACHE.set(cache_key, cached)
+		get_cache().set_json(f"{BADGE_CACHE_PREFIX}/{cache_key}.json", cached)
+
+	return _make_response(badge_svg, etag)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+#
+#  caching.py
+"""
+Caching helpers.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import fcntl
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO, Callable, Generic, Hashable, NamedTuple, Optional, TypeVar
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from dependency_dash.metrics import REGISTRY, SINGLE_FLIGHT_CALLS, SINGLE_FLIGHT_COALESCED
+from dependency_dash.storage import CACHE_ROOT, get_cache
+
+__all__ = ["CacheStats", "LRUCache", "SingleFlight", "is_missing", "mark_missing", "single_flight"]
+
+#: The time, in seconds, for which a missing file or project is remembered.
+NEGATIVE_TTL = int(os.getenv("DD_NEGATIVE_CACHE_TTL", 120))
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+class CacheStats(NamedTuple):
+	"""
+	Statistics about an :class:`~.LRUCache`.
+	"""
+
+	#: The number of lookups which found a fresh entry.
+	hits: int
+
+	#: The number of lookups which found no entry, or an expired one.
+	misses: int
+
+	#: The number of entries currently in the cache.
+	entries: int
+
+	#: The total size of the entries currently in the cache, as measured by the cache's ``sizeof`` function.
+	size: int
+
+
+class LRUCache(Generic[_K, _V]):
+	"""
+	A thread-safe in-memory cache which discards the least recently used entries when full.
+
+	:param maxsize: The maximum number of entries to keep.
+	:param ttl: The default time, in seconds, for which entries remain fresh.
+		If :py:obj:`None` entries don't expire unless an expiry time is given to :meth:`~.LRUCache.set`.
+	:param max_size: The maximum total size of the entries, as measured by ``sizeof``.
+		If :py:obj:`None` only ``maxsize`` limits the cache.
+	:param sizeof: Function returning the size of a value (e.g. in bytes).
+		Required if ``max_size`` is given.
+	"""
+
+	def __init__(
+			self,
+			maxsize: int = 1024,
+			ttl: Optional[float] = None,
+			max_size: Optional[int] = None,
+			sizeof: Optional[Callable[[_V], int]] = None,
+			):
+
+		if max_size is not None and sizeof is None:
+			raise TypeError("'sizeof' must be given with 'max_size'")
+
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self.max_size = max_size
+		self._sizeof = sizeof
+
+		self._lock = threading.Lock()
+		# key -> (value, expires, size)
+		self._data: OrderedDict[_K, tuple[_V, Optional[float], int]] = OrderedDict()
+		self._size = 0
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key: _K) -> Optional[_V]:
+		"""
+		Returns the fresh value for ``key``, or :py:obj:`None` if there is no fresh value.
+
+		:param key:
+		"""
+
+		with self._lock:
+			try:
+				value, expires, size = self._data[key]
+			except KeyError:
+				self.misses += 1
+				return None
+
+			if expires is not None and expires <= time.time():
+				del self._data[key]
+				self._size -= size
+				self.misses += 1
+				return None
+
+			self._data.move_to_end(key)
+			self.hits += 1
+			return value
+
+	def set(self, key: _K, value: _V, expires: Optional[float] = None) -> None:
+		"""
+		Add ``value`` to the cache.
+
+		:param key:
+		:param value:
+		:param expires: The time (as a Unix timestamp) the entry expires.
+			If :py:obj:`None` the cache's ``ttl`` is used.
+		"""
+
+		if expires is None and self.ttl is not None:
+			expires = time.time() + self.ttl
+
+		size = self._sizeof(value) if self._sizeof is not None else 0
+
+		with self._lock:
+			if key in self._data:
+				self._size -= self._data.pop(key)[2]
+
+			self._data[key] = (value, expires, size)
+			self._size += size
+
+			while len(self._data) > self.maxsize or (self.max_size is not None and self._size > self.max_size):
+				_, (_, _, evicted_size) = self._data.popitem(last=False)
+				self._size -= evicted_size
+
+	def pop(self, key: _K) -> Optional[_V]:
+		"""
+		Remove ``key`` from the cache, returning its value (whether fresh or not) if present.
+
+		:param key:
+		"""
+
+		with self._lock:
+			try:
+				value, _, size = self._data.pop(key)
+			except KeyError:
+				return None
+
+			self._size -= size
+			return value
+
+	def clear(self) -> None:
+		"""
+		Remove all entries from the cache.
+		"""
+
+		with self._lock:
+			self._data.clear()
+			self._size = 0
+
+	def stats(self) -> CacheStats:
+		"""
+		Returns statistics about the cache.
+		"""
+
+		with self._lock:
+			return CacheStats(self.hits, self.misses, len(self._data), self._size)
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+
+def mark_missing(key: str, ttl: float = NEGATIVE_TTL) -> None:
+	"""
+	Record that the upstream resource cached under ``key`` does not exist (e.g. it returned HTTP 404).
+
+	Any cached data for the resource is removed.
+
+	:param key: The key the resource would be cached under.
+	:param ttl: The time, in seconds, for which the resource should be treated as missing.
+	"""
+
+	cache = get_cache()
+	cache.delete(key)
+	cache.set_json(f"{key}.missing", time.time() + ttl)
+
+
+def is_missing(key: str) -> bool:
+	"""
+	Returns whether the upstream resource cached under ``key`` was recently found not to exist.
+
+	:param key: The key the resource would be cached under.
+	"""
+
+	cache = get_cache()
+
+	try:
+		expires = cache.get_json(f"{key}.missing")
+	except ValueError:
+		expires = None
+
+	if expires is None:
+		return False
+
+	if expires > time.time():
+		return True
+
+	cache.delete(f"{key}.missing")
+	return False
+
+
+def _same_file(fp: IO, filename: PathPlus) -> bool:
+	# Returns whether the open file ``fp`` is the file currently at ``filename``.
+
+	try:
+		stat = os.stat(filename)
+	except FileNotFoundError:
+		return False
+
+	fstat = os.fstat(fp.fileno())
+	return (fstat.st_dev, fstat.st_ino) == (stat.st_dev, stat.st_ino)
+
+
+class SingleFlight:
+	"""
+	Ensures only one fetch runs at a time for each cache key.
+
+	Callers which find the key locked wait for the fetch to finish,
+	and should then read the result from the cache rather than fetching it again.
+
+	Threads within a process are coordinated with in-process locks,
+	and separate (e.g. gunicorn worker) processes with file locks in ``lock_dir``.
+
+	:param lock_dir: The directory to store lock files in.
+	"""
+
+	def __init__(self, lock_dir: PathPlus):
+		self.lock_dir = lock_dir
+		self._guard = threading.Lock()
+		# key -> (lock, number of threads using it)
+		self._locks: dict[str, tuple[threading.Lock, int]] = {}
+
+		#: The number of calls to :meth:`~.SingleFlight.lock`.
+		self.calls = 0
+
+		#: The number of calls to :meth:`~.SingleFlight.lock` which had to wait for another thread or process.
+		self.coalesced = 0
+
+	@contextmanager
+	def lock(self, key: str) -> Iterator[None]:
+		"""
+		Context manager which holds the lock for ``key`` within the :keyword:`with` block.
+
+		:param key: The cache key.
+		"""
+
+		with self._guard:
+			self.calls += 1
+			lock, users = self._locks.get(key, (None, 0))
+			if lock is None:
+				lock = threading.Lock()
+			self._locks[key] = (lock, users + 1)
+
+		try:
+			waited = not lock.acquire(blocking=False)
+			if waited:
+				lock.acquire()
+
+			try:
+				self.lock_dir.maybe_make(parents=True)
+				lock_file = self.lock_dir / hashlib.sha256(key.encode("UTF-8")).hexdigest()
+
+				while True:
+					fp = open(lock_file, 'a', encoding="UTF-8")
+					try:
+						try:
+							fcntl.flock(fp, fcntl.LOCK_EX | fcntl.LOCK_NB)
+						except BlockingIOError:
+							waited = True
+							fcntl.flock(fp, fcntl.LOCK_EX)
+
+						# The previous holder removes the file when it's done, so the lock is only held
+						# if the file locked is still the one at that path. Otherwise try again with the new file.
+						locked = _same_file(fp, lock_file)
+					except BaseException:
+						fp.close()
+						raise
+
+					if locked:
+						break
+
+					fp.close()
+
+				if waited:
+					with self._guard:
+						self.coalesced += 1
+
+				try:
+					yield
+				finally:
+					# Remove the file while still holding the lock, so lock files don't accumulate.
+					os.unlink(lock_file)
+					fp.close()
+			finally:
+				lock.release()
+
+		finally:
+			with self._guard:
+				lock, users = self._locks[key]
+				if users == 1:
+					del self._locks[key]
+				else:
+					self._locks[key] = (lock, users - 1)
+
+
+#: The :class:`~.SingleFlight` shared by all cache lookups in the process.
+SINGLE_FLIGHT = SingleFlight(CACHE_ROOT / "locks")
+
+#: Context manager which holds the process-wide lock for a cache key. See :meth:`.SingleFlight.lock`.
+single_flight = SINGLE_FLIGHT.lock
+
+
+def _collect_single_flight_stats() -> None:
+	SINGLE_FLIGHT_CALLS.set_total(SINGLE_FLIGHT.calls)
+	SINGLE_FLIGHT_COALESCED.set_total(SINGLE_FLIGHT.coalesced)
+
+
+REGISTRY.add_collector(_collect_single_flight_stats)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+#
+#  concurrency.py
+"""
+A shared thread pool for making blocking upstream requests concurrently.
+
+Each request handled by the app waits for its upstream requests, so many requests are only handled at once
+by running the app with several threads (or greenlets) per worker; see the README.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import contextvars
+import functools
+import os
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+__all__ = ["get_executor", "map_concurrently"]
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+#: The maximum number of threads in each worker process's pool.
+MAX_THREADS = int(os.getenv("DD_MAX_THREADS", 64))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+	"""
+	Returns the thread pool used by :func:`~.map_concurrently`.
+
+	Each worker process has its own pool, which is created when first used.
+	"""
+
+	global _executor, _executor_pid
+
+	with _executor_lock:
+		if _executor is None or _executor_pid != os.getpid():
+			# Threads don't survive a fork, so a pool inherited from the parent process can't be used.
+			_executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix="dependency-dash-io")
+			_executor_pid = os.getpid()
+
+		return _executor
+
+
+def map_concurrently(func: Callable[[_T], _R], items: Iterable[_T], limit: int) -> Iterator[_R]:
+	"""
+	Call ``func`` for each item in the shared thread pool, with at most ``limit`` calls in progress at once.
+
+	Each call is made in a copy of the current context, so it can see the current Flask app and request.
+
+	:param func:
+	:param items:
+	:param limit:
+
+	:returns: An iterator over the results, in the same order as ``items``.
+		Each result is yielded as soon as it and those before it are available.
+		If a call raises an exception it is raised when its result would have been yielded.
+	"""
+
+	executor = get_executor()
+	pending: deque[tuple[Future[_R], Callable[[], _R]]] = deque()
+
+	def result(future: Future[_R], call: Callable[[], _R]) -> _R:
+		# If the pool hasn't started the call yet it is made in this thread instead of waiting for it.
+		# Otherwise calls made from the pool's own threads could wait forever for a thread to become free.
+		if future.cancel():
+			return call()
+		return future.result()
+
+	try:
+		for item in items:
+			if pending and len(pending) >= limit:
+				yield result(*pending.popleft())
+
+			call = functools.partial(contextvars.copy_context().run, func, item)
+			pending.append((executor.submit(call), call))
+
+		while pending:
+			yield result(*pending.popleft())
+
+	finally:
+		# Don't make the remaining calls if the results won't be used.
+		for future, _ in pending:
+			future.cancel()
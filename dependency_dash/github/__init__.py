@@ -28,38 +28,49 @@ GitHub backend.
 
 # stdlib
 import ast
+import functools
+import hashlib
+import os
 from collections.abc import Iterator
 from configparser import ConfigParser
 from contextlib import suppress
-from datetime import datetime
+from datetime import datetime, timedelta
 from sys import intern
-from typing import Any, Callable, Union
+from typing import Any, Callable, NamedTuple, Optional, Union
 from urllib.parse import urlparse
 
 # 3rd party
 import dom_toml
-import platformdirs
 import requests
 import setup_py_upgrade  # type: ignore[import-untyped]
-from domdf_python_tools.paths import PathPlus
 from flask import Response
 from github3.orgs import Organization
 from github3.repos import ShortRepository
 from github3.users import User
-from pybadges import badge
 from shippinglabel.requirements import ComparableRequirement, parse_requirements
 
 # this package
-from dependency_dash.github import _reserved_usernames
+from dependency_dash.caching import LRUCache, is_missing, mark_missing, single_flight
+from dependency_dash.concurrency import map_concurrently
+from dependency_dash.metrics import record_cache, watch_memory_cache
+from dependency_dash.github import _reserved_usernames, graphql
+from dependency_dash.sessions import get_session
+from dependency_dash.storage import get_cache
+from dependency_dash.timing import timed
 from dependency_dash.utils import strptime, utcnow
 
 __all__ = [
+		"RepositoryMetadata",
 		"SkipFile",
 		"get_our_config",
 		"get_parse_functions",
+		"get_file_requirements",
 		"get_parser_for_file",
-		"get_requirements_from_github",
+		"get_raw_file",
+		"get_repo_fingerprint",
 		"get_repo_requirements",
+		"get_repository",
+		"get_requirements_from_github",
 		"iter_repos_for_user",
 		"parse_pyproject_toml",
 		"parse_repo_url",
@@ -69,13 +80,35 @@ __all__ = [
 		]
 
 EXPIRES_FORMAT = "%a, %d %b %Y %H:%M:%S %z"
-CACHE_DIR = PathPlus(platformdirs.user_cache_dir("dependency_dash")) / "github"
 
 SETUP_PY = intern("setup.py")
 SETUP_CFG = intern("setup.cfg")
 PYPROJECT_TOML = intern("pyproject.toml")
 REQUIREMENTS_TXT = intern("requirements.txt")
 
+#: The base URL from which files in repositories are downloaded.
+RAW_URL = os.getenv("DD_GITHUB_RAW_URL", "https://raw.githubusercontent.com")
+
+#: The time, in seconds, for which a repository's metadata is used without checking with GitHub.
+REPOSITORY_MAX_AGE = int(os.getenv("DD_GITHUB_REPOSITORY_TTL", 3600))
+
+
+class RepositoryMetadata(NamedTuple):
+	"""
+	The information about a repository needed to find its requirements.
+	"""
+
+	#: The repository's full name, as given by GitHub (in the form ``<user>/<repo>``).
+	full_name: str
+
+	#: The name of the repository's default branch.
+	default_branch: str
+
+
+#: In-memory cache of repository metadata, keyed by the lowercased ``<user>/<repo>``.
+REPOSITORY_CACHE: LRUCache[str, RepositoryMetadata] = LRUCache(maxsize=4096)
+watch_memory_cache("github-repository", REPOSITORY_CACHE.stats)
+
 
 class SkipFile(Exception):
 	"""
@@ -132,6 +165,66 @@ class SetupPyNodeVisitor(setup_py_upgrade.Visitor):
 		self.generic_visit(node)
 
 
+_ParseFunc = Callable[[bytes], tuple[set[ComparableRequirement], list[str]]]
+_ParseResult = tuple[bool, frozenset[ComparableRequirement], tuple[str, ...]]
+
+#: In-memory cache of parse results, keyed by the parser's name and the SHA-256 hash of the content.
+#: Values are whether the file should be skipped, the requirements and the invalid lines.
+PARSE_CACHE: LRUCache[tuple[str, str], _ParseResult] = LRUCache(maxsize=4096)
+watch_memory_cache("parsed", PARSE_CACHE.stats)
+
+#: In-memory cache of parsed ``pyproject.toml`` files, keyed by the repository's full name and branch.
+#: Values are the ETag of the file the config was parsed from, and the parsed file.
+CONFIG_CACHE: LRUCache[str, tuple[str, dict[str, Any]]] = LRUCache(maxsize=4096)
+watch_memory_cache("config", CONFIG_CACHE.stats)
+
+#: Cache key prefix for parse results shared between workers. Change the version if the parsers' output changes.
+PARSE_CACHE_PREFIX = "parsed/v1"
+
+
+def _cache_by_content(parse_func: _ParseFunc) -> _ParseFunc:
+	"""
+	Cache the results of ``parse_func`` by a hash of the content, so identical files (e.g. in forks) are parsed once.
+
+	:param parse_func:
+	"""
+
+	@functools.wraps(parse_func)
+	def wrapper(content: bytes) -> tuple[set[ComparableRequirement], list[str]]:
+		digest = hashlib.sha256(content).hexdigest()
+		key = (parse_func.__name__, digest)
+
+		result = PARSE_CACHE.get(key)
+
+		if result is None:
+			cache_key = f"{PARSE_CACHE_PREFIX}/{parse_func.__name__}/{digest}.json"
+			data: Optional[dict[str, Any]] = get_cache().get_json(cache_key)
+
+			if data is None:
+				record_cache("parsed", "miss")
+				try:
+					requirements, invalid_lines = parse_func(content)
+				except SkipFile:
+					data = {"skip": True, "requirements": [], "invalid": []}
+				else:
+					data = {"skip": False, "requirements": sorted(map(str, requirements)), "invalid": invalid_lines}
+
+				get_cache().set_json(cache_key, data)
+			else:
+				record_cache("parsed", "hit")
+
+			result = (data["skip"], frozenset(map(ComparableRequirement, data["requirements"])), tuple(data["invalid"]))
+			PARSE_CACHE.set(key, result)
+
+		if result[0]:
+			raise SkipFile
+
+		return set(result[1]), list(result[2])
+
+	return wrapper
+
+
+@_cache_by_content
 def parse_requirements_txt(content: bytes) -> tuple[set[ComparableRequirement], list[str]]:
 	"""
 	Parse the given ``requirements.txt`` content.
@@ -153,6 +246,7 @@ def parse_requirements_txt(content: bytes) -> tuple[set[ComparableRequirement],
 	return requirements, invalid
 
 
+@_cache_by_content
 def parse_pyproject_toml(content: bytes) -> tuple[set[ComparableRequirement], list[str]]:
 	"""
 	Parse the given ``pyproject.toml`` content.
@@ -188,6 +282,7 @@ def parse_pyproject_toml(content: bytes) -> tuple[set[ComparableRequirement], li
 	return requirements, invalid_lines
 
 
+@_cache_by_content
 def parse_setup_cfg(content: bytes) -> tuple[set[ComparableRequirement], list[str]]:
 	"""
 	Parse the given ``setup.cfg`` content.
@@ -222,6 +317,7 @@ def parse_setup_cfg(content: bytes) -> tuple[set[ComparableRequirement], list[st
 	return requirements, invalid_lines
 
 
+@_cache_by_content
 def parse_setup_py(content: bytes) -> tuple[set[ComparableRequirement], list[str]]:
 	"""
 	Parse the given ``setup.cfg`` content.
@@ -310,9 +406,17 @@ def get_parse_functions(repository_name: str, default_branch: str = "master") ->
 	:param default_branch: The repository's default branch name.
 	"""
 
-	try:
-		files = get_our_config(repository_name, default_branch)
-	except (requests.HTTPError, KeyError):
+	snapshot = _get_snapshot(repository_name, default_branch)
+
+	if snapshot is not None:
+		files = snapshot["config"]
+	else:
+		try:
+			files = get_our_config(repository_name, default_branch)
+		except (requests.HTTPError, KeyError):
+			files = None
+
+	if files is None:
 		return [
 				(parse_requirements_txt, REQUIREMENTS_TXT, True),
 				(parse_pyproject_toml, PYPROJECT_TOML, True),
@@ -330,6 +434,45 @@ def get_parse_functions(repository_name: str, default_branch: str = "master") ->
 		return lookup_map
 
 
+def _get_snapshot(
+		repository_name: str,
+		default_branch: Optional[str] = None,
+		) -> Optional[graphql.RepositorySnapshot]:
+	# Returns the repository's snapshot from the GraphQL API, if enabled and (if given) it is for the requested branch.
+
+	if not graphql.ENABLED:
+		return None
+
+	try:
+		snapshot = graphql.get_snapshot(repository_name)
+	except requests.RequestException:
+		return None
+
+	if snapshot is None or default_branch not in {None, snapshot["default_branch"]}:
+		return None
+
+	return snapshot
+
+
+def _get_requirements(
+		repository_name: str,
+		default_branch: str,
+		filename: str,
+		parse_func: Parser,
+		snapshot: Optional[graphql.RepositorySnapshot],
+		) -> tuple[set[ComparableRequirement], list[str]]:
+	# Parse the requirements from the snapshot if there is one, otherwise from the raw file.
+
+	if snapshot is None:
+		return get_requirements_from_github(repository_name, default_branch, file=filename, parse_func=parse_func)
+
+	content = snapshot["files"].get(filename)
+	if content is None:
+		raise requests.HTTPError(f"404 Not Found: {filename}")
+
+	return parse_func(content.encode("UTF-8"))
+
+
 def get_repo_requirements(
 		repository_name: str,
 		default_branch: str = "master",
@@ -355,19 +498,23 @@ def get_repo_requirements(
 	* and whether the file's requirements should count towards the overall status.
 	"""
 
-	output = []
+	snapshot = _get_snapshot(repository_name, default_branch)
+	parse_functions = get_parse_functions(repository_name, default_branch)
 
-	for function, filename, counts in get_parse_functions(repository_name, default_branch):
+	def get_requirements(parser: ParserData) -> Optional[tuple[set[ComparableRequirement], list[str]]]:
+		function, filename, _ = parser
 		try:
-			requirements, invalid_lines = get_requirements_from_github(
-				repository_name,
-				default_branch,
-				file=filename,
-				parse_func=function,
-			)
+			return _get_requirements(repository_name, default_branch, filename, function, snapshot)
 		except (requests.HTTPError, SkipFile):
-			continue
-		else:
+			return None
+
+	# The files are downloaded concurrently rather than one after another.
+	results = map_concurrently(get_requirements, parse_functions, limit=len(parse_functions))
+
+	output = []
+	for (_, filename, counts), result in zip(parse_functions, results):
+		if result is not None:
+			requirements, invalid_lines = result
 			output.append((filename, requirements, invalid_lines, counts))
 
 	if output:
@@ -376,6 +523,65 @@ def get_repo_requirements(
 		raise NotImplementedError
 
 
+def get_repo_fingerprint(repository_name: str, default_branch: str = "master") -> str:
+	"""
+	Returns a string which changes whenever any of the files :func:`~.get_repo_requirements` reads change.
+
+	The files are obtained in the same way, so this costs little more than reading them from the cache.
+
+	:param repository_name: The repository's full name.
+	:param default_branch: The repository's default branch name.
+	"""
+
+	snapshot = _get_snapshot(repository_name, default_branch)
+	if snapshot is not None:
+		return f"{PARSE_CACHE_PREFIX}:{snapshot['oid']}"
+
+	etags: list[tuple[str, bool, Optional[str]]] = []
+	for _, filename, counts in get_parse_functions(repository_name, default_branch):
+		try:
+			etags.append((filename, counts, _get_raw_file(repository_name, default_branch, filename)[1]))
+		except requests.HTTPError:
+			etags.append((filename, counts, None))
+
+	return f"{PARSE_CACHE_PREFIX}:{hashlib.sha256(repr(etags).encode('UTF-8')).hexdigest()}"
+
+
+def get_file_requirements(
+		repository_name: str,
+		filename: str,
+		default_branch: str = "master",
+		) -> tuple[set[ComparableRequirement], list[str], bool]:
+	"""
+	Returns the requirements specified in a single file of the given repository.
+
+	:param repository_name: The repository's full name.
+	:param filename: The file to parse, which must be one of those returned by :func:`~.get_parse_functions`.
+	:param default_branch: The repository's default branch name.
+
+	:returns: A set of requirements listed in the file, a list of syntactically invalid lines,
+		and whether the file's requirements should count towards the overall status.
+
+	:raises: :exc:`KeyError` if the file isn't searched for requirements,
+		:exc:`~.SkipFile` if it doesn't contain any, or :exc:`requests.HTTPError` if it can't be downloaded.
+	"""
+
+	snapshot = _get_snapshot(repository_name, default_branch)
+
+	for function, parse_filename, counts in get_parse_functions(repository_name, default_branch):
+		if parse_filename == filename:
+			requirements, invalid_lines = _get_requirements(
+				repository_name,
+				default_branch,
+				filename,
+				function,
+				snapshot,
+			)
+			return requirements, invalid_lines, counts
+
+	raise KeyError(filename)
+
+
 def _format_internal_link(req: ComparableRequirement, data: dict[str, Any]) -> str:
 	if data["dependency_dash_url"]:
 		return f'<a href="{data["dependency_dash_url"]}" title="View Dependencies">{req.name}</a>'
@@ -383,9 +589,11 @@ def _format_internal_link(req: ComparableRequirement, data: dict[str, Any]) -> s
 		return req.name
 
 
-def _bad_repo_badge(reason: str) -> Response:
-	badge_svg = badge(left_text="repository", right_text=reason, right_color="silver")
-	return Response(badge_svg, content_type="image/svg+xml;charset=utf-8", status=200)
+def _bad_repo_badge(reason: str, cache_key: Optional[str] = None, source: str = '') -> Response:
+	# this package
+	from dependency_dash.badges import render_badge, serve_badge
+
+	return serve_badge(render_badge("repository", reason, "silver"), cache_key, source)
 
 
 def iter_repos_for_user(
@@ -405,6 +613,188 @@ def iter_repos_for_user(
 	yield from user_or_org._iter(30, url, ShortRepository, params)  # type: ignore[misc, arg-type]
 
 
+@timed("github-repository")
+def get_repository(username: str, repository: str) -> Optional[RepositoryMetadata]:
+	"""
+	Returns the full name and default branch of the given repository.
+
+	The metadata is cached for :py:data:`~.REPOSITORY_MAX_AGE` seconds, after which it is revalidated
+	with a conditional request (which doesn't count towards GitHub's rate limit if the repository is unchanged).
+
+	:param username: The user or organization that owns the repository.
+	:param repository: The repository name.
+
+	:returns: The repository's metadata, or :py:obj:`None` if the repository doesn't exist.
+	"""
+
+	# GitHub's user and repository names are case insensitive.
+	key = f"{username}/{repository}".lower()
+
+	metadata = REPOSITORY_CACHE.get(key)
+	if metadata is not None:
+		return metadata
+
+	snapshot = _get_snapshot(f"{username}/{repository}")
+	if snapshot is not None:
+		metadata = RepositoryMetadata(snapshot["full_name"], snapshot["default_branch"])
+		REPOSITORY_CACHE.set(key, metadata, expires=snapshot["fetched"] + graphql.MAX_AGE)
+		return metadata
+
+	# this package
+	from dependency_dash.github._env import GITHUB
+
+	cache = get_cache()
+	cache_key = f"github/{key}/repository.json"
+	url = GITHUB._build_url("repos", username, repository)
+
+	def get_fresh(data: dict[str, Any]) -> Optional[RepositoryMetadata]:
+		# Returns the metadata from the cached data, unless it has expired.
+		if data and datetime.fromisoformat(data["expires"]) > utcnow():
+			record_cache("github-repository", "hit")
+			metadata = RepositoryMetadata(data["full_name"], data["default_branch"])
+			REPOSITORY_CACHE.set(key, metadata, expires=datetime.fromisoformat(data["expires"]).timestamp())
+			return metadata
+
+		return None
+
+	# Only wait for other requests for the repository if it needs fetching.
+	if is_missing(cache_key):
+		record_cache("github-repository", "negative")
+		return None
+
+	data: dict[str, Any] = cache.get_json(cache_key) or {}
+	metadata = get_fresh(data)
+	if metadata is not None:
+		return metadata
+
+	with single_flight(f"github/{key}/repository"):
+		# Another thread or process may have fetched the repository while this one was waiting.
+		if is_missing(cache_key):
+			record_cache("github-repository", "negative")
+			return None
+
+		data = cache.get_json(cache_key) or {}
+		metadata = get_fresh(data)
+		if metadata is not None:
+			return metadata
+
+		headers = {"If-None-Match": data["etag"]} if data.get("etag") else {}
+		try:
+			response = GITHUB.session.get(url, headers=headers, timeout=10)
+		except requests.RequestException:
+			if data:
+				# GitHub can't be reached. The repository was found before, so use that.
+				return RepositoryMetadata(data["full_name"], data["default_branch"])
+			raise
+
+		record_cache("github-repository", "revalidated" if response.status_code == 304 else "miss")
+
+		if response.status_code == 404:
+			mark_missing(cache_key)
+			return None
+		elif response.status_code == 200:
+			repo_json = response.json()
+			data = {
+					"etag": response.headers.get("etag"),
+					"full_name": repo_json["full_name"],
+					"default_branch": repo_json["default_branch"],
+					}
+		elif response.status_code != 304:
+			if data and (response.status_code in {403, 429} or response.status_code >= 500):
+				# Rate limited, or GitHub is having problems. The repository was found before, so use that.
+				return RepositoryMetadata(data["full_name"], data["default_branch"])
+
+			raise requests.HTTPError(
+					f"An error occurred when obtaining the repository {username}/{repository}: "
+					f"HTTP Status {response.status_code}",
+					response=response,
+					)
+
+		expires = utcnow() + timedelta(seconds=REPOSITORY_MAX_AGE)
+		data["expires"] = expires.isoformat()
+		cache.set_json(cache_key, data)
+
+	metadata = RepositoryMetadata(data["full_name"], data["default_branch"])
+	REPOSITORY_CACHE.set(key, metadata, expires=expires.timestamp())
+	return metadata
+
+
+def get_raw_file(repository: str, ref: str, path: str) -> bytes:
+	"""
+	Download a file from GitHub, caching it until it expires.
+
+	Every reader of the file (e.g. the config reader and the requirements parsers) shares the cached copy,
+	so each file is requested at most once per expiry period, and then revalidated with its ETag.
+
+	:param repository: The repository to obtain the file from (in the form ``<user>/<repo>``).
+	:param ref: The branch, tag or commit to obtain the file from (e.g. ``'master'``).
+	:param path: The file to download (as a full path relative to the repository root).
+
+	:raises: :exc:`requests.HTTPError` if the file doesn't exist or can't be downloaded.
+	"""
+
+	return _get_raw_file(repository, ref, path)[0]
+
+
+@timed("github-file")
+def _get_raw_file(repository: str, ref: str, path: str) -> tuple[bytes, str]:
+	# Returns the file's content and ETag. See get_raw_file.
+
+	cache = get_cache()
+	blob_key = f"github/{repository}/raw/{ref}/{path}.dat"
+	meta_key = f"github/{repository}/raw/{ref}/{path}.json"
+	url = f"{RAW_URL}/{repository}/{ref}/{path}"
+
+	def read_cache() -> tuple[Optional[dict[str, str]], Optional[bytes]]:
+		# Returns the cached metadata and content, if any, or raises an error if the file is known not to exist.
+		if is_missing(blob_key):
+			record_cache("github-raw", "negative")
+			raise requests.HTTPError(f"404 Not Found: {url}")
+
+		return cache.get_json(meta_key), cache.get(blob_key)
+
+	# Only wait for other requests for the file if it needs downloading.
+	meta, content = read_cache()
+	if meta is not None and content is not None and datetime.fromisoformat(meta["expires"]) > utcnow():
+		record_cache("github-raw", "hit")
+		return content, meta["etag"]
+
+	with single_flight(f"github/{repository}/raw/{ref}/{path}"):
+		# Another thread or process may have downloaded the file while this one was waiting.
+		meta, content = read_cache()
+
+		if meta is None or content is None:
+			response = get_session().get(url, timeout=10)
+		else:
+			if datetime.fromisoformat(meta["expires"]) > utcnow():
+				# Nothing changed
+				record_cache("github-raw", "hit")
+				return content, meta["etag"]
+
+			response = get_session().get(url, timeout=10, headers={"If-None-Match": meta["etag"]})
+
+		record_cache("github-raw", "revalidated" if response.status_code == 304 else "miss")
+
+		if response.status_code == 404:
+			mark_missing(blob_key)
+		if response.status_code not in (200, 304):
+			raise requests.HTTPError(f"{response.status_code} Error: {url}")  # TODO: better error
+
+		if response.status_code == 200:
+			content = response.content
+			cache.set(blob_key, content)
+
+		meta = {
+				"etag": response.headers["etag"],
+				"expires": strptime(response.headers["expires"], EXPIRES_FORMAT).isoformat(),
+				}
+		cache.set_json(meta_key, meta)
+
+	# Conditional requests are only made when the content is cached, so a 304 response always has content.
+	assert content is not None
+	return content, meta["etag"]
+
+
 def get_requirements_from_github(
 		repository: str,
 		default_branch: str,
@@ -422,56 +812,7 @@ def get_requirements_from_github(
 	:returns: A set of requirements listed in the file, and a list of syntactically invalid lines.
 	"""
 
-	datafile = CACHE_DIR / repository / f"{file}.dat"
-	datafile.parent.maybe_make(parents=True)
-	url = f"https://raw.githubusercontent.com/{repository}/{default_branch}/{file}"
-
-	etag: str
-	expires: datetime
-
-	try:
-		data: list[str] = datafile.read_lines()
-	except FileNotFoundError:
-		response = requests.get(url, timeout=10)
-		if response.status_code != 200:
-			raise requests.HTTPError  # TODO: better error
-
-		etag = response.headers["etag"]
-		expires = strptime(response.headers["expires"], EXPIRES_FORMAT)
-		content = response.content
-		requirements, invalid_lines = parse_func(content)
-	else:
-		etag = data[0]
-		expires = datetime.fromisoformat(data[1])
-		requirements_block = data[2:]
-		marker = requirements_block.index('\ue000')
-		requirements = set(map(ComparableRequirement, requirements_block[:marker]))
-		invalid_lines = requirements_block[marker + 1:]
-
-		if expires > utcnow():
-			# Nothing changed
-			return requirements, invalid_lines
-		else:
-			response = requests.get(url, timeout=10, headers={"If-None-Match": etag})
-			if response.status_code not in (200, 304):
-				raise requests.HTTPError  # TODO: better error
-
-			if response.status_code == 200:
-				content = response.content
-				requirements, invalid_lines = parse_func(content)
-
-			etag = response.headers["etag"]
-			expires = strptime(response.headers["expires"], EXPIRES_FORMAT)
-
-	data = [
-			etag,
-			expires.isoformat(),
-			*map(str, requirements),
-			'\ue000',
-			*invalid_lines,
-			]
-	datafile.write_lines(data)
-	return requirements, invalid_lines
+	return parse_func(get_raw_file(repository, default_branch, file))
 
 
 def get_our_config(
@@ -487,59 +828,19 @@ def get_our_config(
 	:returns: The file's contents, parsed as a dictionary.
 	"""
 
-	# This makes another request, but I can't find a better way to lay everything out.
-
-	datafile = CACHE_DIR / repository / "dependency-dash.dat"
-	datafile.parent.maybe_make(parents=True)
-	url = f"https://raw.githubusercontent.com/{repository}/{default_branch}/pyproject.toml"
-
-	etag: str
-	expires: datetime
+	content, etag = _get_raw_file(repository, default_branch, PYPROJECT_TOML)
 
-	try:
-		data: dict[str, Any] = datafile.load_json()
-	except FileNotFoundError:
-		response = requests.get(url, timeout=10)
-		if response.status_code != 200:
-			raise requests.HTTPError  # TODO: better error
-
-		etag = response.headers["etag"]
-		expires = strptime(response.headers["expires"], EXPIRES_FORMAT)
-		config = dom_toml.loads(response.text)
-		if "dependency-dash" not in config.get("tool", {}):
-			raise KeyError
-
-		files = config["tool"]["dependency-dash"]
+	# The file is only parsed again when its content changes.
+	key = f"{repository}/{default_branch}"
+	cached = CONFIG_CACHE.get(key)
 
+	if cached is not None and cached[0] == etag:
+		config = cached[1]
 	else:
-		etag = data["etag"]
-		expires = datetime.fromisoformat(data["expires"])
-		files = data["files"]
+		config = dom_toml.loads(content.decode("UTF-8"))
+		CONFIG_CACHE.set(key, (etag, config))
 
-		if expires > utcnow():
-			# Nothing changed
-			return files
-		else:
-			response = requests.get(url, timeout=10, headers={"If-None-Match": etag})
-			if response.status_code not in (200, 304):
-				raise requests.HTTPError  # TODO: better error
-
-			if response.status_code == 200:
-				config = dom_toml.loads(response.text)
-				if "dependency-dash" not in config.get("tool", {}):
-					raise KeyError
-				files = config["tool"]["dependency-dash"]
-
-			etag = response.headers["etag"]
-			expires = strptime(response.headers["expires"], EXPIRES_FORMAT)
-
-	data = {
-			"etag": etag,
-			"expires": expires.isoformat(),
-			"files": files,
-			}
-	datafile.dump_json(data)
-	return files
+	return config["tool"]["dependency-dash"]
 
 
 #
@@ -34,6 +34,9 @@ import github3.repos.contents
 import platformdirs
 from domdf_python_tools.paths import PathPlus
 
+# this package
+from dependency_dash.sessions import get_adapter
+
 try:
 	# 3rd party
 	from dotenv import load_dotenv
@@ -45,5 +48,10 @@ else:
 if "GITHUB_TOKEN" not in os.environ:
 	raise ValueError("'GITHUB_TOKEN' environment variable not found.")
 
+#: The base URL of the GitHub REST API.
+API_URL = os.getenv("DD_GITHUB_API_URL", "https://api.github.com")
+
 GITHUB = github3.GitHub(token=os.getenv("GITHUB_TOKEN"))
+GITHUB.session.base_url = API_URL
+GITHUB.session.mount("https://", get_adapter())
 CACHE_DIR = PathPlus(platformdirs.user_cache_dir("dependency_dash")) / "github"
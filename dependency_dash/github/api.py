@@ -31,12 +31,10 @@ from typing import Any
 from urllib.parse import urljoin
 
 # 3rd party
-import github3
 from flask_restx import Namespace, Resource, fields  # type: ignore[import-untyped]
 
 # this package
 from dependency_dash._app import app
-from dependency_dash.github._env import GITHUB
 from dependency_dash.pypi import get_dependency_status
 from dependency_dash.pypi.api import requirement_data_model
 
@@ -85,13 +83,12 @@ class GitHubProjectAPI(Resource):
 		Returns a JSON response, giving the status for each of the repository's dependencies.
 		"""
 
-		try:
-			repo = GITHUB.repository(username, repository)
-		except github3.exceptions.NotFoundError:
-			return error404("Repository not found")
-
 		# this package
-		from dependency_dash.github import get_repo_requirements
+		from dependency_dash.github import get_repo_requirements, get_repository
+
+		repo = get_repository(username, repository)
+		if repo is None:
+			return error404("Repository not found")
 
 		try:
 			data = get_repo_requirements(repo.full_name, repo.default_branch)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+#
+#  github/graphql.py
+"""
+Fetch the files which may contain a repository's requirements using GitHub's GraphQL API.
+
+A single query obtains the default branch, its head commit and the text of every candidate file
+for many repositories at once, instead of one REST call and up to five raw file downloads per repository.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import os
+import time
+from collections.abc import Iterable
+from typing import Any, Optional, TypedDict
+
+# 3rd party
+import dom_toml
+import requests
+
+# this package
+from dependency_dash.caching import is_missing, mark_missing, single_flight
+from dependency_dash.metrics import record_cache
+from dependency_dash.storage import get_cache
+from dependency_dash.timing import timed
+
+__all__ = ["RepositorySnapshot", "get_snapshot", "get_snapshots"]
+
+#: Whether to use the GraphQL API to fetch repositories' files.
+ENABLED = bool(os.getenv("DD_GITHUB_GRAPHQL"))
+
+#: The URL of the GitHub GraphQL API.
+GRAPHQL_URL = os.getenv("DD_GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+
+#: The time, in seconds, for which a snapshot is used before fetching it again.
+MAX_AGE = 300
+
+#: The files fetched for every repository.
+CANDIDATE_FILES = ("requirements.txt", "pyproject.toml", "setup.cfg", "setup.py")
+
+
+class RepositorySnapshot(TypedDict):
+	"""
+	The files which may contain a repository's requirements, as of the head of its default branch.
+	"""
+
+	#: The repository's full name, as given by GitHub.
+	full_name: str
+
+	#: The name of the repository's default branch.
+	default_branch: str
+
+	#: The SHA of the commit the files were obtained from.
+	oid: str
+
+	#: The time (as a Unix timestamp) the snapshot was obtained.
+	fetched: float
+
+	#: The ``[tool.dependency-dash]`` table from ``pyproject.toml``, or :py:obj:`None` if there isn't one.
+	config: Optional[dict[str, dict[str, Any]]]
+
+	#: Mapping of filenames to their text, or :py:obj:`None` if the file doesn't exist.
+	files: dict[str, Optional[str]]
+
+
+@timed("github-graphql")
+def _query(query: str, variables: dict[str, str]) -> dict[str, Any]:
+	# this package
+	from dependency_dash.github._env import GITHUB
+
+	response = GITHUB.session.post(
+			GRAPHQL_URL,
+			json={"query": query, "variables": variables},
+			timeout=30,
+			)
+	response.raise_for_status()
+
+	result = response.json()
+	if result.get("data") is None:
+		message = "; ".join(error.get("message", '') for error in result.get("errors", []))
+		raise requests.HTTPError(f"GraphQL query failed: {message}")
+
+	return result["data"]
+
+
+def _build_query(repositories: list[str], expressions: dict[str, list[str]]) -> tuple[str, dict[str, str]]:
+	# Each repository is aliased ``r<n>`` and each of its files ``f<m>``,
+	# with the names passed as variables so they don't need escaping.
+
+	parameters = []
+	fields = []
+	variables = {}
+
+	for idx, full_name in enumerate(repositories):
+		owner, name = full_name.split('/', 1)
+		variables[f"o{idx}"] = owner
+		variables[f"n{idx}"] = name
+		parameters.append(f"$o{idx}: String!, $n{idx}: String!")
+
+		blobs = []
+		for file_idx, expression in enumerate(expressions[full_name]):
+			variables[f"e{idx}_{file_idx}"] = expression
+			parameters.append(f"$e{idx}_{file_idx}: String!")
+			blobs.append(f"f{file_idx}: object(expression: $e{idx}_{file_idx}) {{ ... on Blob {{ text isTruncated }} }}")
+
+		fields.append(
+				f"r{idx}: repository(owner: $o{idx}, name: $n{idx}) {{ "
+				"nameWithOwner defaultBranchRef { name target { oid } } "
+				f"{' '.join(blobs)} }}"
+				)
+
+	query = f"query({', '.join(parameters)}) {{ {' '.join(fields)} }}"
+	return query, variables
+
+
+def _get_config(pyproject_toml: Optional[str]) -> Optional[dict[str, dict[str, Any]]]:
+	if not pyproject_toml:
+		return None
+
+	try:
+		config = dom_toml.loads(pyproject_toml)
+	except ValueError:  # TOMLDecodeError
+		# The same as if there were no config; parsing the file for requirements will report the error.
+		return None
+
+	tool = config.get("tool")
+	if not isinstance(tool, dict) or not isinstance(tool.get("dependency-dash"), dict):
+		return None
+
+	return tool["dependency-dash"]
+
+
+def _blob_text(full_name: str, oid: str, filename: str, blob: Optional[dict[str, Any]]) -> Optional[str]:
+	# Returns the file's text from the query result.
+	# GitHub truncates the text of large files, in which case the whole file is downloaded instead.
+
+	if blob is None:
+		return None
+
+	if blob.get("isTruncated"):
+		# this package
+		from dependency_dash.github import get_raw_file
+
+		return get_raw_file(full_name, oid, filename).decode("UTF-8")
+
+	return blob.get("text")
+
+
+def _fetch_snapshots(repositories: list[str]) -> dict[str, Optional[RepositorySnapshot]]:
+	expressions = {full_name: [f"HEAD:{filename}" for filename in CANDIDATE_FILES] for full_name in repositories}
+	data = _query(*_build_query(repositories, expressions))
+
+	snapshots: dict[str, Optional[RepositorySnapshot]] = {}
+	extra_files: dict[str, list[str]] = {}
+
+	for idx, full_name in enumerate(repositories):
+		repo_data = data.get(f"r{idx}")
+		if repo_data is None or repo_data["defaultBranchRef"] is None:
+			# Not found, or empty
+			snapshots[full_name] = None
+			continue
+
+		oid = repo_data["defaultBranchRef"]["target"]["oid"]
+
+		files = {}
+		for file_idx, filename in enumerate(CANDIDATE_FILES):
+			files[filename] = _blob_text(repo_data["nameWithOwner"], oid, filename, repo_data.get(f"f{file_idx}"))
+
+		config = _get_config(files["pyproject.toml"])
+		snapshots[full_name] = {
+				"full_name": repo_data["nameWithOwner"],
+				"default_branch": repo_data["defaultBranchRef"]["name"],
+				"oid": oid,
+				"fetched": time.time(),
+				"config": config,
+				"files": files,
+				}
+
+		if config:
+			missing = [filename for filename in config if filename not in files]
+			if missing:
+				extra_files[full_name] = missing
+
+	if extra_files:
+		# Files listed in the config are fetched from the same commit, so the snapshot is consistent.
+		repositories = list(extra_files)
+		expressions = {}
+		for full_name in repositories:
+			oid = snapshots[full_name]["oid"]  # type: ignore[index]
+			expressions[full_name] = [f"{oid}:{filename}" for filename in extra_files[full_name]]
+
+		data = _query(*_build_query(repositories, expressions))
+
+		for idx, full_name in enumerate(repositories):
+			repo_data = data.get(f"r{idx}") or {}
+			snapshot = snapshots[full_name]
+			assert snapshot is not None
+
+			for file_idx, filename in enumerate(extra_files[full_name]):
+				blob = repo_data.get(f"f{file_idx}")
+				snapshot["files"][filename] = _blob_text(snapshot["full_name"], snapshot["oid"], filename, blob)
+
+	return snapshots
+
+
+def get_snapshots(repositories: Iterable[str]) -> dict[str, Optional[RepositorySnapshot]]:
+	"""
+	Returns snapshots of the given repositories, fetching any not cached in a single query.
+
+	:param repositories: The repositories' full names (in the form ``<user>/<repo>``).
+
+	:returns: A mapping of the given names to the snapshots,
+		or to :py:obj:`None` for repositories which don't exist or have no commits.
+
+	:raises: :exc:`requests.HTTPError` if the query fails.
+	"""
+
+	cache = get_cache()
+	snapshots: dict[str, Optional[RepositorySnapshot]] = {}
+	to_fetch = []
+
+	for full_name in repositories:
+		cache_key = f"github/{full_name}/snapshot.json"
+
+		if is_missing(cache_key):
+			record_cache("github-snapshot", "negative")
+			snapshots[full_name] = None
+			continue
+
+		snapshot: Optional[RepositorySnapshot] = cache.get_json(cache_key)
+		if snapshot is not None and snapshot["fetched"] + MAX_AGE > time.time():
+			record_cache("github-snapshot", "hit")
+			snapshots[full_name] = snapshot
+		else:
+			record_cache("github-snapshot", "miss")
+			to_fetch.append(full_name)
+
+	if to_fetch:
+		for full_name, fetched_snapshot in _fetch_snapshots(to_fetch).items():
+			cache_key = f"github/{full_name}/snapshot.json"
+
+			if fetched_snapshot is None:
+				mark_missing(cache_key)
+			else:
+				cache.set_json(cache_key, fetched_snapshot)
+
+			snapshots[full_name] = fetched_snapshot
+
+	return snapshots
+
+
+def get_snapshot(repository: str) -> Optional[RepositorySnapshot]:
+	"""
+	Returns a snapshot of the given repository.
+
+	:param repository: The repository's full name (in the form ``<user>/<repo>``).
+
+	:returns: The snapshot, or :py:obj:`None` if the repository doesn't exist or has no commits.
+
+	:raises: :exc:`requests.HTTPError` if the query fails.
+	"""
+
+	with single_flight(f"github/{repository}/snapshot"):
+		return get_snapshots([repository])[repository]
@@ -27,12 +27,19 @@ Routes for the GitHub frontend.
 #
 
 # stdlib
+import os
+import re
+import traceback
 from collections import Counter
+from contextlib import suppress
 from operator import itemgetter
 from sys import intern
+from typing import Union
+from urllib.parse import urlencode
 
 # 3rd party
 import github3
+import requests
 from flask import Response, render_template, request
 from packaging.requirements import InvalidRequirement
 from packaging.version import InvalidVersion
@@ -40,12 +47,24 @@ from shippinglabel.requirements import ComparableRequirement
 
 # this package
 from dependency_dash._app import app
-from dependency_dash.badges import make_badge, serve_badge
-from dependency_dash.github import _bad_repo_badge, get_repo_requirements, iter_repos_for_user
+from dependency_dash.badges import get_cached_badge, make_badge, serve_badge
+from dependency_dash.concurrency import map_concurrently
+from dependency_dash.github import (
+		SkipFile,
+		_bad_repo_badge,
+		get_file_requirements,
+		get_parse_functions,
+		get_repo_fingerprint,
+		get_repo_requirements,
+		get_repository,
+		graphql,
+		iter_repos_for_user,
+		)
 from dependency_dash.github._env import GITHUB
 from dependency_dash.github.api import GitHubProjectAPI  # noqa: F401
-from dependency_dash.htmx import htmx
+from dependency_dash.htmx import htmx, stream_htmx_template
 from dependency_dash.pypi import _format_internal_link, format_project_links, get_dependency_status
+from dependency_dash.timing import span
 from dependency_dash.utils import _normalize
 
 __all__ = [
@@ -54,11 +73,23 @@ __all__ = [
 		"github_project",
 		"github_user",
 		"htmx_github_project",
+		"htmx_github_project_badge",
+		"htmx_github_project_file",
 		"htmx_github_user",
 		]
 
 STATUS_TEMPLATE_FILE = intern("repository_status.html")
 
+#: Either ``"batch"`` (evaluate each page of a user's repositories in one request)
+#: or ``"row"`` (evaluate each repository in its own request as it is scrolled into view).
+STATUS_MODE = os.getenv("DD_GITHUB_STATUS_MODE", "batch")
+
+#: The maximum number of repositories evaluated concurrently in batch mode.
+STATUS_WORKERS = int(os.getenv("DD_GITHUB_STATUS_CONCURRENCY", 8))
+
+#: The maximum number of repositories evaluated in one batch (one page of the repositories list).
+BATCH_SIZE = 30
+
 
 @app.route("/github/")
 def github() -> Response:
@@ -80,9 +111,8 @@ def github_project(username: str, repository: str) -> Response:
 
 	project_name = f"{username}/{repository}"
 
-	try:
-		repo = GITHUB.repository(username, repository)
-	except github3.exceptions.NotFoundError:
+	repo = get_repository(username, repository)
+	if repo is None:
 		return Response(
 				render_template(
 						"project_404.html",
@@ -107,7 +137,61 @@ def github_project(username: str, repository: str) -> Response:
 @htmx(app, "/github/<username>/<repository>/<branch>/")
 def htmx_github_project(username: str, repository: str, branch: str) -> str:
 	"""
-	HTMX callback for obtaining the requirements table for the given repository.
+	HTMX callback for obtaining the skeleton of the requirements tables for the given repository.
+
+	Each file's table, and the overall badge, is then loaded by a separate request.
+
+	:param username: The user or organization that owns the repository.
+	:param repository: The repository name.
+	:param branch: The repository's default branch name.
+	"""
+
+	parse_functions = get_parse_functions(f"{username}/{repository}", branch)
+
+	return render_template(
+			"dependency_skeleton.html",
+			files=[(filename, counts) for _, filename, counts in parse_functions],
+			username=username,
+			repository=repository,
+			branch=branch,
+			)
+
+
+@htmx(app, "/github/<username>/<repository>/<branch>/files/<path:filename>")
+def htmx_github_project_file(username: str, repository: str, branch: str, filename: str) -> Union[str, Response]:
+	"""
+	HTMX callback for obtaining the requirements table for a single file in the given repository.
+
+	:param username: The user or organization that owns the repository.
+	:param repository: The repository name.
+	:param branch: The repository's default branch name.
+	:param filename: The file containing the requirements.
+	"""
+
+	try:
+		requirements, invalid, counts = get_file_requirements(f"{username}/{repository}", filename, branch)
+	except (requests.HTTPError, SkipFile, KeyError):
+		# Remove the placeholder
+		return ''
+
+	# TODO: list invalid requirements
+	return stream_htmx_template(
+			"dependency_file.html",
+			filename=filename,
+			requirements=requirements,
+			invalid=invalid,
+			counts=counts,
+			get_dependency_status=get_dependency_status,
+			format_project_links=format_project_links,
+			normalize=_normalize,
+			format_internal_link=_format_internal_link,
+			)
+
+
+@htmx(app, "/github/<username>/<repository>/<branch>/badge/")
+def htmx_github_project_badge(username: str, repository: str, branch: str) -> str:
+	"""
+	HTMX callback for obtaining the overall status badge for the given repository.
 
 	:param username: The user or organization that owns the repository.
 	:param repository: The repository name.
@@ -118,18 +202,17 @@ def htmx_github_project(username: str, repository: str, branch: str) -> str:
 		data = get_repo_requirements(f"{username}/{repository}", branch)
 	except NotImplementedError:
 		return render_template("no_supported_files.html")
-	else:
 
-		# TODO: list invalid requirements
-		return render_template(
-				"dependency_table.html",
-				data=data,
-				get_dependency_status=get_dependency_status,
-				format_project_links=format_project_links,
-				make_badge=make_badge,
-				normalize=_normalize,
-				format_internal_link=_format_internal_link,
-				)
+	all_requirements: list[ComparableRequirement] = []
+	for filename, requirements, invalid, include in data:
+		if include:
+			all_requirements.extend(requirements)
+
+	return render_template(
+			"dependency_badge.html",
+			badge_data=get_dependency_status(all_requirements),
+			make_badge=make_badge,
+			)
 
 
 @app.route("/github/<username>/<repository>/badge.svg")
@@ -141,17 +224,20 @@ def badge_github_project(username: str, repository: str) -> Response:
 	:param repository: The repository name.
 	"""
 
-	# TODO: etag caching
-
-	try:
-		repo = GITHUB.repository(username, repository)
-	except github3.exceptions.NotFoundError:
+	repo = get_repository(username, repository)
+	if repo is None:
 		return _bad_repo_badge("not found")
 
+	cache_key = f"github/{repo.full_name}".lower()
+	source = get_repo_fingerprint(repo.full_name, repo.default_branch)
+	cached_badge = get_cached_badge(cache_key, source)
+	if cached_badge is not None:
+		return cached_badge
+
 	try:
 		data = get_repo_requirements(repo.full_name, repo.default_branch)
 	except NotImplementedError:
-		return _bad_repo_badge("unsupported")
+		return _bad_repo_badge("unsupported", cache_key, source)
 
 	else:
 		all_requirements: list[ComparableRequirement] = []
@@ -159,9 +245,9 @@ def badge_github_project(username: str, repository: str) -> Response:
 			if include:
 				all_requirements.extend(requirements)
 
-		badge_svg = make_badge(get_dependency_status(all_requirements))
+		dependencies = list(get_dependency_status(all_requirements))
 
-		return serve_badge(badge_svg)
+		return serve_badge(make_badge(dependencies), cache_key, source, dependencies)
 
 
 @app.route("/github/<username>/")
@@ -188,65 +274,130 @@ def htmx_github_user(username: str) -> str:
 	:param username: The user or organization to display information for.
 	"""
 
-	if "repo" in request.args:
-		repo = GITHUB.repository(*request.args["repo"].split('/'))
+	if "repo" in request.args and "branch" in request.args and STATUS_MODE == "batch":
+		# Evaluate a whole page of repositories at once, returning out-of-band status cells.
+		batch = list(zip(request.args.getlist("repo"), request.args.getlist("branch")))[:BATCH_SIZE]
+		cells = []
 
-		try:
-			data = get_repo_requirements(repo.full_name, repo.default_branch)
-		except NotImplementedError:
-			return render_template(STATUS_TEMPLATE_FILE, status="unsupported")
+		if graphql.ENABLED:
+			# Fetch the files for every repository in one query; the evaluations below then read them from the cache.
+			with suppress(requests.RequestException):
+				graphql.get_snapshots(full_name for full_name, _ in batch)
 
 		try:
-			all_requirements: list[ComparableRequirement] = []
-			for filename, requirements, invalid, include in data:
-				if include:
-					all_requirements.extend(requirements)
-
-			dependencies = list(get_dependency_status(all_requirements))
-			status_counts = Counter(map(itemgetter(1), dependencies))
-
-			if status_counts.get("insecure", 0):
-				return render_template(
-						STATUS_TEMPLATE_FILE,
-						status=f'{status_counts["insecure"]} insecure',
-						status_class="status-insecure",
-						)
-			elif status_counts.get("outdated", 0):
-				return render_template(
-						STATUS_TEMPLATE_FILE,
-						status=f'{status_counts["outdated"]} outdated',
-						status_class="status-outdated",
-						)
-			elif status_counts.get("prerelease", 0):
-				return render_template(
-						STATUS_TEMPLATE_FILE,
-						status=f'{status_counts["prerelease"]} prerelease',
-						status_class="status-prerelease",
-						)
-			else:
-				return render_template(STATUS_TEMPLATE_FILE, status="up-to-date")
-
-		except (InvalidRequirement, InvalidVersion):
-			return render_template(STATUS_TEMPLATE_FILE, status="invalid")
+			statuses = list(
+					map_concurrently(
+							lambda repo: _get_repository_status_or_error(*repo),
+							batch,
+							limit=STATUS_WORKERS,
+							)
+					)
+		except Exception:
+			# Replace every cell, rather than leaving them all loading.
+			print(f"Exception getting the statuses of {username}'s repositories:")
+			traceback.print_exc()
+			statuses = [("error", "status-unsupported")] * len(batch)
+
+		for (full_name, _), (status, status_class) in zip(batch, statuses):
+			cells.append(
+					render_template(
+							STATUS_TEMPLATE_FILE,
+							status=status,
+							status_class=status_class,
+							cell_id=_status_cell_id(full_name),
+							)
+					)
+
+		return ''.join(cells)
+
+	if "repo" in request.args:
+		if "branch" in request.args:
+			status, status_class = _get_repository_status(request.args["repo"], request.args["branch"])
+		else:
+			repo = get_repository(*request.args["repo"].split('/', 1))
+			if repo is None:
+				return render_template(STATUS_TEMPLATE_FILE, status="not found", status_class="status-unsupported")
+			status, status_class = _get_repository_status(repo.full_name, repo.default_branch)
+
+		return render_template(STATUS_TEMPLATE_FILE, status=status, status_class=status_class)
 
 	page = int(request.args.get("page", 1))
 
-	try:
-		user = GITHUB.user(username)
-	except github3.exceptions.NotFoundError:
+	with span("github-user"):
 		try:
-			user = GITHUB.organization(username)
+			user = GITHUB.user(username)
 		except github3.exceptions.NotFoundError:
-			return "<h6>User not found.</h6>"
+			try:
+				user = GITHUB.organization(username)
+			except github3.exceptions.NotFoundError:
+				return "<h6>User not found.</h6>"
+
+		user_repos = list(iter_repos_for_user(user, page))
 
 	repositories = {}
+	batch_query = []
 
-	for repo in iter_repos_for_user(user, page):
-		repositories[repo.full_name] = ("loading...", "status-unsupported")
+	for repo in user_repos:
+		repositories[repo.full_name] = repo.default_branch
+		batch_query.extend([("repo", repo.full_name), ("branch", repo.default_branch)])
 
 	return render_template(
 			"repositories_table.html",
 			repositories=repositories,
 			data_url=f"/htmx/github/{username}/",
 			page=int(page) + 1,
+			batch=STATUS_MODE == "batch",
+			batch_query=urlencode(batch_query),
+			status_cell_id=_status_cell_id,
 			)
+
+
+def _status_cell_id(full_name: str) -> str:
+	# Escape characters other than letters, digits and hyphens so the ID is unique and a valid CSS selector.
+	return "status-" + re.sub(r"[^A-Za-z0-9-]", lambda m: f"_{ord(m.group()):x}", full_name)
+
+
+def _get_repository_status(full_name: str, branch: str) -> tuple[str, str]:
+	"""
+	Returns the status of the given repository, and the CSS class to display it with.
+
+	:param full_name: The repository's full name.
+	:param branch: The repository's default branch name.
+	"""
+
+	try:
+		data = get_repo_requirements(full_name, branch)
+	except NotImplementedError:
+		return "unsupported", "status-unsupported"
+
+	try:
+		all_requirements: list[ComparableRequirement] = []
+		for filename, requirements, invalid, include in data:
+			if include:
+				all_requirements.extend(requirements)
+
+		dependencies = list(get_dependency_status(all_requirements))
+		status_counts = Counter(map(itemgetter(1), dependencies))
+
+		if status_counts.get("insecure", 0):
+			return f'{status_counts["insecure"]} insecure', "status-insecure"
+		elif status_counts.get("outdated", 0):
+			return f'{status_counts["outdated"]} outdated', "status-outdated"
+		elif status_counts.get("prerelease", 0):
+			return f'{status_counts["prerelease"]} prerelease', "status-prerelease"
+		else:
+			return "up-to-date", "status-up-to-date"
+
+	except (InvalidRequirement, InvalidVersion):
+		return "invalid", "status-invalid"
+
+
+def _get_repository_status_or_error(full_name: str, branch: str) -> tuple[str, str]:
+	# An error evaluating one repository in a batch shouldn't affect the others.
+
+	try:
+		return _get_repository_status(full_name, branch)
+	except Exception:
+		print(f"Exception getting the status of {full_name}:")
+		traceback.print_exc()
+		return "error", "status-unsupported"
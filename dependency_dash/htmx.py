@@ -31,13 +31,14 @@ Helpers for htmx_.
 # stdlib
 import functools
 import traceback
-from typing import Any, Callable
+from collections.abc import Iterator
+from typing import Any, Callable, Union
 from urllib.parse import urljoin
 
 # 3rd party
-from flask import Flask, render_template
+from flask import Flask, Response, render_template, request, stream_template, stream_with_context
 
-__all__ = ["htmx"]
+__all__ = ["htmx", "stream_htmx_template"]
 
 
 def htmx(app: "Flask", rule: str, **options: Any) -> Callable:
@@ -55,7 +56,7 @@ def htmx(app: "Flask", rule: str, **options: Any) -> Callable:
 		endpoint = options.pop("endpoint", None)
 
 		@functools.wraps(f)
-		def rule_func(*args, **kwargs) -> str:
+		def rule_func(*args, **kwargs) -> Union[str, Response]:
 			try:
 				return f(*args, **kwargs)
 			except Exception as e:
@@ -67,3 +68,28 @@ def htmx(app: "Flask", rule: str, **options: Any) -> Callable:
 		return f
 
 	return decorator
+
+
+def stream_htmx_template(template_name: str, **context: Any) -> Response:
+	r"""
+	Render a template for an htmx route, sending each part of the output as soon as it has been rendered.
+
+	If an exception occurs while rendering, the error is shown in place of the rest of the output.
+
+	:param template_name:
+	:param \*\*context: Variables to make available in the template.
+	"""  # noqa: RST306
+
+	path = request.path
+	stream = stream_template(template_name, **context)
+
+	def generate() -> Iterator[str]:
+		try:
+			yield from stream
+		except Exception as e:
+			print(f"Exception in route {path}:")
+			traceback.print_exc()
+			yield render_template("htmx_exception.html", exception=e)
+
+	# Disable buffering by nginx etc. so each chunk reaches the browser as soon as possible.
+	return Response(stream_with_context(generate()), headers={"X-Accel-Buffering": "no"})
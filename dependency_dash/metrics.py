@@ -0,0 +1,700 @@
+#!/usr/bin/env python3
+#
+#  metrics.py
+"""
+Minimal metrics registry, exposed in the Prometheus text format at ``/metrics``.
+
+Each worker process has its own registry, which it periodically adds to the shared cache (see :func:`~.publish_metrics`),
+so a scrape reports the totals across all workers.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import atexit
+import bisect
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections.abc import Collection, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+# this package
+from dependency_dash.storage import get_cache
+
+__all__ = [
+		"CACHE_REQUESTS",
+		"CONNECTION_POOL_CONNECTIONS",
+		"CONNECTION_POOL_IDLE",
+		"CONNECTION_POOL_REQUESTS",
+		"Counter",
+		"Gauge",
+		"Histogram",
+		"MEMORY_CACHE_ENTRIES",
+		"MEMORY_CACHE_LOOKUPS",
+		"REGISTRY",
+		"REQUESTS",
+		"REQUEST_LATENCY",
+		"Registry",
+		"SINGLE_FLIGHT_CALLS",
+		"SINGLE_FLIGHT_COALESCED",
+		"UPSTREAM_IN_FLIGHT",
+		"UPSTREAM_LATENCY",
+		"UPSTREAM_REQUESTS",
+		"publish_metrics",
+		"record_cache",
+		"render_shared_metrics",
+		"start_metrics_thread",
+		"watch_memory_cache",
+		]
+
+logger = logging.getLogger(__name__)
+
+#: Whether the metrics are served at ``/metrics``.
+ENABLED = bool(os.getenv("DD_METRICS"))
+
+#: If set, requests for ``/metrics`` must have an ``Authorization: Bearer <token>`` header with this token.
+TOKEN = os.getenv("DD_METRICS_TOKEN") or None
+
+#: How often, in seconds, each worker adds its metrics to the shared cache.
+PUBLISH_INTERVAL = float(os.getenv("DD_METRICS_INTERVAL", 15))
+
+#: The key of the totals of the counters and histograms from all workers in the shared cache.
+TOTALS_KEY = "metrics/totals.json"
+
+#: The prefix of the keys of each worker's gauges in the shared cache.
+GAUGES_PREFIX = "metrics/gauges/"
+
+#: The default upper bounds, in seconds, of histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_LabelValues = tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+	if math.isinf(value):
+		return "+Inf" if value > 0 else "-Inf"
+	elif value == int(value):
+		return str(int(value))
+	else:
+		return repr(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+	if not names:
+		return ''
+
+	def escape(value: str) -> str:
+		return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+	return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class _Metric:
+	"""
+	Base class for metrics, which may have labels.
+
+	:param name: The metric's name.
+	:param documentation: A description of the metric.
+	:param labelnames: The names of the metric's labels.
+	"""
+
+	#: The Prometheus metric type.
+	type: str
+
+	def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = tuple(labelnames)
+		self._lock = threading.Lock()
+
+	def _label_values(self, labels: dict[str, str]) -> _LabelValues:
+		if set(labels) != set(self.labelnames):
+			raise ValueError(f"Expected labels {self.labelnames!r}, got {tuple(labels)!r}")
+
+		return tuple(str(labels[name]) for name in self.labelnames)
+
+	def _empty(self) -> "_Metric":
+		return type(self)(self.name, self.documentation, self.labelnames)
+
+	def export(self) -> list[Any]:
+		"""
+		Returns the metric's current values as JSON-serialisable data, for :meth:`~._Metric.merge`.
+		"""
+
+		raise NotImplementedError
+
+	def merge(self, exported: list[Any], sign: int = 1) -> None:
+		"""
+		Add values from :meth:`~._Metric.export`, possibly in another process, to the metric's values.
+
+		:param exported:
+		:param sign: ``-1`` to subtract the values instead.
+		"""
+
+		raise NotImplementedError
+
+	def samples(self) -> Iterator[tuple[str, str, float]]:
+		"""
+		Returns an iterator over ``(name, labels, value)`` tuples for the metric's current values.
+		"""
+
+		raise NotImplementedError
+
+	def render(self) -> str:
+		"""
+		Returns the metric in the Prometheus text format.
+		"""
+
+		lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+		lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+		return '\n'.join(lines)
+
+
+class Counter(_Metric):
+	"""
+	A value which only ever increases, such as the number of requests served.
+	"""
+
+	type = "counter"
+
+	def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+		super().__init__(name, documentation, labelnames)
+		self._values: dict[_LabelValues, float] = {}
+
+	def inc(self, amount: float = 1, **labels: str) -> None:
+		r"""
+		Increase the counter.
+
+		:param amount:
+		:param \*\*labels: The values of the metric's labels.
+		"""  # noqa: RST306
+
+		key = self._label_values(labels)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0) + amount
+
+	def set_total(self, value: float, **labels: str) -> None:
+		r"""
+		Set the counter to a total maintained elsewhere (e.g. by :meth:`.LRUCache.stats`).
+
+		:param value:
+		:param \*\*labels: The values of the metric's labels.
+		"""  # noqa: RST306
+
+		key = self._label_values(labels)
+		with self._lock:
+			self._values[key] = value
+
+	def export(self) -> list[Any]:  # noqa: D102
+		with self._lock:
+			return [[list(key), value] for key, value in self._values.items()]
+
+	def merge(self, exported: list[Any], sign: int = 1) -> None:  # noqa: D102
+		with self._lock:
+			for key, value in exported:
+				key = tuple(key)
+				self._values[key] = self._values.get(key, 0) + sign * value
+
+	def samples(self) -> Iterator[tuple[str, str, float]]:  # noqa: D102
+		with self._lock:
+			values = sorted(self._values.items())
+
+		for key, value in values:
+			yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge(Counter):
+	"""
+	A value which may go up and down, such as the number of requests in progress.
+	"""
+
+	type = "gauge"
+
+	def dec(self, amount: float = 1, **labels: str) -> None:
+		r"""
+		Decrease the gauge.
+
+		:param amount:
+		:param \*\*labels: The values of the metric's labels.
+		"""  # noqa: RST306
+
+		self.inc(-amount, **labels)
+
+	def set(self, value: float, **labels: str) -> None:
+		r"""
+		Set the gauge to ``value``.
+
+		:param value:
+		:param \*\*labels: The values of the metric's labels.
+		"""  # noqa: RST306
+
+		self.set_total(value, **labels)
+
+
+class Histogram(_Metric):
+	"""
+	Counts observations (such as request durations) in cumulative buckets.
+
+	:param name: The metric's name.
+	:param documentation: A description of the metric.
+	:param labelnames: The names of the metric's labels.
+	:param buckets: The upper bounds of the buckets.
+	"""
+
+	type = "histogram"
+
+	def __init__(
+			self,
+			name: str,
+			documentation: str,
+			labelnames: Sequence[str] = (),
+			buckets: Sequence[float] = DEFAULT_BUCKETS,
+			):
+		super().__init__(name, documentation, labelnames)
+		self.buckets = tuple(sorted(buckets))
+		# label values -> (count in each bucket (not cumulative), sum, count)
+		self._values: dict[_LabelValues, tuple[list[int], float, int]] = {}
+
+	def _empty(self) -> "Histogram":
+		return Histogram(self.name, self.documentation, self.labelnames, self.buckets)
+
+	def observe(self, value: float, **labels: str) -> None:
+		r"""
+		Record an observation.
+
+		:param value:
+		:param \*\*labels: The values of the metric's labels.
+		"""  # noqa: RST306
+
+		key = self._label_values(labels)
+		with self._lock:
+			counts, total, count = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+			counts[bisect.bisect_left(self.buckets, value)] += 1
+			self._values[key] = (counts, total + value, count + 1)
+
+	@contextmanager
+	def time(self, **labels: str) -> Iterator[None]:
+		r"""
+		Context manager which observes the time, in seconds, taken by the :keyword:`with` block.
+
+		:param \*\*labels: The values of the metric's labels.
+		"""  # noqa: RST306
+
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.observe(time.perf_counter() - start, **labels)
+
+	def export(self) -> list[Any]:  # noqa: D102
+		with self._lock:
+			return [[list(key), list(counts), total, count] for key, (counts, total, count) in self._values.items()]
+
+	def merge(self, exported: list[Any], sign: int = 1) -> None:  # noqa: D102
+		with self._lock:
+			for key, counts, total, count in exported:
+				key = tuple(key)
+				old_counts, old_total, old_count = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+				self._values[key] = (
+						[old + sign * new for old, new in zip(old_counts, counts)],
+						old_total + sign * total,
+						old_count + sign * count,
+						)
+
+	def samples(self) -> Iterator[tuple[str, str, float]]:  # noqa: D102
+		with self._lock:
+			values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+
+		labelnames = (*self.labelnames, "le")
+
+		for key, (counts, total, count) in values:
+			cumulative = 0
+			for upper_bound, bucket_count in zip((*self.buckets, math.inf), counts):
+				cumulative += bucket_count
+				yield f"{self.name}_bucket", _format_labels(labelnames, (*key, _format_value(upper_bound))), cumulative
+
+			yield f"{self.name}_sum", _format_labels(self.labelnames, key), total
+			yield f"{self.name}_count", _format_labels(self.labelnames, key), count
+
+
+class Registry:
+	"""
+	A collection of metrics.
+	"""
+
+	def __init__(self):
+		self._metrics: dict[str, _Metric] = {}
+		self._collectors: list[Callable[[], None]] = []
+		self._lock = threading.Lock()
+
+	def register(self, metric: _Metric) -> None:
+		"""
+		Add ``metric`` to the registry.
+
+		:param metric:
+		"""
+
+		with self._lock:
+			if metric.name in self._metrics:
+				raise ValueError(f"Duplicate metric {metric.name!r}")
+
+			self._metrics[metric.name] = metric
+
+	def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+		"""
+		Create a :class:`~.Counter` and add it to the registry.
+
+		:param name: The metric's name.
+		:param documentation: A description of the metric.
+		:param labelnames: The names of the metric's labels.
+		"""
+
+		metric = Counter(name, documentation, labelnames)
+		self.register(metric)
+		return metric
+
+	def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+		"""
+		Create a :class:`~.Gauge` and add it to the registry.
+
+		:param name: The metric's name.
+		:param documentation: A description of the metric.
+		:param labelnames: The names of the metric's labels.
+		"""
+
+		metric = Gauge(name, documentation, labelnames)
+		self.register(metric)
+		return metric
+
+	def histogram(
+			self,
+			name: str,
+			documentation: str,
+			labelnames: Sequence[str] = (),
+			buckets: Sequence[float] = DEFAULT_BUCKETS,
+			) -> Histogram:
+		"""
+		Create a :class:`~.Histogram` and add it to the registry.
+
+		:param name: The metric's name.
+		:param documentation: A description of the metric.
+		:param labelnames: The names of the metric's labels.
+		:param buckets: The upper bounds of the buckets.
+		"""
+
+		metric = Histogram(name, documentation, labelnames, buckets)
+		self.register(metric)
+		return metric
+
+	def add_collector(self, collector: Callable[[], None]) -> None:
+		"""
+		Register a function to be called before the metrics are rendered,
+		to update metrics whose values are maintained elsewhere.
+
+		:param collector:
+		"""
+
+		with self._lock:
+			self._collectors.append(collector)
+
+	def _collect(self) -> list[_Metric]:
+		with self._lock:
+			collectors = list(self._collectors)
+			metrics = list(self._metrics.values())
+
+		for collector in collectors:
+			collector()
+
+		return metrics
+
+	def _combine(
+			self,
+			exported: Sequence[Mapping[str, list[Any]]],
+			subtract: Optional[Mapping[str, list[Any]]] = None,
+			types: Optional[Collection[str]] = None,
+			) -> list[_Metric]:
+		with self._lock:
+			metrics = list(self._metrics.values())
+
+		combined = []
+
+		for metric in metrics:
+			if types is not None and metric.type not in types:
+				continue
+
+			total = metric._empty()
+			for values in exported:
+				total.merge(values.get(metric.name, []))
+			if subtract is not None:
+				total.merge(subtract.get(metric.name, []), sign=-1)
+
+			combined.append(total)
+
+		return combined
+
+	def export(self) -> dict[str, list[Any]]:
+		"""
+		Returns the current values of all metrics as JSON-serialisable data, for :meth:`~.Registry.combine`.
+		"""
+
+		return {metric.name: metric.export() for metric in self._collect()}
+
+	def combine(
+			self,
+			*exported: Mapping[str, list[Any]],
+			subtract: Optional[Mapping[str, list[Any]]] = None,
+			types: Optional[Collection[str]] = None,
+			) -> dict[str, list[Any]]:
+		r"""
+		Add together values from :meth:`~.Registry.export`, possibly in other processes.
+
+		Metrics which aren't in this registry are ignored.
+
+		:param \*exported:
+		:param subtract: Values to subtract from the total.
+		:param types: If given, only include metrics of these types (e.g. ``{"counter", "histogram"}``).
+		"""  # noqa: RST306
+
+		return {metric.name: metric.export() for metric in self._combine(exported, subtract, types)}
+
+	def render(self, *exported: Mapping[str, list[Any]]) -> str:
+		r"""
+		Returns all metrics in the Prometheus text format.
+
+		:param \*exported: If given, render the total of these values from :meth:`~.Registry.export`
+			rather than the registry's own values.
+		"""  # noqa: RST306
+
+		metrics = self._combine(exported) if exported else self._collect()
+		return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+#: The process-wide metrics registry.
+REGISTRY = Registry()
+
+#: Lookups in each cache layer, by result
+#: (``hit``, ``miss``, ``revalidated`` after a conditional request, or ``negative`` for a remembered 404).
+CACHE_REQUESTS = REGISTRY.counter(
+		"dependency_dash_cache_requests_total",
+		"Cache lookups, by cache layer and result.",
+		["cache", "result"],
+		)
+
+#: Requests to upstream servers, by host and HTTP status (or ``error`` if no response was received).
+UPSTREAM_REQUESTS = REGISTRY.counter(
+		"dependency_dash_upstream_requests_total",
+		"Requests to upstream servers, by host and status.",
+		["host", "status"],
+		)
+
+#: The time taken to receive the response headers from upstream servers.
+UPSTREAM_LATENCY = REGISTRY.histogram(
+		"dependency_dash_upstream_request_duration_seconds",
+		"Time taken for upstream servers to respond, by host.",
+		["host"],
+		)
+
+#: The number of requests to upstream servers which are in progress.
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge(
+		"dependency_dash_upstream_requests_in_flight",
+		"Requests to upstream servers in progress, by host.",
+		["host"],
+		)
+
+
+#: Requests served, by route (the URL rule, e.g. ``/github/<username>/``), method and status.
+REQUESTS = REGISTRY.counter(
+		"dependency_dash_requests_total",
+		"Requests served, by route, method and status.",
+		["route", "method", "status"],
+		)
+
+#: The time taken to serve requests, including streaming the response body.
+REQUEST_LATENCY = REGISTRY.histogram(
+		"dependency_dash_request_duration_seconds",
+		"Time taken to serve requests, by route.",
+		["route"],
+		)
+
+#: Lookups in each in-memory cache, by result (``hit`` or ``miss``).
+MEMORY_CACHE_LOOKUPS = REGISTRY.counter(
+		"dependency_dash_memory_cache_lookups_total",
+		"In-memory cache lookups, by cache and result.",
+		["cache", "result"],
+		)
+
+#: The number of entries in each in-memory cache.
+MEMORY_CACHE_ENTRIES = REGISTRY.gauge(
+		"dependency_dash_memory_cache_entries",
+		"Entries in each in-memory cache.",
+		["cache"],
+		)
+
+#: The number of keep-alive connections to each host which aren't in use.
+CONNECTION_POOL_IDLE = REGISTRY.gauge(
+		"dependency_dash_connection_pool_idle",
+		"Idle keep-alive connections in each host's connection pool.",
+		["pool"],
+		)
+
+#: The number of connections opened to each host.
+CONNECTION_POOL_CONNECTIONS = REGISTRY.counter(
+		"dependency_dash_connection_pool_connections_total",
+		"Connections opened by each host's connection pool.",
+		["pool"],
+		)
+
+#: The number of requests made through each host's connection pool.
+CONNECTION_POOL_REQUESTS = REGISTRY.counter(
+		"dependency_dash_connection_pool_requests_total",
+		"Requests made through each host's connection pool.",
+		["pool"],
+		)
+
+#: The number of fetches guarded by a single-flight lock.
+SINGLE_FLIGHT_CALLS = REGISTRY.counter(
+		"dependency_dash_single_flight_calls_total",
+		"Fetches guarded by a single-flight lock.",
+		)
+
+#: The number of fetches which waited for another thread or process to fetch the same key.
+SINGLE_FLIGHT_COALESCED = REGISTRY.counter(
+		"dependency_dash_single_flight_coalesced_total",
+		"Fetches which waited for another thread or process fetching the same key.",
+		)
+
+
+def record_cache(cache: str, result: str) -> None:
+	"""
+	Record the result of a lookup in a cache layer.
+
+	:param cache: The name of the cache layer.
+	:param result: Either ``"hit"``, ``"miss"``, ``"revalidated"`` or ``"negative"``.
+	"""
+
+	CACHE_REQUESTS.inc(cache=cache, result=result)
+
+
+def watch_memory_cache(name: str, stats: Callable[[], tuple[int, int, int, int]]) -> None:
+	"""
+	Report the statistics of an in-memory cache when the metrics are rendered.
+
+	:param name: The name to report the cache under.
+	:param stats: Function returning the cache's hits, misses, number of entries and size
+		(such as :meth:`.LRUCache.stats`).
+	"""
+
+	def collect() -> None:
+		hits, misses, entries, _ = stats()
+		MEMORY_CACHE_LOOKUPS.set_total(hits, cache=name, result="hit")
+		MEMORY_CACHE_LOOKUPS.set_total(misses, cache=name, result="miss")
+		MEMORY_CACHE_ENTRIES.set(entries, cache=name)
+
+	REGISTRY.add_collector(collect)
+
+
+_published: dict[str, list[Any]] = {}
+_publish_lock = threading.Lock()
+
+
+def publish_metrics() -> None:
+	"""
+	Add this worker's metrics to the shared cache.
+
+	Counters and histograms are added to totals for all workers, which are kept after the worker exits.
+	The worker's gauges replace those it published previously.
+	"""
+
+	global _published
+
+	# this package
+	from dependency_dash.caching import single_flight
+
+	cache = get_cache()
+
+	with _publish_lock:
+		exported = REGISTRY.export()
+		cumulative = REGISTRY.combine(exported, types={"counter", "histogram"})
+
+		with single_flight("metrics/totals"):
+			totals = cache.get_json(TOTALS_KEY) or {}
+			cache.set_json(TOTALS_KEY, REGISTRY.combine(totals, cumulative, subtract=_published))
+
+		_published = cumulative
+
+		cache.set_json(
+				f"{GAUGES_PREFIX}{socket.gethostname()}-{os.getpid()}.json",
+				{"time": time.time(), "metrics": REGISTRY.combine(exported, types={"gauge"})},
+				)
+
+
+def render_shared_metrics() -> str:
+	"""
+	Returns the metrics of all workers sharing the cache, in the Prometheus text format.
+
+	Gauges are only included for workers which have published their metrics in the last few intervals.
+	"""
+
+	publish_metrics()
+
+	cache = get_cache()
+	exported = [cache.get_json(TOTALS_KEY) or {}]
+
+	for key in list(cache.keys(GAUGES_PREFIX)):
+		gauges = cache.get_json(key)
+		if gauges is None:
+			continue
+		elif time.time() - gauges["time"] > 3 * PUBLISH_INTERVAL:
+			cache.delete(key)
+		else:
+			exported.append(gauges["metrics"])
+
+	return REGISTRY.render(*exported)
+
+
+def start_metrics_thread(interval: float = PUBLISH_INTERVAL) -> threading.Thread:
+	"""
+	Start a background thread which runs :func:`~.publish_metrics` every ``interval`` seconds, and when the worker exits.
+
+	:param interval:
+	"""
+
+	def publish() -> None:
+		while True:
+			time.sleep(interval)
+
+			try:
+				publish_metrics()
+			except (OSError, sqlite3.Error):
+				logger.exception("Couldn't publish metrics to the shared cache")
+
+	atexit.register(publish_metrics)
+
+	thread = threading.Thread(target=publish, name="dependency-dash-metrics", daemon=True)
+	thread.start()
+	return thread
@@ -28,37 +28,75 @@ Retrieve and cache data from PyPI.
 
 # stdlib
 import datetime
+import functools
 import os
 from collections.abc import Iterable, Iterator
 from email.utils import parsedate_to_datetime
 from operator import itemgetter
-from typing import Any, Optional, TypedDict
+from typing import Any, NamedTuple, Optional, TypedDict, cast
 from urllib.parse import urlparse
 
 # 3rd party
-import platformdirs
 import requests
-from domdf_python_tools.paths import PathPlus
+from apeye.requests_url import RequestsURL
 from flask import Response, render_template
 from packaging.requirements import InvalidRequirement
+from packaging.specifiers import SpecifierSet
 from packaging.tags import generic_tags
 from packaging.version import InvalidVersion, Version
-from pybadges import badge
 from pypi_json import ProjectMetadata, PyPIJSON
-from remote_wheel import RemoteWheelDistribution
+from remote_wheel import RemoteWheelDistribution, RemoteZipFile
 from shippinglabel import normalize
 from shippinglabel.requirements import ComparableRequirement
 
+# this package
+from dependency_dash.caching import LRUCache, is_missing, mark_missing, single_flight
+from dependency_dash.concurrency import map_concurrently
+from dependency_dash.metrics import record_cache, watch_memory_cache
+from dependency_dash.pypi import changelog
+from dependency_dash.sessions import get_session
+from dependency_dash.storage import get_cache
+from dependency_dash.timing import span, timed
+
 __all__ = [
 		"DependencyMetadata",
+		"VersionIndex",
 		"format_project_links",
+		"get_client",
 		"get_data",
 		"get_dependency_dash_url",
 		"get_dependency_status",
 		"get_package_requirements",
+		"get_version_index",
 		]
 
-CACHE_DIR = PathPlus(platformdirs.user_cache_dir("dependency_dash")) / "pypi"
+#: The base URL of the PyPI JSON API.
+PYPI_ENDPOINT = os.getenv("DD_PYPI_ENDPOINT", "https://pypi.org/pypi")
+
+#: Cache key prefix for the requirements of individual wheels, and the wheel used for each project's latest version.
+WHEEL_CACHE_PREFIX = "pypi/wheel-deps"
+
+#: The maximum number of concurrent requests to PyPI made by :func:`~.get_dependency_status`.
+MAX_WORKERS = int(os.getenv("DD_PYPI_CONCURRENCY", 8))
+
+#: The time, in seconds, for which cached project metadata is used without checking with PyPI.
+MAX_AGE = 300  # 5 mins
+
+#: In-memory cache of project metadata, in front of the persistent cache.
+MEMORY_CACHE: LRUCache[str, "DependencyMetadata"] = LRUCache(
+		maxsize=int(os.getenv("DD_PYPI_MEMORY_CACHE_SIZE", 2048)),
+		)
+watch_memory_cache("pypi", MEMORY_CACHE.stats)
+
+
+def get_client() -> PyPIJSON:
+	"""
+	Returns a PyPI JSON API client using the process-wide session.
+
+	The client must not be used as a context manager.
+	"""
+
+	return PyPIJSON(endpoint=PYPI_ENDPOINT, session=get_session())
 
 
 def format_project_links(project_urls: dict[str, str]) -> str:
@@ -166,7 +204,17 @@ class DependencyMetadata(TypedDict):
 	etag: str
 	last_modified: float
 
+	#: The PyPI changelog serial of the metadata, as reported by PyPI.
+	#: Absent from metadata cached by earlier versions, which is always revalidated when stale.
+	last_serial: int
+
+	#: The latest PyPI changelog serial seen before the metadata was fetched or revalidated,
+	#: from which point the changelog can confirm the project hasn't changed.
+	#: :py:obj:`None` if the changelog isn't used or couldn't be obtained.
+	changelog_serial: Optional[int]
 
+
+@timed("pypi")
 def get_data(project_name: str) -> DependencyMetadata:
 	"""
 	Obtain metadata for ``project_name`` from PyPI.
@@ -174,85 +222,228 @@ def get_data(project_name: str) -> DependencyMetadata:
 	:param project_name:
 	"""
 
-	# TODO: HEAD and check last serial to see if update needed
 	project_name = normalize(project_name)
 
-	datafile = CACHE_DIR / project_name[0] / f"{project_name}.json"
-	datafile.parent.maybe_make(parents=True)
+	data = _get_memory_cached(project_name)
+	if data is not None:
+		return data
+
+	cache = get_cache()
+	cache_key = f"pypi/{project_name[0]}/{project_name}.json"
 
 	def get_updated_data(
 			etag: Optional[str] = None,
 			stale_data: Optional[DependencyMetadata] = None,
 			) -> DependencyMetadata:
-		with PyPIJSON() as client:
-			query_url = client.endpoint / project_name / "json"
+		client = get_client()
+		query_url = client.endpoint / project_name / "json"
 
-			if etag is None:
-				headers = {}
-			else:
-				headers = {"If-None-Match": str(etag)}
-
-			response: requests.Response = query_url.get(timeout=client.timeout, headers=headers)
-
-			if response.status_code == 404:
-				raise InvalidRequirement(f"No such project {project_name!r}")
-			elif response.status_code == 304 and etag is not None and stale_data is not None:
-				stale_data["last_modified"] = parsedate_to_datetime(response.headers["date"]).timestamp()
-				return stale_data
-			elif response.status_code != 200:
-				raise requests.HTTPError(
-						f"An error occurred when obtaining project metadata for {project_name!r}: "
-						f"HTTP Status {response.status_code}",
-						response=response,
+		if etag is None:
+			headers = {}
+		else:
+			headers = {"If-None-Match": str(etag)}
+
+		changelog_serial = None
+		if changelog.REFRESH_MODE == "serial":
+			# Checked before the request, so any change made while the metadata is being fetched is caught later.
+			state = changelog.sync()
+			if state is not None:
+				changelog_serial = state["serial"]
+
+		response: requests.Response = query_url.get(timeout=client.timeout, headers=headers)
+
+		if response.status_code == 404:
+			mark_missing(cache_key)
+			raise InvalidRequirement(f"No such project {project_name!r}")
+		elif response.status_code == 304 and etag is not None and stale_data is not None:
+			record_cache("pypi", "revalidated")
+			stale_data["last_modified"] = parsedate_to_datetime(response.headers["date"]).timestamp()
+			if "X-PyPI-Last-Serial" in response.headers:
+				stale_data["last_serial"] = int(response.headers["X-PyPI-Last-Serial"])
+			stale_data["changelog_serial"] = changelog_serial
+			return stale_data
+		elif response.status_code != 200:
+			raise requests.HTTPError(
+					f"An error occurred when obtaining project metadata for {project_name!r}: "
+					f"HTTP Status {response.status_code}",
+					response=response,
+					)
+
+		record_cache("pypi", "miss")
+		metadata = ProjectMetadata(**response.json())
+
+		releases = metadata.releases
+		# .releases may be None if a version is passed, but in our case we aren't.
+		assert releases is not None
+
+		return {
+				"name": metadata.info["name"],
+				"version": metadata.info["version"],
+				"home_page": metadata.info["home_page"] or '',
+				"license": metadata.info["license"] or '',
+				"package_url": metadata.info["package_url"],
+				"dependency_dash_url": get_dependency_dash_url(metadata.info["project_urls"]),
+				"project_urls": metadata.info["project_urls"],
+				"all_versions": _sort_versions(*releases.keys()),
+				"etag": response.headers["etag"],
+				"last_modified": parsedate_to_datetime(response.headers["date"]).timestamp(),
+				"last_serial": int(response.headers.get("X-PyPI-Last-Serial", metadata.last_serial)),
+				"changelog_serial": changelog_serial,
+				}
+
+	with single_flight(f"pypi/{project_name}"):
+		# Another thread may have fetched the data while this one was waiting.
+		data = _get_memory_cached(project_name)
+		if data is not None:
+			return data
+
+		if is_missing(cache_key):
+			record_cache("pypi", "negative")
+			raise InvalidRequirement(f"No such project {project_name!r}")
+
+		data = cache.get_json(cache_key)
+
+		if data is None:
+			data = get_updated_data()
+		else:
+			last_modified = data.get("last_modified")
+			if last_modified and datetime.datetime.now().timestamp() - last_modified < MAX_AGE:
+				MEMORY_CACHE.set(project_name, data, expires=last_modified + MAX_AGE)
+				record_cache("pypi", "hit")
+				return cast(DependencyMetadata, dict(data))
+
+			if changelog.REFRESH_MODE == "serial":
+				confirmed = changelog.confirmed_unchanged(
+						project_name,
+						data.get("last_serial"),
+						data.get("changelog_serial"),
 						)
+				if confirmed is not None and datetime.datetime.now().timestamp() - confirmed < MAX_AGE:
+					# The project hasn't changed since the metadata was fetched.
+					data["last_modified"] = confirmed
+					cache.set_json(cache_key, data)
+					MEMORY_CACHE.set(project_name, data, expires=confirmed + MAX_AGE)
+					record_cache("pypi", "hit")
+					return cast(DependencyMetadata, dict(data))
+
+			old_etag = data.get("etag", None)
+			if not old_etag:
+				data = get_updated_data(stale_data=data)
+			else:
+				data = get_updated_data(etag=old_etag, stale_data=data)
 
-			metadata = ProjectMetadata(**response.json())
-
-			releases = metadata.releases
-			# .releases may be None if a version is passed, but in our case we aren't.
-			assert releases is not None
-
-			return {
-					"name": metadata.info["name"],
-					"version": metadata.info["version"],
-					"home_page": metadata.info["home_page"] or '',
-					"license": metadata.info["license"] or '',
-					"package_url": metadata.info["package_url"],
-					"dependency_dash_url": get_dependency_dash_url(metadata.info["project_urls"]),
-					"project_urls": metadata.info["project_urls"],
-					"all_versions": _sort_versions(*releases.keys()),
-					"etag": response.headers["etag"],
-					"last_modified": parsedate_to_datetime(response.headers["date"]).timestamp(),
-					}
+		cache.set_json(cache_key, data)
+		MEMORY_CACHE.set(project_name, data, expires=data["last_modified"] + MAX_AGE)
 
-	try:
-		data = datafile.load_json()
+	return cast(DependencyMetadata, dict(data))
 
-		last_modified = data.get("last_modified")
-		if last_modified and datetime.datetime.now().timestamp() - last_modified < 300:  # 5 mins:
-			return data
 
-		old_etag = data.get("etag", None)
-		if not old_etag:
-			data = get_updated_data(stale_data=data)
-		else:
-			data = get_updated_data(etag=old_etag, stale_data=data)
+def _get_memory_cached(project_name: str) -> Optional[DependencyMetadata]:
+	# Returns the metadata for the (normalized) project name from the in-memory cache, if it's there.
+
+	data = MEMORY_CACHE.get(project_name)
+	if data is None:
+		return None
+
+	record_cache("pypi", "hit")
+	# Copy so callers can't modify the cached metadata.
+	return cast(DependencyMetadata, dict(data))
+
+
+class VersionIndex(NamedTuple):
+	"""
+	A project's versions, parsed and sorted.
+	"""
+
+	#: All the project's versions, in ascending order.
+	versions: tuple[Version, ...]
+
+	#: The newest version which isn't a pre-release.
+	latest_final: Optional[Version]
+
+	#: The newest version, including pre-releases.
+	latest_prerelease: Optional[Version]
+
+
+#: Cache of parsed versions, keyed by project name and the ETag of the metadata they came from.
+VERSION_INDEX_CACHE: LRUCache[tuple[str, str], VersionIndex] = LRUCache(maxsize=MEMORY_CACHE.maxsize)
+watch_memory_cache("pypi-versions", VERSION_INDEX_CACHE.stats)
 
-	except FileNotFoundError:
-		data = get_updated_data()
 
-	datafile.dump_json(data)
+def get_version_index(data: DependencyMetadata) -> VersionIndex:
+	"""
+	Returns the parsed versions from the given project metadata.
+
+	The versions are only parsed once each time the metadata changes.
 
-	return data
+	:param data:
+	"""
+
+	key = (data["name"], data["etag"])
+
+	if data["etag"]:
+		index = VERSION_INDEX_CACHE.get(key)
+		if index is not None:
+			return index
+
+	# all_versions has already been sorted (and invalid versions removed) by _sort_versions
+	versions = tuple(map(Version, data["all_versions"]))
+	latest_final = next((v for v in reversed(versions) if not v.is_prerelease), None)
+	index = VersionIndex(versions, latest_final, versions[-1] if versions else None)
+
+	if data["etag"]:
+		VERSION_INDEX_CACHE.set(key, index)
+
+	return index
+
+
+@functools.lru_cache(maxsize=8192)
+def _get_status(specifier: SpecifierSet, latest_version: str, latest_prerelease: Optional[Version]) -> str:
+	if latest_version in specifier:
+		return "up-to-date"
+	elif latest_prerelease is not None and latest_prerelease in specifier:
+		return "prerelease"
+	else:
+		return "outdated"
+
+
+def _invalid_metadata(name: str) -> DependencyMetadata:
+	return {
+			"name": name,
+			"version": '',
+			"home_page": '',
+			"license": '',
+			"package_url": '',
+			"project_urls": {},
+			"dependency_dash_url": '',
+			"all_versions": [],
+			"etag": '',
+			"last_modified": 0.0,
+			"last_serial": 0,
+			"changelog_serial": None,
+			}
+
+
+def _get_data_or_none(project_name: str) -> Optional[DependencyMetadata]:
+	try:
+		return get_data(project_name)
+	except InvalidRequirement:
+		return None
 
 
 def get_dependency_status(
 		requirements: Iterable[ComparableRequirement],
+		max_workers: Optional[int] = None,
 		) -> Iterator[tuple[ComparableRequirement, str, DependencyMetadata]]:
 	"""
 	For the given requirements, determine whether it is up-to-date.
 
+	Metadata already held in memory is used directly, and the rest is obtained from PyPI concurrently,
+	but the results are yielded in sorted order.
+
 	:param requirements:
+	:param max_workers: The maximum number of concurrent requests to PyPI.
+		Defaults to :py:data:`~.MAX_WORKERS`.
 
 	:returns: An iterator over three element tuples comprising:
 
@@ -261,35 +452,36 @@ def get_dependency_status(
 		* A dictionary containing metadata about the project.
 	"""
 
-	for req in sorted(requirements):
+	requirements = sorted(requirements)
 
-		try:
-			data = get_data(req.name)
-		except InvalidRequirement:
-			yield req, "invalid", {
-				"name": req.name,
-				"version": '',
-				"home_page": '',
-				"license": '',
-				"package_url": '',
-				"project_urls": {},
-				"dependency_dash_url": '',
-				"all_versions": [],
-				"etag": '',
-				"last_modified": 0.0,
-			}
-			continue
+	if not requirements:
+		return
 
-		latest_version = data["version"]
-		version_specifier = req.specifier
-		latest_prerelease = max(map(Version, data["all_versions"]))
+	cached = [_get_memory_cached(normalize(req.name)) for req in requirements]
+	fetched = map_concurrently(
+			_get_data_or_none,
+			[req.name for req, data in zip(requirements, cached) if data is None],
+			limit=max_workers or MAX_WORKERS,
+			)
 
-		if latest_version in version_specifier:
-			yield req, "up-to-date", data
-		elif latest_prerelease in version_specifier:
-			yield req, "prerelease", data
-		else:
-			yield req, "outdated", data
+	# The fetched metadata is slotted in between the cached metadata in order,
+	# so each row is produced as soon as it and all those before it are available.
+	all_data = (next(fetched) if data is None else data for data in cached)
+	yield from _iter_status(requirements, all_data)
+
+
+def _iter_status(
+		requirements: list[ComparableRequirement],
+		all_data: Iterable[Optional[DependencyMetadata]],
+		) -> Iterator[tuple[ComparableRequirement, str, DependencyMetadata]]:
+	for req, data in zip(requirements, all_data):
+
+		if data is None:
+			yield req, "invalid", _invalid_metadata(req.name)
+			continue
+
+		latest_prerelease = get_version_index(data).latest_prerelease
+		yield req, _get_status(req.specifier, data["version"], latest_prerelease), data
 		# TODO: check against safety's DB. Probably need to enumerate releases from PyPI
 
 
@@ -297,6 +489,14 @@ def _format_internal_link(req: ComparableRequirement, data: dict[str, Any]) -> s
 	return f'<a href="/pypi/{normalize(req.name)}" title="View Dependencies">{req.name}</a>'
 
 
+def _open_remote_wheel(name: str, version: Version, url: str) -> RemoteWheelDistribution:
+	# RemoteWheelDistribution.from_url always creates a new session.
+	requests_url = RequestsURL(url)
+	requests_url.session = get_session()
+	wheel_zip = RemoteZipFile(requests_url, initial_buffer_size=100)
+	return RemoteWheelDistribution(name, version, url, wheel_zip)
+
+
 def get_package_requirements(package_name: str) -> list[tuple[str, set[ComparableRequirement], list[str], bool]]:
 	"""
 	Returns the requirements specified for the given package.
@@ -313,15 +513,47 @@ def get_package_requirements(package_name: str) -> list[tuple[str, set[Comparabl
 
 	# TODO: handle sdist-only packages
 
-	# TODO: caching
-	# datafile = CACHE_DIR / "wheel-deps" / f"{package_name}.dat"
-	# datafile.parent.maybe_make(parents=True)
+	# The requirements of a given wheel never change, so they are cached indefinitely.
+	# The latest version is taken from the (cached) project metadata, so if the package hasn't
+	# had a new release no requests are made for the wheel.
+
+	latest_version = get_data(package_name)["version"]
+
+	cache = get_cache()
+	latest_key = f"{WHEEL_CACHE_PREFIX}/latest/{normalize(package_name)}.json"
+
+	def get_cached() -> Optional[list[tuple[str, set[ComparableRequirement], list[str], bool]]]:
+		# Returns the requirements of the latest version's wheel, if they are cached.
+		latest = cache.get_json(latest_key) or {}
+
+		if latest.get("version") == latest_version:
+			wheel_filename = latest["wheel"]
+			if wheel_filename is None:
+				raise NotImplementedError
+
+			requirements = cache.get_json(f"{WHEEL_CACHE_PREFIX}/{wheel_filename}.json")
+			if requirements is not None:
+				record_cache("pypi-wheel", "hit")
+				return [(wheel_filename, set(map(ComparableRequirement, requirements)), [], True)]
+
+		return None
 
-	with PyPIJSON() as client:
-		metadata = client.get_metadata(package_name)
+	# Only wait for other requests for the package's requirements if they need reading from the wheel.
+	cached = get_cached()
+	if cached is not None:
+		return cached
+
+	with single_flight(f"pypi/wheel-deps/{normalize(package_name)}"):
+		# Another thread or process may have read the wheel while this one was waiting.
+		cached = get_cached()
+		if cached is not None:
+			return cached
+
+		metadata = get_client().get_metadata(package_name)
 		tag_mapping, non_wheel_urls = metadata.get_wheel_tag_mapping(metadata.version)
 
 		if not tag_mapping:
+			cache.set_json(latest_key, {"version": metadata.info["version"], "wheel": None})
 			raise NotImplementedError
 
 		generic_tag = next(generic_tags())
@@ -330,14 +562,29 @@ def get_package_requirements(package_name: str) -> list[tuple[str, set[Comparabl
 		else:
 			wheel_url = next(iter(tag_mapping.values()))
 
-	with RemoteWheelDistribution.from_url(wheel_url) as wheel:
-		wheel_metadata = wheel.get_metadata()
-		# TODO: handle extra requirements (split up like separate files?)
-		dependencies = set(map(ComparableRequirement, wheel_metadata.get_all("Requires-Dist", default=())))
 		wheel_filename = os.path.basename(urlparse(str(wheel_url)).path)
+		wheel_key = f"{WHEEL_CACHE_PREFIX}/{wheel_filename}.json"
+		wheel_requirements = cache.get_json(wheel_key)
+
+		if wheel_requirements is not None:
+			record_cache("pypi-wheel", "hit")
+			dependencies = set(map(ComparableRequirement, wheel_requirements))
+		else:
+			record_cache("pypi-wheel", "miss")
+			with span("pypi-wheel"), _open_remote_wheel(metadata.name, metadata.version, str(wheel_url)) as wheel:
+				wheel_metadata = wheel.get_metadata()
+				# TODO: handle extra requirements (split up like separate files?)
+				dependencies = set(map(ComparableRequirement, wheel_metadata.get_all("Requires-Dist", default=())))
+
+			cache.set_json(wheel_key, sorted(map(str, dependencies)))
+
+		cache.set_json(latest_key, {"version": metadata.info["version"], "wheel": wheel_filename})
+
 		return [(wheel_filename, dependencies, [], True)]
 
 
-def _bad_package_badge(reason: str) -> Response:
-	badge_svg = badge(left_text="package", right_text=reason, right_color="silver")
-	return Response(badge_svg, content_type="image/svg+xml;charset=utf-8", status=200)
+def _bad_package_badge(reason: str, cache_key: Optional[str] = None, source: str = '') -> Response:
+	# this package
+	from dependency_dash.badges import render_badge, serve_badge
+
+	return serve_badge(render_badge("package", reason, "silver"), cache_key, source)
@@ -34,12 +34,11 @@ from urllib.parse import urljoin
 from flask_restx import fields  # type: ignore[import-untyped]
 from flask_restx import Namespace, Resource
 from packaging.requirements import InvalidRequirement
-from pypi_json import PyPIJSON
 from shippinglabel import normalize
 
 # this package
 from dependency_dash._app import api, app
-from dependency_dash.pypi import get_dependency_status, get_package_requirements
+from dependency_dash.pypi import get_client, get_dependency_status, get_package_requirements
 
 __all__ = [
 		"project_urls_model",
@@ -109,12 +108,11 @@ class PyPIPackageAPI(Resource):
 
 		project_name = normalize(package_name)
 
-		with PyPIJSON() as client:
-			try:
-				metadata = client.get_metadata(project_name)
+		try:
+			metadata = get_client().get_metadata(project_name)
 
-			except InvalidRequirement:
-				return error404("Package not found")
+		except InvalidRequirement:
+			return error404("Package not found")
 
 		try:
 			data = get_package_requirements(metadata.name)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+#
+#  pypi/changelog.py
+"""
+Track which PyPI projects have changed using the changelog serial.
+
+PyPI assigns each change (new release, new file, removal etc.) an increasing serial number.
+By periodically asking which projects changed since the last serial seen,
+cached metadata for every other project can be treated as fresh without asking PyPI about each one.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import os
+import threading
+import time
+import xmlrpc.client
+from typing import Any, Optional, TypedDict
+
+# 3rd party
+import requests
+from shippinglabel import normalize
+
+# this package
+from dependency_dash.caching import single_flight
+from dependency_dash.sessions import get_session
+from dependency_dash.storage import get_cache
+
+__all__ = ["ChangelogState", "confirmed_unchanged", "sync"]
+
+#: Either ``"conditional"`` (revalidate each project with PyPI when stale)
+#: or ``"serial"`` (use the changelog serial to skip revalidating unchanged projects).
+REFRESH_MODE = os.getenv("DD_PYPI_REFRESH", "conditional")
+
+#: The URL of PyPI's XML-RPC API, which provides the changelog.
+XMLRPC_URL = os.getenv("DD_PYPI_XMLRPC_URL", "https://pypi.org/pypi")
+
+#: The minimum time, in seconds, between requests for the changelog.
+SYNC_INTERVAL = int(os.getenv("DD_PYPI_CHANGELOG_INTERVAL", 60))
+
+#: The maximum number of changed projects to track.
+#: When there are more the oldest changes are forgotten, so metadata fetched before them is always revalidated.
+MAX_TRACKED = 20000
+
+STATE_KEY = "pypi/changelog.json"
+
+
+class ChangelogState(TypedDict):
+	"""
+	The projects which have changed since the ``base_serial``.
+	"""
+
+	#: All changes after this serial are tracked.
+	#: Metadata fetched before it can't be checked against the changelog.
+	base_serial: int
+
+	#: The latest serial seen.
+	serial: int
+
+	#: The time (as a Unix timestamp) the changelog was last checked.
+	synced: float
+
+	#: Mapping of normalized project names to the serial of their most recent change.
+	changed: dict[str, int]
+
+
+_lock = threading.Lock()
+_state: Optional[ChangelogState] = None
+
+
+def _call(method: str, *params: Any) -> Any:
+	response = get_session().post(
+			XMLRPC_URL,
+			data=xmlrpc.client.dumps(params, method),
+			headers={"Content-Type": "text/xml"},
+			timeout=10,
+			)
+	response.raise_for_status()
+	return xmlrpc.client.loads(response.content)[0][0]
+
+
+def _load_state() -> Optional[ChangelogState]:
+	try:
+		return get_cache().get_json(STATE_KEY)
+	except ValueError:
+		return None
+
+
+def _forget_oldest(state: ChangelogState) -> None:
+	# Keeps the most recent half of the changes when there are more than MAX_TRACKED.
+
+	if len(state["changed"]) <= MAX_TRACKED:
+		return
+
+	serials = sorted(state["changed"].values())
+	cutoff = serials[len(serials) - MAX_TRACKED // 2 - 1]
+	state["changed"] = {name: serial for name, serial in state["changed"].items() if serial > cutoff}
+	state["base_serial"] = max(state["base_serial"], cutoff)
+
+
+def sync() -> Optional[ChangelogState]:
+	"""
+	Fetch changes since the last serial seen, if the changelog hasn't been checked in the last :py:data:`~.SYNC_INTERVAL` seconds.
+
+	Returns :py:obj:`None` if the changelog can't be obtained.
+	"""
+
+	global _state
+
+	with _lock:
+		if _state is not None and time.time() - _state["synced"] < SYNC_INTERVAL:
+			return _state
+
+	with single_flight("pypi/changelog"):
+		# Another worker may have synced while this one was waiting.
+		state = _load_state()
+
+		if state is None or time.time() - state["synced"] >= SYNC_INTERVAL:
+			try:
+				if state is None:
+					serial = int(_call("changelog_last_serial"))
+					state = {"base_serial": serial, "serial": serial, "synced": time.time(), "changed": {}}
+				else:
+					for name, _, _, _, serial in _call("changelog_since_serial", state["serial"]):
+						name = normalize(name)
+						state["changed"][name] = max(state["changed"].get(name, 0), serial)
+						state["serial"] = max(state["serial"], serial)
+					state["synced"] = time.time()
+					_forget_oldest(state)
+			except (requests.RequestException, xmlrpc.client.Error):
+				return None
+
+			get_cache().set_json(STATE_KEY, state)
+
+	with _lock:
+		_state = state
+
+	return state
+
+
+def confirmed_unchanged(
+		project_name: str,
+		last_serial: Optional[int],
+		changelog_serial: Optional[int],
+		) -> Optional[float]:
+	"""
+	Returns the time (as a Unix timestamp) at which the project was last confirmed unchanged since ``last_serial``.
+
+	Returns :py:obj:`None` if the project has changed, or if the changelog can't confirm it hasn't.
+
+	:param project_name: The normalized project name.
+	:param last_serial: The project's serial, as reported with its cached metadata.
+	:param changelog_serial: The latest changelog serial seen before the metadata was fetched.
+	"""
+
+	if last_serial is None or changelog_serial is None:
+		return None
+
+	state = sync()
+	if state is None or changelog_serial < state["base_serial"]:
+		# Changes since the metadata was fetched may have been made before tracking started, or forgotten.
+		return None
+
+	if state["changed"].get(project_name, 0) > last_serial:
+		# Changed since the metadata was fetched, or the metadata was already out of date when it was fetched.
+		return None
+
+	return state["synced"]
+
@@ -27,22 +27,24 @@ Routes for PyPI frontend.
 #
 
 # stdlib
+from typing import Union
 
 # 3rd party
 from flask import Response, render_template
 from packaging.requirements import InvalidRequirement
-from pypi_json import PyPIJSON
 from shippinglabel import normalize
 from shippinglabel.requirements import ComparableRequirement
 
 # this package
 from dependency_dash._app import app
-from dependency_dash.badges import make_badge, serve_badge
-from dependency_dash.htmx import htmx
+from dependency_dash.badges import get_cached_badge, make_badge, serve_badge
+from dependency_dash.htmx import htmx, stream_htmx_template
 from dependency_dash.pypi import (
 		_bad_package_badge,
 		_format_internal_link,
 		format_project_links,
+		get_client,
+		get_data,
 		get_dependency_status,
 		get_package_requirements
 		)
@@ -69,20 +71,19 @@ def pypi_package(name: str) -> Response:
 
 	project_name = normalize(name)
 
-	with PyPIJSON() as client:
-		try:
-			metadata = client.get_metadata(project_name)
-
-		except InvalidRequirement:
-			return Response(
-					render_template(
-							"pypi_package_404.html",
-							project_name=project_name,
-							description=f"Dependency status for https://pypi.org/project/{project_name}",
-							search_url="/search/pypi/",
-							),
-					404,
-					)
+	try:
+		metadata = get_client().get_metadata(project_name)
+
+	except InvalidRequirement:
+		return Response(
+				render_template(
+						"pypi_package_404.html",
+						project_name=project_name,
+						description=f"Dependency status for https://pypi.org/project/{project_name}",
+						search_url="/search/pypi/",
+						),
+				404,
+				)
 
 	return Response(
 			render_template(
@@ -96,7 +97,7 @@ def pypi_package(name: str) -> Response:
 
 
 @htmx(app, "/pypi/<name>/")
-def htmx_pypi_package(name: str) -> str:
+def htmx_pypi_package(name: str) -> Union[str, Response]:
 	"""
 	HTMX callback for obtaining the requirements table for the given PyPI package.
 
@@ -108,7 +109,7 @@ def htmx_pypi_package(name: str) -> str:
 	except NotImplementedError:
 		return render_template("no_supported_files.html")
 	else:
-		return render_template(
+		return stream_htmx_template(
 				"dependency_table.html",
 				data=data,
 				get_dependency_status=get_dependency_status,
@@ -127,14 +128,21 @@ def badge_pypi_package(name: str) -> Response:
 	:param name: The package name.
 	"""
 
-	# TODO: etag caching
-
 	try:
-		data = get_package_requirements(name)
+		# The package's requirements only change when its metadata does.
+		source = get_data(name)["etag"]
 	except InvalidRequirement:
 		return _bad_package_badge("not found")
+
+	cache_key = f"pypi/{normalize(name)}"
+	cached_badge = get_cached_badge(cache_key, source)
+	if cached_badge is not None:
+		return cached_badge
+
+	try:
+		data = get_package_requirements(name)
 	except NotImplementedError:
-		return _bad_package_badge("unsupported")
+		return _bad_package_badge("unsupported", cache_key, source)
 
 	else:
 		all_requirements: list[ComparableRequirement] = []
@@ -142,6 +150,6 @@ def badge_pypi_package(name: str) -> Response:
 			if include:
 				all_requirements.extend(requirements)
 
-		badge_svg = make_badge(get_dependency_status(all_requirements))
+		dependencies = list(get_dependency_status(all_requirements))
 
-		return serve_badge(badge_svg)
+		return serve_badge(make_badge(dependencies), cache_key, source, dependencies)
@@ -27,14 +27,22 @@ Flask HTTP routes.
 #
 
 # stdlib
-from typing import cast
+import functools
+import hmac
+import json
+import logging
+import time
+from typing import Any, cast
 
 # 3rd party
-from flask import Response, render_template, request
+from flask import Flask, Response, abort, before_render_template, g, render_template, request, template_rendered
 
 # this package
 from dependency_dash._app import GoToForm, app
 from dependency_dash.markdown import render_markdown_page
+from dependency_dash import metrics as _metrics
+from dependency_dash.metrics import REQUEST_LATENCY, REQUESTS, render_shared_metrics
+from dependency_dash.timing import SLOW_REQUEST_MS, RequestTimings, current_timings, start_request
 from dependency_dash.utils import canonical_url_header
 
 __all__ = [
@@ -42,12 +50,15 @@ __all__ = [
 		"about",
 		"usage",
 		"configuration",
+		"metrics",
 		"search",
 		"page_not_found",
 		"security_txt",
 		"server_error",
 		]
 
+logger = logging.getLogger(__name__)
+
 
 @app.route('/')
 def home() -> Response:
@@ -100,6 +111,92 @@ def configuration() -> Response:
 	return render_markdown_page("configuration.md")
 
 
+@app.route("/metrics")
+def metrics() -> Response:
+	"""
+	Route for the server's metrics, in the Prometheus text format.
+
+	The metrics are only served if ``DD_METRICS`` is set,
+	and require the token in ``DD_METRICS_TOKEN`` if that is set.
+	"""
+
+	if not _metrics.ENABLED:
+		abort(404)
+
+	if _metrics.TOKEN is not None:
+		authorization = request.headers.get("Authorization", '')
+		if not hmac.compare_digest(authorization.encode("UTF-8"), f"Bearer {_metrics.TOKEN}".encode("UTF-8")):
+			return Response("Unauthorized\n", status=401, headers={"WWW-Authenticate": "Bearer"}, content_type="text/plain")
+
+	return Response(render_shared_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.before_request
+def _start_request_timer() -> None:
+	start_request()
+
+
+@app.after_request
+def _add_server_timing(response: Response) -> Response:
+	timings = current_timings()
+	if timings is None:
+		return response
+
+	# Streamed responses are still being rendered, so the header only covers the time until it is sent.
+	response.headers["Server-Timing"] = timings.server_timing()
+
+	# Record the request once the whole response has been sent, so streamed responses are timed until the last chunk.
+	response.call_on_close(
+			functools.partial(
+					_record_request,
+					timings,
+					route=request.url_rule.rule if request.url_rule is not None else "<unmatched>",
+					method=request.method,
+					path=request.full_path.rstrip('?'),
+					status=response.status_code,
+					)
+			)
+
+	return response
+
+
+def _record_request(timings: RequestTimings, route: str, method: str, path: str, status: int) -> None:
+	duration = timings.elapsed()
+
+	REQUEST_LATENCY.observe(duration, route=route)
+	REQUESTS.inc(route=route, method=method, status=str(status))
+
+	if SLOW_REQUEST_MS is not None and duration * 1000 >= SLOW_REQUEST_MS:
+		spans = {name: {"ms": round(total * 1000, 1), "count": count} for name, (total, count) in timings.spans().items()}
+		logger.warning(
+				json.dumps({
+						"event": "slow_request",
+						"method": method,
+						"path": path,
+						"route": route,
+						"status": status,
+						"ms": round(duration * 1000, 1),
+						"spans": spans,
+						}),
+				)
+
+
+def _start_render_timer(sender: Flask, template: Any, **kwargs: Any) -> None:
+	g.setdefault("render_starts", []).append(time.perf_counter())
+
+
+def _record_render_time(sender: Flask, template: Any, **kwargs: Any) -> None:
+	timings = current_timings()
+	starts = g.get("render_starts")
+
+	if timings is not None and starts:
+		timings.add("render", time.perf_counter() - starts.pop())
+
+
+before_render_template.connect(_start_render_timer, app)
+template_rendered.connect(_record_render_time, app)
+
+
 def search_pypi(query: str) -> Response:
 	return app.redirect(f"/pypi/{query}", code=302)
 
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+#
+#  sessions.py
+"""
+Process-wide HTTP sessions for requests to GitHub and PyPI.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import os
+import threading
+import time
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+# 3rd party
+import requests
+from requests.adapters import HTTPAdapter
+
+# this package
+from dependency_dash.metrics import (
+		CONNECTION_POOL_CONNECTIONS,
+		CONNECTION_POOL_IDLE,
+		CONNECTION_POOL_REQUESTS,
+		REGISTRY,
+		UPSTREAM_IN_FLIGHT,
+		UPSTREAM_LATENCY,
+		UPSTREAM_REQUESTS
+		)
+
+__all__ = ["InstrumentedAdapter", "SharedSession", "get_adapter", "get_session", "pool_stats"]
+
+#: The number of per-host connection pools to keep.
+POOL_CONNECTIONS = int(os.getenv("DD_POOL_CONNECTIONS", 10))
+
+#: The maximum number of keep-alive connections to keep open to each host.
+POOL_MAXSIZE = int(os.getenv("DD_POOL_MAXSIZE", 20))
+
+USER_AGENT = "dependency-dash (+https://github.com/repo-helper/dependency-dash)"
+
+_lock = threading.Lock()
+_adapter: Optional[HTTPAdapter] = None
+_session: Optional["SharedSession"] = None
+
+
+class SharedSession(requests.Session):
+	"""
+	A :class:`requests.Session` shared by the whole process.
+
+	Libraries such as ``pypi-json`` and ``remote-wheel`` close the session they were given when they are done with it.
+	That would throw away the pooled connections, so :meth:`~.SharedSession.close` does nothing.
+	"""
+
+	def close(self) -> None:
+		"""
+		Does nothing; the session is shared.
+		"""
+
+
+class InstrumentedAdapter(HTTPAdapter):
+	"""
+	A transport adapter which records the number, status and latency of requests to each host.
+
+	For streamed responses (such as ranges of remote wheels) the latency is the time until the headers are received.
+	"""
+
+	def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:  # noqa: D102
+		host = urlparse(str(request.url)).hostname or ''
+		UPSTREAM_IN_FLIGHT.inc(host=host)
+		start = time.perf_counter()
+		status = "error"
+
+		try:
+			response = super().send(request, *args, **kwargs)
+			status = str(response.status_code)
+			return response
+		finally:
+			UPSTREAM_LATENCY.observe(time.perf_counter() - start, host=host)
+			UPSTREAM_REQUESTS.inc(host=host, status=status)
+			UPSTREAM_IN_FLIGHT.dec(host=host)
+
+
+def get_adapter() -> HTTPAdapter:
+	"""
+	Returns the process-wide transport adapter, which holds a keep-alive connection pool for each host.
+
+	The adapter may be mounted on other sessions (e.g. the one used by ``github3.py``) to share the pools.
+	"""
+
+	global _adapter
+
+	with _lock:
+		if _adapter is None:
+			_adapter = InstrumentedAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+
+	return _adapter
+
+
+def get_session() -> SharedSession:
+	"""
+	Returns the process-wide session used for requests to GitHub and PyPI.
+	"""
+
+	global _session
+
+	adapter = get_adapter()
+
+	with _lock:
+		if _session is None:
+			_session = SharedSession()
+			_session.headers["User-Agent"] = USER_AGENT
+			_session.mount("https://", adapter)
+			_session.mount("http://", adapter)
+
+	return _session
+
+
+def pool_stats() -> dict[str, dict[str, int]]:
+	"""
+	Returns usage statistics for each host's connection pool.
+
+	The returned dictionary maps ``<scheme>://<host>:<port>`` to a dictionary with the following keys:
+
+	* ``maxsize`` -- the maximum number of connections kept open.
+	* ``idle`` -- the number of open connections not currently in use.
+	* ``connections`` -- the total number of connections opened.
+	* ``requests`` -- the total number of requests made.
+	"""
+
+	pools = get_adapter().poolmanager.pools
+	stats = {}
+
+	for key in pools.keys():
+		pool = pools.get(key)
+		if pool is None:
+			continue
+
+		idle = sum(conn is not None for conn in list(pool.pool.queue)) if pool.pool is not None else 0
+		stats[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+				"maxsize": pool.pool.maxsize if pool.pool is not None else 0,
+				"idle": idle,
+				"connections": pool.num_connections,
+				"requests": pool.num_requests,
+				}
+
+	return stats
+
+
+def _collect_pool_stats() -> None:
+	for pool, stats in pool_stats().items():
+		CONNECTION_POOL_IDLE.set(stats["idle"], pool=pool)
+		CONNECTION_POOL_CONNECTIONS.set_total(stats["connections"], pool=pool)
+		CONNECTION_POOL_REQUESTS.set_total(stats["requests"], pool=pool)
+
+
+REGISTRY.add_collector(_collect_pool_stats)
@@ -18,3 +18,24 @@ window.onscroll = () => {
     navbarBrand.removeAttribute('tabindex')
   }
 }
+
+// If the request for a batch of repositories' statuses fails, load each repository's status separately
+const loadStatusesSeparately = (event) => {
+  const batch = event.detail.elt
+  if (!batch.dataset.statusCells) {
+    return
+  }
+
+  for (const cellId of batch.dataset.statusCells.split(' ')) {
+    const cell = document.getElementById(cellId)
+    if (cell && cell.dataset.statusUrl) {
+      cell.setAttribute('hx-get', cell.dataset.statusUrl)
+      cell.setAttribute('hx-trigger', 'load')
+      cell.setAttribute('hx-swap', 'outerHTML')
+      htmx.process(cell)
+    }
+  }
+}
+
+document.body.addEventListener('htmx:responseError', loadStatusesSeparately)
+document.body.addEventListener('htmx:sendError', loadStatusesSeparately)
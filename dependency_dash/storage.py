@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+#
+#  storage.py
+"""
+Persistent storage for cached data from GitHub and PyPI.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from typing import Any, NamedTuple, Optional
+
+# 3rd party
+import platformdirs
+from domdf_python_tools.paths import PathPlus
+
+__all__ = [
+		"CacheBackend",
+		"CacheEntry",
+		"FileBackend",
+		"GCResult",
+		"SQLiteBackend",
+		"collect_garbage",
+		"get_cache",
+		"import_file_cache",
+		"start_gc_thread",
+		]
+
+logger = logging.getLogger(__name__)
+
+#: The directory containing the cache.
+CACHE_ROOT = PathPlus(os.getenv("DD_CACHE_DIR") or platformdirs.user_cache_dir("dependency_dash"))
+
+#: Either ``"sqlite"`` (a single SQLite database) or ``"file"`` (one file per entry).
+BACKEND = os.getenv("DD_CACHE_BACKEND", "sqlite")
+
+#: The name of the SQLite database within :py:data:`~.CACHE_ROOT`.
+SQLITE_FILENAME = "cache.sqlite3"
+
+#: The maximum total size, in bytes, of the GitHub and PyPI caches. If :py:obj:`None` the size is not limited.
+MAX_BYTES: Optional[int] = int(os.environ["DD_CACHE_MAX_BYTES"]) if os.getenv("DD_CACHE_MAX_BYTES") else None
+
+#: Which entries to evict first when the cache is over :py:data:`~.MAX_BYTES`.
+#: Either ``"lru"`` (least recently used) or ``"lfu"`` (least frequently used).
+EVICTION_POLICY = os.getenv("DD_CACHE_EVICTION", "lru")
+
+#: Entries not used for this many seconds are removed by :func:`~.collect_garbage` (default 30 days).
+MAX_IDLE = int(os.getenv("DD_CACHE_MAX_IDLE", 30 * 24 * 60 * 60))
+
+#: The key prefixes of entries subject to garbage collection.
+GC_PREFIXES = ("github/", "pypi/", "parsed/")
+
+_lock = threading.Lock()
+_cache: Optional["CacheBackend"] = None
+
+
+class CacheEntry(NamedTuple):
+	"""
+	Information about an entry in a :class:`~.CacheBackend`.
+	"""
+
+	#: The entry's key.
+	key: str
+
+	#: The space, in bytes, taken by the entry.
+	size: int
+
+	#: The time (as a Unix timestamp) the entry was last read or written.
+	accessed: float
+
+	#: The number of times the entry has been read, if the backend records it.
+	hits: int
+
+
+class CacheBackend(ABC):
+	"""
+	Base class for stores of cached data.
+
+	Keys are ``/``-separated paths, such as ``pypi/r/requests.json``.
+	"""
+
+	@abstractmethod
+	def get(self, key: str) -> Optional[bytes]:
+		"""
+		Returns the value for ``key``, or :py:obj:`None` if there is no such entry.
+
+		:param key:
+		"""
+
+		raise NotImplementedError
+
+	@abstractmethod
+	def peek(self, key: str) -> Optional[bytes]:
+		"""
+		Returns the value for ``key``, or :py:obj:`None` if there is no such entry,
+		without recording that the entry has been used.
+
+		:param key:
+		"""
+
+		raise NotImplementedError
+
+	@abstractmethod
+	def set(self, key: str, value: bytes) -> None:
+		"""
+		Store ``value`` for ``key``, replacing any existing value.
+
+		:param key:
+		:param value:
+		"""
+
+		raise NotImplementedError
+
+	@abstractmethod
+	def delete(self, key: str) -> None:
+		"""
+		Remove the entry for ``key``, if there is one.
+
+		:param key:
+		"""
+
+		raise NotImplementedError
+
+	@abstractmethod
+	def keys(self, prefix: str = '') -> Iterator[str]:
+		"""
+		Returns an iterator over the keys which start with ``prefix``.
+
+		:param prefix:
+		"""
+
+		raise NotImplementedError
+
+	@abstractmethod
+	def entries(self, prefix: str = '') -> Iterator[CacheEntry]:
+		"""
+		Returns an iterator over information about the entries whose keys start with ``prefix``.
+
+		:param prefix:
+		"""
+
+		raise NotImplementedError
+
+	def flush(self) -> None:
+		"""
+		Write any buffered information about which entries have been used.
+		"""
+
+	def get_json(self, key: str) -> Any:
+		"""
+		Returns the value for ``key`` parsed as JSON, or :py:obj:`None` if there is no such entry.
+
+		:param key:
+		"""
+
+		value = self.get(key)
+		if value is None:
+			return None
+
+		return json.loads(value)
+
+	def set_json(self, key: str, value: Any) -> None:
+		"""
+		Store ``value`` for ``key`` as JSON.
+
+		:param key:
+		:param value:
+		"""
+
+		self.set(key, json.dumps(value, separators=(',', ':')).encode("UTF-8"))
+
+
+class FileBackend(CacheBackend):
+	"""
+	Stores each entry in a separate file.
+
+	Entries are written atomically, by writing to a temporary file and renaming it.
+
+	:param directory: The directory to store the files in.
+	"""
+
+	def __init__(self, directory: PathPlus):
+		self.directory = directory
+
+	def get(self, key: str) -> Optional[bytes]:  # noqa: D102
+		value = self.peek(key)
+
+		if value is not None:
+			# Record the access in the modification time, as access times often aren't updated.
+			with suppress(FileNotFoundError):
+				os.utime(self.directory / key)
+
+		return value
+
+	def peek(self, key: str) -> Optional[bytes]:  # noqa: D102
+		try:
+			return (self.directory / key).read_bytes()
+		except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+			return None
+
+	def set(self, key: str, value: bytes) -> None:  # noqa: D102
+		filename = self.directory / key
+		filename.parent.maybe_make(parents=True)
+
+		fd, tmpname = tempfile.mkstemp(dir=filename.parent, prefix=".tmp-")
+		try:
+			with os.fdopen(fd, "wb") as fp:
+				fp.write(value)
+			os.replace(tmpname, filename)
+		except BaseException:
+			with suppress(FileNotFoundError):
+				os.unlink(tmpname)
+			raise
+
+	def delete(self, key: str) -> None:  # noqa: D102
+		with suppress(FileNotFoundError, NotADirectoryError, IsADirectoryError):
+			(self.directory / key).unlink()
+
+	def keys(self, prefix: str = '') -> Iterator[str]:  # noqa: D102
+		for dirpath, dirnames, filenames in os.walk(self.directory):
+			dirnames.sort()
+			for filename in sorted(filenames):
+				if filename.startswith(".tmp-"):
+					continue
+
+				key = PathPlus(dirpath, filename).relative_to(self.directory).as_posix()
+				if key.startswith(prefix):
+					yield key
+
+	def entries(self, prefix: str = '') -> Iterator[CacheEntry]:  # noqa: D102
+		for key in self.keys(prefix):
+			try:
+				stat = (self.directory / key).stat()
+			except FileNotFoundError:
+				continue
+
+			yield CacheEntry(key, stat.st_size, stat.st_mtime, 0)
+
+
+class SQLiteBackend(CacheBackend):
+	"""
+	Stores entries in a single SQLite database, in write-ahead logging mode so readers don't block writers.
+
+	Values larger than ``compress_threshold`` bytes are compressed with zlib.
+
+	:param filename: The database file.
+	:param compress_threshold: The minimum size, in bytes, of values to compress.
+		If :py:obj:`None` values are not compressed.
+	:param max_idle: The maximum number of unused database connections to keep open for reuse.
+	"""
+
+	def __init__(self, filename: PathPlus, compress_threshold: Optional[int] = 512, max_idle: int = 8):
+		self.filename = filename
+		self.compress_threshold = compress_threshold
+		self.max_idle = max_idle
+
+		self._pool_lock = threading.Lock()
+		self._pool: list[sqlite3.Connection] = []
+		self._pool_pid = os.getpid()
+
+		# Reads are recorded in memory and written in batches, so reading doesn't need a write transaction.
+		self._access_lock = threading.Lock()
+		self._accesses: dict[str, tuple[int, float]] = {}
+		self._last_flush = time.time()
+
+	@contextmanager
+	def _connect(self) -> Iterator[sqlite3.Connection]:
+		# Connections are shared between threads through a pool, as threads are often short-lived
+		# and opening a connection costs far more than a query.
+		# A forked process starts a new pool, as connections can't be used across a fork.
+
+		with self._pool_lock:
+			if self._pool_pid != os.getpid():
+				self._pool, self._pool_pid = [], os.getpid()
+
+			connection = self._pool.pop() if self._pool else None
+
+		if connection is None:
+			connection = self._open()
+
+		try:
+			yield connection
+		finally:
+			with self._pool_lock:
+				if self._pool_pid == os.getpid() and len(self._pool) < self.max_idle:
+					self._pool.append(connection)
+					connection = None
+
+			if connection is not None:
+				connection.close()
+
+	def _open(self) -> sqlite3.Connection:
+		self.filename.parent.maybe_make(parents=True)
+		connection = sqlite3.connect(self.filename, timeout=30, isolation_level=None, check_same_thread=False)
+		connection.execute("PRAGMA journal_mode=WAL")
+		connection.execute("PRAGMA synchronous=NORMAL")
+		connection.execute(
+				"CREATE TABLE IF NOT EXISTS cache ("
+				"key TEXT PRIMARY KEY, "
+				"value BLOB NOT NULL, "
+				"compressed INTEGER NOT NULL, "
+				"size INTEGER NOT NULL, "
+				"accessed REAL NOT NULL, "
+				"hits INTEGER NOT NULL DEFAULT 0"
+				") WITHOUT ROWID"
+				)
+
+		return connection
+
+	def get(self, key: str) -> Optional[bytes]:  # noqa: D102
+		value = self.peek(key)
+		if value is None:
+			return None
+
+		with self._access_lock:
+			hits, _ = self._accesses.get(key, (0, 0))
+			self._accesses[key] = (hits + 1, time.time())
+			should_flush = len(self._accesses) >= 256 or time.time() - self._last_flush > 30
+
+		if should_flush:
+			self.flush()
+
+		return value
+
+	def peek(self, key: str) -> Optional[bytes]:  # noqa: D102
+		with self._connect() as connection:
+			row = connection.execute("SELECT value, compressed FROM cache WHERE key = ?", (key, )).fetchone()
+
+		if row is None:
+			return None
+
+		value, compressed = row
+		return zlib.decompress(value) if compressed else value
+
+	def set(self, key: str, value: bytes) -> None:  # noqa: D102
+		compressed = self.compress_threshold is not None and len(value) >= self.compress_threshold
+		stored = zlib.compress(value) if compressed else value
+
+		with self._connect() as connection:
+			connection.execute(
+					"INSERT OR REPLACE INTO cache (key, value, compressed, size, accessed) VALUES (?, ?, ?, ?, ?)",
+					(key, stored, int(compressed), len(stored), time.time()),
+					)
+
+	def delete(self, key: str) -> None:  # noqa: D102
+		with self._connect() as connection:
+			connection.execute("DELETE FROM cache WHERE key = ?", (key, ))
+
+	def keys(self, prefix: str = '') -> Iterator[str]:  # noqa: D102
+		# Fetch all the keys first so the cache can be modified while iterating.
+		with self._connect() as connection:
+			rows = connection.execute(
+					"SELECT key FROM cache WHERE substr(key, 1, ?) = ? ORDER BY key",
+					(len(prefix), prefix),
+					).fetchall()
+
+		for (key, ) in rows:
+			yield key
+
+	def entries(self, prefix: str = '') -> Iterator[CacheEntry]:  # noqa: D102
+		with self._connect() as connection:
+			rows = connection.execute(
+					"SELECT key, size, accessed, hits FROM cache WHERE substr(key, 1, ?) = ? ORDER BY key",
+					(len(prefix), prefix),
+					).fetchall()
+
+		for row in rows:
+			yield CacheEntry(*row)
+
+	def flush(self) -> None:  # noqa: D102
+		with self._access_lock:
+			accesses, self._accesses = self._accesses, {}
+			self._last_flush = time.time()
+
+		if accesses:
+			with self._connect() as connection, connection:
+				connection.execute("BEGIN")
+				connection.executemany(
+						"UPDATE cache SET accessed = max(accessed, ?), hits = hits + ? WHERE key = ?",
+						[(accessed, hits, key) for key, (hits, accessed) in accesses.items()],
+						)
+
+
+def get_cache() -> CacheBackend:
+	"""
+	Returns the process-wide cache backend, as selected by :py:data:`~.BACKEND`.
+	"""
+
+	global _cache
+
+	with _lock:
+		if _cache is None:
+			if BACKEND == "file":
+				_cache = FileBackend(CACHE_ROOT)
+			elif BACKEND == "sqlite":
+				_cache = SQLiteBackend(CACHE_ROOT / SQLITE_FILENAME)
+			else:
+				raise ValueError(f"Unknown cache backend {BACKEND!r}")
+
+	return _cache
+
+
+def _is_importable(key: str) -> bool:
+	# Skip the lock files, the database itself,
+	# and the files written before requirements files were cached as raw content.
+
+	if key.startswith("locks/") or key.startswith(SQLITE_FILENAME):
+		return False
+
+	if key.startswith("github/") and key.endswith(".dat") and "/raw/" not in key:
+		return False
+
+	if key.startswith("github/") and key.endswith("/dependency-dash.dat.missing"):
+		return False
+
+	return True
+
+
+def import_file_cache(directory: PathPlus = CACHE_ROOT, backend: Optional[CacheBackend] = None) -> int:
+	"""
+	Import the entries from a file cache (i.e. one written by :class:`~.FileBackend`) into ``backend``.
+
+	:param directory: The directory containing the file cache.
+	:param backend: The backend to import the entries into. Defaults to the process-wide backend.
+
+	:returns: The number of entries imported.
+	"""
+
+	if backend is None:
+		backend = get_cache()
+
+	source = FileBackend(directory)
+	count = 0
+
+	for key in source.keys():
+		if not _is_importable(key):
+			continue
+
+		value = source.get(key)
+		if value is not None:
+			backend.set(key, value)
+			count += 1
+
+	return count
+
+
+class GCResult(NamedTuple):
+	"""
+	The outcome of :func:`~.collect_garbage`.
+	"""
+
+	#: The number of entries removed because they had expired or had not been used for :py:data:`~.MAX_IDLE` seconds.
+	expired: int
+
+	#: The number of entries evicted to bring the cache within its size limit.
+	evicted: int
+
+	#: The total size, in bytes, of the removed entries.
+	reclaimed: int
+
+
+def _is_expired(backend: CacheBackend, entry: CacheEntry, now: float, max_idle: Optional[float]) -> bool:
+	if max_idle is not None and now - entry.accessed > max_idle:
+		return True
+
+	if entry.key.endswith(".missing"):
+		# Negative cache markers contain their expiry time.
+		# Reading it mustn't count as a use, or the marker would never become idle.
+		value = backend.peek(entry.key)
+		try:
+			expires = None if value is None else json.loads(value)
+		except ValueError:
+			return True
+
+		return expires is None or expires <= now
+
+	return False
+
+
+def collect_garbage(
+		backend: Optional[CacheBackend] = None,
+		max_bytes: Optional[int] = MAX_BYTES,
+		policy: str = EVICTION_POLICY,
+		max_idle: Optional[float] = MAX_IDLE,
+		) -> GCResult:
+	"""
+	Remove expired and unused entries from the GitHub and PyPI caches,
+	then evict entries until the caches are within ``max_bytes``.
+
+	:param backend: The cache to collect garbage from. Defaults to the process-wide backend.
+	:param max_bytes: The maximum total size, in bytes, of the entries.
+		If :py:obj:`None` only expired and unused entries are removed.
+	:param policy: Either ``"lru"`` to evict the least recently used entries first,
+		or ``"lfu"`` to evict the least frequently used entries first.
+	:param max_idle: Remove entries which haven't been used for this many seconds.
+		If :py:obj:`None` entries are only removed if they have expired or to meet ``max_bytes``.
+	"""
+
+	if policy not in {"lru", "lfu"}:
+		raise ValueError(f"Unknown eviction policy {policy!r}")
+
+	if backend is None:
+		backend = get_cache()
+
+	backend.flush()
+
+	now = time.time()
+	expired = evicted = reclaimed = 0
+	live = []
+
+	for entry in backend.entries():
+		if not entry.key.startswith(GC_PREFIXES):
+			continue
+
+		if _is_expired(backend, entry, now, max_idle):
+			backend.delete(entry.key)
+			expired += 1
+			reclaimed += entry.size
+		else:
+			live.append(entry)
+
+	if max_bytes is not None:
+		total_size = sum(entry.size for entry in live)
+
+		if policy == "lfu":
+			live.sort(key=lambda e: (e.hits, e.accessed))
+		else:
+			live.sort(key=lambda e: e.accessed)
+
+		for entry in live:
+			if total_size <= max_bytes:
+				break
+
+			backend.delete(entry.key)
+			evicted += 1
+			reclaimed += entry.size
+			total_size -= entry.size
+
+	return GCResult(expired, evicted, reclaimed)
+
+
+def start_gc_thread(interval: float) -> threading.Thread:
+	"""
+	Start a background thread which runs :func:`~.collect_garbage` every ``interval`` seconds.
+
+	When there are several worker processes only one of them collects garbage in each interval.
+
+	:param interval:
+	"""
+
+	# this package
+	from dependency_dash.caching import single_flight
+
+	def sweep() -> None:
+		while True:
+			time.sleep(interval)
+
+			with single_flight("cache/gc"):
+				cache = get_cache()
+				last_run = cache.get_json("gc.json") or 0
+
+				if time.time() - last_run >= interval:
+					result = collect_garbage(cache)
+					cache.set_json("gc.json", time.time())
+					logger.info(
+							"Cache garbage collection: removed %d expired entries, evicted %d entries, reclaimed %d bytes",
+							result.expired,
+							result.evicted,
+							result.reclaimed,
+							)
+
+	thread = threading.Thread(target=sweep, name="dependency-dash-gc", daemon=True)
+	thread.start()
+	return thread
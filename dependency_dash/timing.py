@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+#
+#  timing.py
+"""
+Per-request timing spans, reported in the ``Server-Timing`` response header and the slow request log.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Callable, Optional, TypeVar
+
+__all__ = ["RequestTimings", "current_timings", "span", "start_request", "timed"]
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+#: Requests taking longer than this many milliseconds are logged with their timing spans.
+#: If :py:obj:`None` no requests are logged.
+SLOW_REQUEST_MS: Optional[float] = float(os.environ["DD_SLOW_REQUEST_MS"]) if os.getenv("DD_SLOW_REQUEST_MS") else None
+
+_current: contextvars.ContextVar[Optional["RequestTimings"]] = contextvars.ContextVar("timings", default=None)
+
+
+class RequestTimings:
+	"""
+	The total time spent in each kind of span during a request.
+
+	Spans may be recorded from several threads at once (e.g. concurrent PyPI lookups),
+	in which case their durations are summed.
+	"""
+
+	def __init__(self):
+		#: The time (from :func:`time.perf_counter`) the request started.
+		self.start = time.perf_counter()
+
+		self._lock = threading.Lock()
+		# name -> (total duration in seconds, count)
+		self._spans: dict[str, tuple[float, int]] = {}
+
+	def add(self, name: str, duration: float) -> None:
+		"""
+		Record a span.
+
+		:param name: The kind of span, e.g. ``'pypi'``.
+		:param duration: The span's duration, in seconds.
+		"""
+
+		with self._lock:
+			total, count = self._spans.get(name, (0.0, 0))
+			self._spans[name] = (total + duration, count + 1)
+
+	def elapsed(self) -> float:
+		"""
+		Returns the time, in seconds, since the request started.
+		"""
+
+		return time.perf_counter() - self.start
+
+	def spans(self) -> dict[str, tuple[float, int]]:
+		"""
+		Returns a mapping of span names to their total duration (in seconds) and the number of spans.
+		"""
+
+		with self._lock:
+			return dict(self._spans)
+
+	def server_timing(self) -> str:
+		"""
+		Returns the spans, and the time since the request started, as a ``Server-Timing`` header value.
+		"""
+
+		entries = [
+				f'{name};dur={total * 1000:.1f};desc="{count} calls"' for name, (total, count) in self.spans().items()
+				]
+		entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+		return ", ".join(entries)
+
+
+def start_request() -> RequestTimings:
+	"""
+	Start recording spans for a new request in the current context.
+	"""
+
+	timings = RequestTimings()
+	_current.set(timings)
+	return timings
+
+
+def current_timings() -> Optional[RequestTimings]:
+	"""
+	Returns the spans recorded for the current request, or :py:obj:`None` if not in a request.
+	"""
+
+	return _current.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+	"""
+	Context manager which records the time taken by the :keyword:`with` block against the current request.
+
+	:param name: The kind of span, e.g. ``'pypi'``.
+	"""
+
+	timings = _current.get()
+	if timings is None:
+		yield
+		return
+
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		timings.add(name, time.perf_counter() - start)
+
+
+def timed(name: str) -> Callable[[_F], _F]:
+	"""
+	Decorator which records each call to the function as a span.
+
+	:param name: The kind of span, e.g. ``'pypi'``.
+	"""
+
+	def decorator(func: _F) -> _F:
+
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs) -> Any:
+			with span(name):
+				return func(*args, **kwargs)
+
+		return wrapper  # type: ignore[return-value]
+
+	return decorator
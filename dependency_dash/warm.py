@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+#
+#  warm.py
+"""
+Fill the caches for a list of repositories and packages in advance, e.g. after a deploy or after the cache is cleared.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, NamedTuple, Optional
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from packaging.requirements import InvalidRequirement
+from shippinglabel import normalize
+
+# this package
+from dependency_dash.github import get_repo_requirements, get_repository, parse_repo_url
+from dependency_dash.pypi import get_data, get_package_requirements
+from dependency_dash.storage import get_cache
+
+__all__ = ["RateLimiter", "WarmResult", "read_targets", "warm"]
+
+#: The default maximum number of GitHub repositories looked up per second.
+#: Each lookup may make one request to the GitHub API, which allows 5000 requests an hour.
+GITHUB_RATE = 1.0
+
+#: The default maximum number of PyPI lookups per second.
+PYPI_RATE = 10.0
+
+
+class RateLimiter:
+	"""
+	Limits the rate of an operation, allowing short bursts.
+
+	:param rate: The maximum average number of operations per second. If ``0`` the rate is not limited.
+	:param burst: The maximum number of operations which may happen at once after a quiet period.
+	"""
+
+	def __init__(self, rate: float, burst: int = 1):
+		self.rate = rate
+		self.burst = burst
+
+		self._lock = threading.Lock()
+		self._tokens = float(burst)
+		self._updated = time.monotonic()
+
+	def acquire(self) -> None:
+		"""
+		Wait until the operation may happen.
+		"""
+
+		if self.rate <= 0:
+			return
+
+		while True:
+			with self._lock:
+				now = time.monotonic()
+				self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+				self._updated = now
+
+				if self._tokens >= 1:
+					self._tokens -= 1
+					return
+
+				delay = (1 - self._tokens) / self.rate
+
+			time.sleep(delay)
+
+
+class WarmResult(NamedTuple):
+	"""
+	The outcome of :func:`~.warm`.
+	"""
+
+	#: The number of repositories and packages whose data was cached.
+	succeeded: int
+
+	#: The number of their dependencies whose metadata was cached.
+	dependencies: int
+
+	#: The repositories, packages and dependencies which couldn't be cached, and why.
+	failed: list[tuple[str, str]]
+
+
+def read_targets(filename: PathPlus) -> tuple[list[str], list[str]]:
+	"""
+	Read the repositories and packages to warm the caches for from a file.
+
+	Each line contains either a GitHub repository, as ``<user>/<repo>`` or its URL, or a PyPI package name.
+	Blank lines and lines starting with ``#`` are ignored.
+
+	:param filename:
+
+	:returns: The repositories' full names, and the packages' names.
+	"""
+
+	repositories, packages = [], []
+
+	for lineno, line in enumerate(PathPlus(filename).read_lines(), start=1):
+		line = line.strip()
+
+		if not line or line.startswith('#'):
+			continue
+		elif line.startswith("https://"):
+			repositories.append('/'.join(parse_repo_url(line)))
+		elif line.count('/') == 1 and all(line.split('/')):
+			repositories.append(line)
+		elif '/' not in line:
+			packages.append(line)
+		else:
+			raise ValueError(f"{filename}:{lineno}: Not a repository or package name: {line!r}")
+
+	return repositories, packages
+
+
+def _warm_repository(full_name: str, limiter: RateLimiter) -> set[str]:
+	# Returns the names of the repository's dependencies.
+
+	limiter.acquire()
+
+	repo = get_repository(*full_name.split('/'))
+	if repo is None:
+		raise LookupError("Repository not found")
+
+	try:
+		data = get_repo_requirements(repo.full_name, repo.default_branch)
+	except NotImplementedError:
+		# No supported files.
+		return set()
+
+	return {req.name for _, requirements, _, _ in data for req in requirements}
+
+
+def _warm_package(name: str, limiter: RateLimiter) -> set[str]:
+	# Returns the names of the package's dependencies.
+
+	limiter.acquire()
+	get_data(name)
+
+	limiter.acquire()
+	try:
+		data = get_package_requirements(name)
+	except NotImplementedError:
+		# No wheels.
+		return set()
+
+	return {req.name for _, requirements, _, _ in data for req in requirements}
+
+
+def _warm_dependency(name: str, limiter: RateLimiter) -> set[str]:
+	limiter.acquire()
+
+	try:
+		get_data(name)
+	except InvalidRequirement:
+		# Not on PyPI (e.g. a private package); its absence is cached too.
+		pass
+
+	return set()
+
+
+def warm(
+		repositories: list[str],
+		packages: list[str],
+		max_workers: int = 8,
+		github_rate: float = GITHUB_RATE,
+		pypi_rate: float = PYPI_RATE,
+		dependencies: bool = True,
+		progress: Optional[Callable[[str, Optional[Exception], int, int], None]] = None,
+		) -> WarmResult:
+	"""
+	Fill the caches for the given repositories and packages.
+
+	For each repository its metadata is fetched from GitHub and its requirements are downloaded and parsed.
+	For each package its metadata is fetched from PyPI and the requirements of its latest wheel are read.
+	The PyPI metadata of the dependencies of both is then fetched too.
+
+	Only the shared cache (see ``DD_CACHE_BACKEND``) is filled,
+	as each worker process has its own in-memory caches.
+	Data which is already cached and fresh is not requested again.
+
+	:param repositories: The repositories' full names, in the form ``<user>/<repo>``.
+	:param packages: The packages' names.
+	:param max_workers: The maximum number of lookups in progress at once.
+	:param github_rate: The maximum number of repositories looked up per second. If ``0`` the rate is not limited.
+	:param pypi_rate: The maximum number of PyPI lookups per second. If ``0`` the rate is not limited.
+	:param dependencies: Whether to fetch the metadata of the repositories' and packages' dependencies.
+	:param progress: Function called when each lookup finishes, with a label such as ``'github/<user>/<repo>'``,
+		the exception raised (or :py:obj:`None` if the lookup succeeded),
+		the number of lookups finished, and the number of lookups so far (which grows as dependencies are found).
+	"""
+
+	github_limiter = RateLimiter(github_rate)
+	pypi_limiter = RateLimiter(pypi_rate, burst=max_workers)
+
+	succeeded = dependency_count = finished = 0
+	failed: list[tuple[str, str]] = []
+
+	# Projects whose metadata is already being fetched.
+	seen = {normalize(name) for name in packages}
+
+	with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dependency-dash-warm") as executor:
+		pending: dict[Future[set[str]], tuple[str, bool]] = {}
+
+		for full_name in repositories:
+			pending[executor.submit(_warm_repository, full_name, github_limiter)] = (f"github/{full_name}", True)
+
+		for name in packages:
+			pending[executor.submit(_warm_package, name, pypi_limiter)] = (f"pypi/{name}", True)
+
+		submitted = len(pending)
+
+		while pending:
+			done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+			for future in done:
+				label, is_target = pending.pop(future)
+				finished += 1
+
+				try:
+					found = future.result()
+				except Exception as e:
+					failed.append((label, str(e) or type(e).__name__))
+					if progress is not None:
+						progress(label, e, finished, submitted)
+					continue
+
+				if is_target:
+					succeeded += 1
+				else:
+					dependency_count += 1
+
+				if progress is not None:
+					progress(label, None, finished, submitted)
+
+				if not dependencies:
+					continue
+
+				for name in sorted(found):
+					if normalize(name) not in seen:
+						seen.add(normalize(name))
+						pending[executor.submit(_warm_dependency, name, pypi_limiter)] = (f"pypi/{name}", False)
+						submitted += 1
+
+	# Record the cache entries' use, so they aren't the first to be evicted.
+	get_cache().flush()
+
+	return WarmResult(succeeded, dependency_count, failed)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+#
+#  wsgi.py
+"""
+The dependency-dash Flask app, with all its routes registered.
+
+Importing this module also starts the background tasks configured by environment variables.
+"""
+#
+#  Copyright © 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import logging
+import os
+
+# 3rd party
+import restx_monkey as monkey  # type: ignore[import-untyped]
+
+monkey.patch_restx()
+
+# this package
+import dependency_dash.github.api  # noqa: E402
+import dependency_dash.pypi.api  # noqa: E402
+from dependency_dash import routes  # noqa: F401,E402
+from dependency_dash._app import api, app  # noqa: E402
+from dependency_dash.badges import prewarm_badges  # noqa: E402
+from dependency_dash.metrics import ENABLED as METRICS_ENABLED  # noqa: E402
+from dependency_dash.metrics import start_metrics_thread  # noqa: E402
+from dependency_dash.github import routes as _github_routes  # noqa: F401,E402
+from dependency_dash.pypi import routes as _pypi_routes  # noqa: F401,E402
+from dependency_dash.storage import start_gc_thread  # noqa: E402
+
+__all__ = ["app"]
+
+# Log the app's own messages (e.g. slow requests and cache garbage collection) unless the server configures logging.
+logging.basicConfig(level=os.getenv("DD_LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+api.add_namespace(dependency_dash.github.api.api)
+api.add_namespace(dependency_dash.pypi.api.api)
+
+if os.getenv("DD_PREWARM_BADGES"):
+	prewarm_badges(int(os.environ["DD_PREWARM_BADGES"]))
+
+if os.getenv("DD_CACHE_GC_INTERVAL"):
+	start_gc_thread(float(os.environ["DD_CACHE_GC_INTERVAL"]))
+
+if METRICS_ENABLED:
+	start_metrics_thread()
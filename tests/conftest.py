@@ -0,0 +1,7 @@
+# stdlib
+import os
+import tempfile
+
+# The app reads its configuration when it is imported, so this must come first.
+os.environ.setdefault("GITHUB_TOKEN", "1234")
+os.environ["DD_CACHE_DIR"] = tempfile.mkdtemp(prefix="dependency-dash-tests-")
@@ -0,0 +1,297 @@
+# Small HTTP servers standing in for PyPI and GitHub, for tests which exercise the app's real HTTP requests.
+
+# stdlib
+import hashlib
+import json
+import re
+import threading
+import time
+import xmlrpc.client
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, NamedTuple
+from urllib.parse import urlsplit
+
+# 3rd party
+from shippinglabel import normalize
+
+
+class Reply(NamedTuple):
+	status: int
+	headers: dict[str, str]
+	body: bytes = b''
+
+
+#: A function which takes the request's method, path (including the query string), headers and body,
+#: and returns the reply. Header names are lowercase.
+Handler = Callable[[str, str, dict[str, str], bytes], Reply]
+
+
+def json_reply(data: Any, **headers: str) -> Reply:
+	return Reply(200, {"content-type": "application/json", **headers}, json.dumps(data).encode("UTF-8"))
+
+
+def not_found() -> Reply:
+	return Reply(404, {"content-type": "application/json"}, b'{"message": "Not Found"}')
+
+
+def conditional(headers: dict[str, str], reply: Reply) -> Reply:
+	# Answer requests for unchanged resources with "304 Not Modified".
+
+	if reply.status == 200 and headers.get("if-none-match") == reply.headers.get("etag"):
+		return Reply(304, {name: value for name, value in reply.headers.items() if name != "content-type"})
+
+	return reply
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	server: "_Server"
+
+	def _handle(self) -> None:
+		body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+		headers = {name.lower(): value for name, value in self.headers.items()}
+
+		with self.server.lock:
+			self.server.requests.append(f"{self.command} {urlsplit(self.path).path.rstrip('/')}")
+
+		reply = self.server.handler(self.command, self.path, headers, body)
+
+		self.send_response_only(reply.status)
+		if "date" not in reply.headers:
+			self.send_header("Date", self.date_time_string())
+		for name, value in reply.headers.items():
+			self.send_header(name, value)
+		self.send_header("Content-Length", str(len(reply.body)))
+		self.end_headers()
+		self.wfile.write(reply.body)
+
+	do_GET = do_POST = _handle
+
+	def log_message(self, format: str, *args: Any) -> None:  # noqa: A002  # pylint: disable=redefined-builtin
+		pass
+
+
+class _Server(ThreadingHTTPServer):
+	daemon_threads = True
+
+	def __init__(self, handler: Handler):
+		super().__init__(("127.0.0.1", 0), _RequestHandler)
+		self.handler = handler
+		self.lock = threading.Lock()
+		self.requests: list[str] = []
+
+
+class StandIn:
+	# Serves requests with the given handler from a background thread, while used as a context manager.
+
+	def __init__(self, handler: Handler):
+		self._server = _Server(handler)
+
+	@property
+	def url(self) -> str:
+		return f"http://127.0.0.1:{self._server.server_port}"
+
+	@property
+	def requests(self) -> list[str]:
+		# The method and path of each request received, e.g. ``'GET /pypi/requests/json'``.
+		return self._server.requests
+
+	def __enter__(self) -> "StandIn":
+		threading.Thread(target=self._server.serve_forever, daemon=True).start()
+		return self
+
+	def __exit__(self, *args: object) -> None:
+		self._server.shutdown()
+		self._server.server_close()
+
+
+class PyPI:
+	# Serves projects' metadata from the JSON API and their changes from the XML-RPC changelog.
+	# ``projects`` maps project names to their versions, which are released when the stand-in is created.
+
+	def __init__(self, projects: dict[str, list[str]]):
+		self.serial = 1000
+		self.changelog: list[tuple[str, str, int, str, int]] = []
+		self.versions: dict[str, list[str]] = {}
+		self.serials: dict[str, int] = {}
+
+		# Replies served once, in place of the reply for their path, as a CDN might serve an outdated reply.
+		self.stale: dict[str, Reply] = {}
+
+		for name, versions in projects.items():
+			for version in versions:
+				self.release(name, version)
+
+	def release(self, name: str, version: str) -> int:
+		# Returns the serial of the release.
+
+		self.serial += 1
+		self.versions.setdefault(normalize(name), []).append(version)
+		self.serials[normalize(name)] = self.serial
+		self.changelog.append((name, version, int(time.time()), "new release", self.serial))
+		return self.serial
+
+	def project(self, name: str) -> Reply:
+		name = normalize(name)
+		if name not in self.versions:
+			return not_found()
+
+		serial = self.serials[name]
+		data = {
+				"info": {
+						"name": name,
+						"version": self.versions[name][-1],
+						"home_page": '',
+						"license": "MIT",
+						"package_url": f"https://pypi.org/project/{name}/",
+						"project_urls": {},
+						},
+				"last_serial": serial,
+				"releases": {version: [] for version in self.versions[name]},
+				"urls": [],
+				}
+
+		return json_reply(
+				data,
+				etag=f'"{name}-{serial}"',
+				date=formatdate(usegmt=True),
+				**{"x-pypi-last-serial": str(serial)},
+				)
+
+	def __call__(self, method: str, path: str, headers: dict[str, str], body: bytes) -> Reply:
+		parts = urlsplit(path).path.strip('/').split('/')
+
+		if method == "POST" and parts == ["pypi"]:
+			params, method_name = xmlrpc.client.loads(body)
+			if method_name == "changelog_last_serial":
+				result: Any = self.serial
+			else:
+				result = [list(entry) for entry in self.changelog if entry[4] > params[0]]  # type: ignore[operator]
+
+			response = xmlrpc.client.dumps((result, ), methodresponse=True)
+			return Reply(200, {"content-type": "text/xml"}, response.encode("UTF-8"))
+
+		if len(parts) != 3 or parts[0] != "pypi" or parts[2] != "json":
+			return not_found()
+
+		if parts[1] in self.stale:
+			return self.stale.pop(parts[1])
+
+		return conditional(headers, self.project(parts[1]))
+
+
+class GitHub:
+	# Serves repositories' metadata from the REST API (at ``/repos/<user>/<repo>``),
+	# their files from the GraphQL API (at ``/graphql``)
+	# and as GitHub's raw file host does (at ``/<user>/<repo>/<ref>/<path>``).
+	# ``repositories`` maps repositories' full names to their files' paths and contents.
+
+	def __init__(self, repositories: dict[str, dict[str, str]], default_branch: str = "master"):
+		self.default_branch = default_branch
+		self.files = {
+				full_name: {path: content.encode("UTF-8") for path, content in files.items()}
+				for full_name, files in repositories.items()
+				}
+
+		#: The time, in seconds, for which raw files may be cached.
+		self.max_age = 300
+
+		#: The length at which the GraphQL API truncates files' text.
+		self.max_text_length = 512 * 1024
+
+		#: The GraphQL queries received.
+		self.queries: list[str] = []
+
+	def _find(self, user: str, repo: str) -> str:
+		# GitHub's user and repository names are case insensitive.
+		for full_name in self.files:
+			if full_name.lower() == f"{user}/{repo}".lower():
+				return full_name
+
+		raise KeyError(f"{user}/{repo}")
+
+	def oid(self, full_name: str) -> str:
+		# The SHA of the commit at the head of the default branch, which changes with the files.
+		return hashlib.sha1(repr(sorted(self.files[full_name].items())).encode("UTF-8")).hexdigest()
+
+	def repository(self, user: str, repo: str) -> Reply:
+		try:
+			full_name = self._find(user, repo)
+		except KeyError:
+			return not_found()
+
+		data = {"full_name": full_name, "default_branch": self.default_branch}
+		return json_reply(data, etag=f'"{full_name}-{self.default_branch}"')
+
+	def raw_file(self, user: str, repo: str, ref: str, path: str) -> Reply:
+		try:
+			content = self.files[self._find(user, repo)][path]
+		except KeyError:
+			return Reply(404, {"content-type": "text/plain"}, b"404: Not Found")
+
+		if ref not in {self.default_branch, self.oid(self._find(user, repo))}:
+			return Reply(404, {"content-type": "text/plain"}, b"404: Not Found")
+
+		headers = {
+				"content-type": "text/plain",
+				"etag": f'"{hashlib.sha1(content).hexdigest()}"',
+				"expires": formatdate(time.time() + self.max_age, usegmt=True),
+				}
+		return Reply(200, headers, content)
+
+	def graphql(self, body: bytes) -> Reply:
+		# Answers the repository queries built by dependency_dash.github.graphql.
+		# Each repository field is followed by its file fields, up to the next repository field.
+
+		request = json.loads(body)
+		query, variables = request["query"], request["variables"]
+		self.queries.append(query)
+
+		repository_fields = list(re.finditer(r"(\w+): repository\(owner: \$(\w+), name: \$(\w+)\)", query))
+		data: dict[str, Any] = {}
+
+		for idx, match in enumerate(repository_fields):
+			alias, owner, name = match.groups()
+
+			try:
+				full_name = self._find(variables[owner], variables[name])
+			except KeyError:
+				data[alias] = None
+				continue
+
+			oid = self.oid(full_name)
+			data[alias] = {
+					"nameWithOwner": full_name,
+					"defaultBranchRef": {"name": self.default_branch, "target": {"oid": oid}},
+					}
+
+			end = repository_fields[idx + 1].start() if idx + 1 < len(repository_fields) else len(query)
+			for file_alias, expression in re.findall(r"(\w+): object\(expression: \$(\w+)\)", query[match.end():end]):
+				ref, filename = variables[expression].split(':', 1)
+				content = self.files[full_name].get(filename)
+
+				if ref not in {"HEAD", oid} or content is None:
+					data[alias][file_alias] = None
+				else:
+					text = content.decode("UTF-8")
+					data[alias][file_alias] = {
+							"text": text[:self.max_text_length],
+							"isTruncated": len(text) > self.max_text_length,
+							}
+
+		return json_reply({"data": data})
+
+	def __call__(self, method: str, path: str, headers: dict[str, str], body: bytes) -> Reply:
+		parts = urlsplit(path).path.strip('/').split('/')
+
+		if method == "POST" and parts == ["graphql"]:
+			return self.graphql(body)
+
+		if method == "GET" and len(parts) == 3 and parts[0] == "repos":
+			return conditional(headers, self.repository(parts[1], parts[2]))
+
+		if method == "GET" and len(parts) >= 4:
+			return conditional(headers, self.raw_file(parts[0], parts[1], parts[2], '/'.join(parts[3:])))
+
+		return not_found()
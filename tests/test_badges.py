@@ -0,0 +1,219 @@
+# stdlib
+import hashlib
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+# 3rd party
+import pytest
+from shippinglabel.requirements import ComparableRequirement
+
+# this package
+import dependency_dash.github
+import dependency_dash.pypi
+from dependency_dash import app
+from dependency_dash.badges import BADGE_CACHE, make_badge, prewarm_badges, render_badge, serve_badge
+from dependency_dash.github import REPOSITORY_CACHE
+from dependency_dash.github import routes as github_routes
+from dependency_dash.github._env import GITHUB
+from dependency_dash.pypi import MEMORY_CACHE, _invalid_metadata
+from dependency_dash.pypi import routes as pypi_routes
+from dependency_dash.storage import get_cache
+from tests.stand_ins import GitHub, PyPI, StandIn
+
+
+@pytest.fixture()
+def github() -> GitHub:
+	return GitHub({
+			"octocat/hello-world": {"requirements.txt": "requests<2.32\n"},
+			"octocat/no-requirements": {"README.md": "Hello world\n"},
+			})
+
+
+@pytest.fixture()
+def pypi() -> PyPI:
+	return PyPI({"requests": ["2.31.0"], "flask": ["3.0.0"]})
+
+
+@pytest.fixture()
+def stand_ins(github: GitHub, pypi: PyPI, monkeypatch: pytest.MonkeyPatch) -> Iterator[tuple[StandIn, StandIn]]:
+	with StandIn(github) as github_stand_in, StandIn(pypi) as pypi_stand_in:
+		monkeypatch.setattr(GITHUB.session, "base_url", github_stand_in.url)
+		monkeypatch.setattr(dependency_dash.github, "RAW_URL", github_stand_in.url)
+		monkeypatch.setattr(dependency_dash.pypi, "PYPI_ENDPOINT", f"{pypi_stand_in.url}/pypi")
+
+		for prefix in ["github/", "pypi/", "badges/"]:
+			for key in get_cache().keys(prefix):
+				get_cache().delete(key)
+
+		BADGE_CACHE.clear()
+		MEMORY_CACHE.clear()
+		REPOSITORY_CACHE.clear()
+
+		yield github_stand_in, pypi_stand_in
+
+
+@pytest.fixture()
+def evaluated(monkeypatch: pytest.MonkeyPatch) -> list[list[str]]:
+	# The requirements whose statuses were determined for each badge.
+	calls = []
+
+	def wrap(get_dependency_status: Any) -> Any:
+
+		def wrapper(requirements: Iterable[ComparableRequirement]) -> Any:
+			requirements = list(requirements)
+			calls.append(sorted(map(str, requirements)))
+			return get_dependency_status(requirements)
+
+		return wrapper
+
+	monkeypatch.setattr(github_routes, "get_dependency_status", wrap(github_routes.get_dependency_status))
+	monkeypatch.setattr(pypi_routes, "get_dependency_status", wrap(pypi_routes.get_dependency_status))
+	return calls
+
+
+def expire_pypi(project_name: str) -> None:
+	# Make the cached metadata old enough to need revalidating.
+	MEMORY_CACHE.pop(project_name)
+
+	cache_key = f"pypi/{project_name[0]}/{project_name}.json"
+	data = get_cache().get_json(cache_key)
+	data["last_modified"] = 0
+	get_cache().set_json(cache_key, data)
+
+
+def badge_text(path: str) -> str:
+	response = app.test_client().get(path)
+	assert response.status_code == 200
+	return response.get_data(as_text=True)
+
+
+@pytest.mark.usefixtures("stand_ins")
+def test_github_badge_reused(evaluated: list[list[str]]):
+	assert "up-to-date" in badge_text("/github/octocat/hello-world/badge.svg")
+	assert evaluated == [["requests<2.32"]]
+
+	assert "up-to-date" in badge_text("/github/octocat/hello-world/badge.svg")
+	assert evaluated == [["requests<2.32"]]
+
+	# Other workers share the badge.
+	BADGE_CACHE.clear()
+	assert "up-to-date" in badge_text("/github/Octocat/Hello-World/badge.svg")
+	assert evaluated == [["requests<2.32"]]
+
+
+@pytest.mark.usefixtures("stand_ins")
+def test_github_badge_dependency_changed(pypi: PyPI, evaluated: list[list[str]]):
+	assert "up-to-date" in badge_text("/github/octocat/hello-world/badge.svg")
+
+	pypi.release("requests", "2.32.0")
+	expire_pypi("requests")
+
+	assert "1 outdated" in badge_text("/github/octocat/hello-world/badge.svg")
+	assert len(evaluated) == 2
+
+
+@pytest.mark.usefixtures("stand_ins")
+def test_github_badge_file_changed(github: GitHub, evaluated: list[list[str]]):
+	assert "up-to-date" in badge_text("/github/octocat/hello-world/badge.svg")
+
+	github.files["octocat/hello-world"]["requirements.txt"] = b"requests<2.31\n"
+	get_cache().delete("github/octocat/hello-world/raw/master/requirements.txt.json")
+
+	assert "1 outdated" in badge_text("/github/octocat/hello-world/badge.svg")
+	assert evaluated == [["requests<2.32"], ["requests<2.31"]]
+
+
+def test_unsupported_badge_reused(stand_ins: tuple[StandIn, StandIn], monkeypatch: pytest.MonkeyPatch):
+	assert "unsupported" in badge_text("/github/octocat/no-requirements/badge.svg")
+
+	def get_repo_requirements(*args: Any) -> Any:
+		raise AssertionError("Unexpected evaluation")
+
+	monkeypatch.setattr(github_routes, "get_repo_requirements", get_repo_requirements)
+	BADGE_CACHE.clear()
+
+	assert "unsupported" in badge_text("/github/octocat/no-requirements/badge.svg")
+
+
+@pytest.mark.usefixtures("stand_ins")
+@pytest.mark.parametrize("path", ["/github/octocat/missing/badge.svg", "/pypi/missing/badge.svg"])
+def test_not_found_badge_revalidated(path: str):
+	response = app.test_client().get(path)
+	assert response.status_code == 200
+	assert "not found" in response.get_data(as_text=True)
+	assert response.headers["Cache-Control"]
+
+	response = app.test_client().get(path, headers={"If-None-Match": response.headers["ETag"]})
+	assert response.status_code == 304
+
+
+@pytest.mark.usefixtures("stand_ins")
+def test_pypi_badge_reused(pypi: PyPI, monkeypatch: pytest.MonkeyPatch, evaluated: list[list[str]]):
+	requirements = {"flask": [ComparableRequirement("requests<2.32")]}
+
+	def get_package_requirements(name: str) -> Any:
+		return [(f"{name}-3.0.0-py3-none-any.whl", set(requirements[name]), [], True)]
+
+	monkeypatch.setattr(pypi_routes, "get_package_requirements", get_package_requirements)
+
+	assert "up-to-date" in badge_text("/pypi/flask/badge.svg")
+	assert "up-to-date" in badge_text("/pypi/flask/badge.svg")
+	assert len(evaluated) == 1
+
+	# A new release of the package may have different requirements.
+	pypi.release("flask", "3.1.0")
+	expire_pypi("flask")
+	requirements["flask"] = [ComparableRequirement("requests<2.31")]
+
+	assert "1 outdated" in badge_text("/pypi/flask/badge.svg")
+	assert len(evaluated) == 2
+
+
+def test_render_memoized():
+	render_badge.cache_clear()
+
+	svg = render_badge("dependencies", "3 outdated", "orange")
+	assert "3 outdated" in svg
+
+	assert render_badge("dependencies", "3 outdated", "orange") is svg
+	assert render_badge.cache_info().hits == 1
+	assert render_badge.cache_info().misses == 1
+
+
+def test_prewarm():
+	render_badge.cache_clear()
+	prewarm_badges(2)
+
+	# The five fixed badges, and the outdated and insecure badges for one and two dependencies.
+	assert render_badge.cache_info().currsize == 9
+
+	make_badge([])
+	make_badge([(ComparableRequirement("flask"), "outdated", _invalid_metadata("flask"))] * 2)
+	assert render_badge.cache_info().misses == 9
+
+
+@pytest.mark.parametrize(
+		"statuses, text",
+		[
+				pytest.param([], "up-to-date", id="none"),
+				pytest.param(["up-to-date", "up-to-date"], "up-to-date", id="up_to_date"),
+				pytest.param(["outdated", "up-to-date", "outdated"], "2 outdated", id="outdated"),
+				pytest.param(["outdated", "insecure"], "1 insecure", id="insecure"),
+				],
+		)
+def test_make_badge(statuses: list[str], text: str):
+	dependency_data = [(ComparableRequirement("flask"), status, _invalid_metadata("flask")) for status in statuses]
+	assert text in make_badge(dependency_data)
+
+
+def test_serve_badge_etag():
+	svg = render_badge("dependencies", "up-to-date", "#82B805")
+	etag = hashlib.sha256(svg.encode("UTF-8")).hexdigest()
+
+	with app.test_request_context():
+		response = serve_badge(svg)
+		assert response.get_data(as_text=True) == svg
+		assert response.headers["ETag"] == etag
+
+	with app.test_request_context(headers={"If-None-Match": etag}):
+		assert serve_badge(svg).status_code == 304
@@ -0,0 +1,130 @@
+# stdlib
+import multiprocessing
+import time
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from dependency_dash.caching import LRUCache, SingleFlight, is_missing, mark_missing
+from dependency_dash.storage import get_cache
+
+
+def test_single_flight_removes_lock_file(tmp_path: PathPlus):
+	single_flight = SingleFlight(PathPlus(tmp_path) / "locks")
+
+	with single_flight.lock("pypi/requests"):
+		assert len(list((PathPlus(tmp_path) / "locks").iterdir())) == 1
+
+	assert list((PathPlus(tmp_path) / "locks").iterdir()) == []
+	assert single_flight.calls == 1
+	assert single_flight.coalesced == 0
+
+
+def _increment(lock_dir: PathPlus, counter: PathPlus, times: int) -> None:
+	single_flight = SingleFlight(lock_dir)
+
+	for _ in range(times):
+		with single_flight.lock("counter"):
+			value = int(counter.read_text())
+			time.sleep(0.001)
+			counter.write_text(str(value + 1))
+
+
+def test_single_flight_processes(tmp_path: PathPlus):
+	# Lock files are removed and recreated while other processes wait on them;
+	# the lock must still only be held by one process at a time.
+	lock_dir = PathPlus(tmp_path) / "locks"
+	counter = PathPlus(tmp_path) / "counter"
+	counter.write_text('0')
+
+	context = multiprocessing.get_context("spawn")
+	processes = [context.Process(target=_increment, args=(lock_dir, counter, 50)) for _ in range(4)]
+
+	for process in processes:
+		process.start()
+	for process in processes:
+		process.join()
+		assert process.exitcode == 0
+
+	assert counter.read_text() == "200"
+	assert list(lock_dir.iterdir()) == []
+
+
+def test_lru_hit_and_miss():
+	cache: LRUCache[str, int] = LRUCache()
+	assert cache.get("alpha") is None
+
+	cache.set("alpha", 1)
+	assert cache.get("alpha") == 1
+	assert cache.get("bravo") is None
+
+	assert cache.stats() == (1, 2, 1, 0)
+
+
+def test_lru_expiry():
+	cache: LRUCache[str, int] = LRUCache(ttl=60)
+	cache.set("alpha", 1)
+	cache.set("bravo", 2, expires=time.time() - 1)
+	cache.set("charlie", 3, expires=time.time() + 0.05)
+
+	assert cache.get("alpha") == 1
+	assert cache.get("bravo") is None
+	assert cache.get("charlie") == 3
+
+	time.sleep(0.1)
+	assert cache.get("charlie") is None
+
+	# Expired entries are removed when they are looked up.
+	assert len(cache) == 1
+
+
+def test_lru_eviction():
+	cache: LRUCache[str, int] = LRUCache(maxsize=2)
+	cache.set("alpha", 1)
+	cache.set("bravo", 2)
+
+	# Using "alpha" makes "bravo" the least recently used.
+	assert cache.get("alpha") == 1
+	cache.set("charlie", 3)
+
+	assert cache.get("bravo") is None
+	assert cache.get("alpha") == 1
+	assert cache.get("charlie") == 3
+
+
+def test_lru_size_eviction():
+	cache: LRUCache[str, bytes] = LRUCache(maxsize=10, max_size=10, sizeof=len)
+	cache.set("alpha", b"12345")
+	cache.set("bravo", b"1234")
+	cache.set("charlie", b"123")
+
+	assert cache.get("alpha") is None
+	assert cache.stats() == (0, 1, 2, 7)
+
+	# Replacing an entry replaces its size.
+	cache.set("bravo", b"1")
+	assert cache.stats().size == 4
+
+	assert cache.pop("charlie") == b"123"
+	assert cache.stats().size == 1
+
+
+def test_lru_sizeof_required():
+	with pytest.raises(TypeError, match="'sizeof' must be given with 'max_size'"):
+		LRUCache(max_size=10)
+
+
+def test_missing_expires():
+	get_cache().set_json("tests/missing.json", {"data": 1})
+
+	mark_missing("tests/missing.json", ttl=0.05)
+	assert get_cache().get_json("tests/missing.json") is None
+	assert is_missing("tests/missing.json")
+
+	time.sleep(0.1)
+	assert not is_missing("tests/missing.json")
+
+	# The expired marker is removed.
+	assert get_cache().get_json("tests/missing.json.missing") is None
@@ -0,0 +1,76 @@
+# stdlib
+import threading
+import time
+
+# 3rd party
+import pytest
+
+# this package
+from dependency_dash import concurrency
+from dependency_dash.concurrency import map_concurrently
+
+
+def test_results_in_order():
+
+	def func(delay: float) -> float:
+		time.sleep(delay)
+		return delay
+
+	delays = [0.03, 0.01, 0.02, 0]
+	assert list(map_concurrently(func, delays, limit=4)) == delays
+
+
+def test_limit():
+	in_progress = 0
+	most_in_progress = 0
+	lock = threading.Lock()
+
+	def func(item: int) -> int:
+		nonlocal in_progress, most_in_progress
+
+		with lock:
+			in_progress += 1
+			most_in_progress = max(most_in_progress, in_progress)
+
+		time.sleep(0.01)
+
+		with lock:
+			in_progress -= 1
+
+		return item
+
+	assert list(map_concurrently(func, range(12), limit=3)) == list(range(12))
+	assert most_in_progress <= 3
+
+
+def test_error_raised_in_order():
+	results = []
+
+	def func(item: int) -> int:
+		if item == 2:
+			raise ValueError(item)
+		return item
+
+	with pytest.raises(ValueError, match='2'):
+		for result in map_concurrently(func, range(5), limit=5):
+			results.append(result)
+
+	# The results before the failure are still yielded.
+	assert results == [0, 1]
+
+
+def test_nested_calls_finish(monkeypatch: pytest.MonkeyPatch):
+	# Calls which themselves map over the pool can't wait forever for a free thread.
+	monkeypatch.setattr(concurrency, "MAX_THREADS", 2)
+	monkeypatch.setattr(concurrency, "_executor", None)
+
+	def outer(item: int) -> list[int]:
+		return list(map_concurrently(lambda x: x * item, range(3), limit=3))
+
+	assert list(map_concurrently(outer, range(4), limit=4)) == [[0, x, 2 * x] for x in range(4)]
+
+
+def test_pool_reused():
+	executor = concurrency.get_executor()
+	list(map_concurrently(str, range(3), limit=2))
+	assert concurrency.get_executor() is executor
@@ -0,0 +1,85 @@
+# stdlib
+from typing import Any
+
+# 3rd party
+import pytest
+from shippinglabel.requirements import ComparableRequirement
+
+# this package
+import dependency_dash.github
+from dependency_dash.github import (
+		PARSE_CACHE,
+		PARSE_CACHE_PREFIX,
+		SkipFile,
+		parse_requirements_txt,
+		parse_setup_cfg
+		)
+from dependency_dash.storage import get_cache
+
+REQUIREMENTS_TXT = b"requests>=2.31\nflask\n!invalid\n"
+
+
+@pytest.fixture()
+def parsed(monkeypatch: pytest.MonkeyPatch) -> list[list[str]]:
+	# The lines passed to the requirements parser for each file parsed.
+	calls = []
+	parse_requirements = dependency_dash.github.parse_requirements
+
+	def wrapper(requirements: Any, **kwargs: Any) -> Any:
+		requirements = list(requirements)
+		calls.append(requirements)
+		return parse_requirements(requirements, **kwargs)
+
+	monkeypatch.setattr(dependency_dash.github, "parse_requirements", wrapper)
+
+	for key in get_cache().keys(PARSE_CACHE_PREFIX):
+		get_cache().delete(key)
+	PARSE_CACHE.clear()
+
+	return calls
+
+
+def test_parsed_once(parsed: list[list[str]]):
+	requirements, invalid = parse_requirements_txt(REQUIREMENTS_TXT)
+	assert requirements == {ComparableRequirement("requests>=2.31"), ComparableRequirement("flask")}
+	assert invalid == ["!invalid"]
+
+	# Callers may modify the results.
+	requirements.clear()
+	invalid.clear()
+
+	assert parse_requirements_txt(REQUIREMENTS_TXT) == (
+			{ComparableRequirement("requests>=2.31"), ComparableRequirement("flask")},
+			["!invalid"],
+			)
+	assert len(parsed) == 1
+
+	# Other workers use the results from the shared cache.
+	PARSE_CACHE.clear()
+	assert parse_requirements_txt(REQUIREMENTS_TXT)[0] == {
+			ComparableRequirement("requests>=2.31"),
+			ComparableRequirement("flask"),
+			}
+	assert len(parsed) == 1
+
+
+def test_changed_content_parsed(parsed: list[list[str]]):
+	parse_requirements_txt(REQUIREMENTS_TXT)
+
+	assert parse_requirements_txt(b"requests>=2.32\n") == ({ComparableRequirement("requests>=2.32")}, [])
+	assert len(parsed) == 2
+
+
+def test_skip_cached(parsed: list[list[str]], monkeypatch: pytest.MonkeyPatch):
+	# The same content is parsed separately by each parser.
+	content = b"[metadata]\nname = hello-world\n"
+	assert parse_requirements_txt(content) == (set(), ["[metadata]", "name = hello-world"])
+
+	for _ in range(2):
+		with pytest.raises(SkipFile):
+			parse_setup_cfg(content)
+
+		# The decision to skip the file is cached too.
+		monkeypatch.setattr(dependency_dash.github, "ConfigParser", None)
+
+	assert len(parsed) == 1
@@ -0,0 +1,150 @@
+# stdlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any
+
+# 3rd party
+import dom_toml
+import pytest
+import requests
+
+# this package
+import dependency_dash.github
+from dependency_dash.github import get_our_config, get_raw_file
+from dependency_dash.storage import get_cache
+from tests.stand_ins import GitHub, StandIn
+
+META_KEY = "github/octocat/hello-world/raw/master/requirements.txt.json"
+
+
+@pytest.fixture()
+def github() -> GitHub:
+	return GitHub({"octocat/hello-world": {"requirements.txt": "requests>=2.31\n"}})
+
+
+@pytest.fixture()
+def stand_in(github: GitHub, monkeypatch: pytest.MonkeyPatch) -> Iterator[StandIn]:
+	with StandIn(github) as stand_in:
+		monkeypatch.setattr(dependency_dash.github, "RAW_URL", stand_in.url)
+
+		for key in get_cache().keys("github/"):
+			get_cache().delete(key)
+
+		yield stand_in
+
+
+@pytest.fixture()
+def locks(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+	# The keys of the single-flight locks taken.
+	keys = []
+
+	@contextmanager
+	def single_flight(key: str) -> Iterator[None]:
+		keys.append(key)
+		yield
+
+	monkeypatch.setattr(dependency_dash.github, "single_flight", single_flight)
+	return keys
+
+
+def expire() -> None:
+	meta = get_cache().get_json(META_KEY)
+	meta["expires"] = (datetime.fromisoformat(meta["expires"]) - timedelta(days=1)).isoformat()
+	get_cache().set_json(META_KEY, meta)
+
+
+def test_fresh_file_not_locked(stand_in: StandIn, locks: list[str]):
+	assert get_raw_file("octocat/hello-world", "master", "requirements.txt") == b"requests>=2.31\n"
+	assert locks == ["github/octocat/hello-world/raw/master/requirements.txt"]
+	assert stand_in.requests == ["GET /octocat/hello-world/master/requirements.txt"]
+
+	locks.clear()
+	stand_in.requests.clear()
+
+	assert get_raw_file("octocat/hello-world", "master", "requirements.txt") == b"requests>=2.31\n"
+	assert locks == []
+	assert stand_in.requests == []
+
+
+def test_expired_file_revalidated(stand_in: StandIn, locks: list[str]):
+	get_raw_file("octocat/hello-world", "master", "requirements.txt")
+	expire()
+	locks.clear()
+
+	assert get_raw_file("octocat/hello-world", "master", "requirements.txt") == b"requests>=2.31\n"
+	assert locks == ["github/octocat/hello-world/raw/master/requirements.txt"]
+	assert len(stand_in.requests) == 2
+
+
+def test_downloaded_while_waiting(stand_in: StandIn, monkeypatch: pytest.MonkeyPatch):
+	get_raw_file("octocat/hello-world", "master", "requirements.txt")
+	expire()
+	stand_in.requests.clear()
+
+	@contextmanager
+	def single_flight(key: str) -> Iterator[None]:
+		# Another process refreshes the file while this one waits for the lock.
+		meta = get_cache().get_json(META_KEY)
+		meta["expires"] = (datetime.fromisoformat(meta["expires"]) + timedelta(days=2)).isoformat()
+		get_cache().set_json(META_KEY, meta)
+		yield
+
+	monkeypatch.setattr(dependency_dash.github, "single_flight", single_flight)
+
+	assert get_raw_file("octocat/hello-world", "master", "requirements.txt") == b"requests>=2.31\n"
+	assert stand_in.requests == []
+
+
+def test_missing_file_not_locked(stand_in: StandIn, locks: list[str]):
+	with pytest.raises(requests.HTTPError, match="404"):
+		get_raw_file("octocat/hello-world", "master", "setup.cfg")
+
+	locks.clear()
+	stand_in.requests.clear()
+
+	with pytest.raises(requests.HTTPError, match="404"):
+		get_raw_file("octocat/hello-world", "master", "setup.cfg")
+
+	assert locks == []
+	assert stand_in.requests == []
+
+
+def test_missing_file_checked_again(github: GitHub, stand_in: StandIn):
+	with pytest.raises(requests.HTTPError, match="404"):
+		get_raw_file("octocat/hello-world", "master", "setup.cfg")
+
+	github.files["octocat/hello-world"]["setup.cfg"] = b"[metadata]\nname = hello-world\n"
+
+	# The file is treated as missing until the negative cache entry expires.
+	with pytest.raises(requests.HTTPError, match="404"):
+		get_raw_file("octocat/hello-world", "master", "setup.cfg")
+
+	get_cache().set_json("github/octocat/hello-world/raw/master/setup.cfg.dat.missing", 0)
+
+	assert get_raw_file("octocat/hello-world", "master", "setup.cfg") == b"[metadata]\nname = hello-world\n"
+	assert stand_in.requests.count("GET /octocat/hello-world/master/setup.cfg") == 2
+
+
+def test_config_parsed_once_per_etag(github: GitHub, stand_in: StandIn, monkeypatch: pytest.MonkeyPatch):
+	parsed = []
+	dom_toml_loads = dom_toml.loads
+
+	def loads(text: str) -> dict[str, Any]:
+		parsed.append(text)
+		return dom_toml_loads(text)
+
+	monkeypatch.setattr(dependency_dash.github.dom_toml, "loads", loads)
+	github.files["octocat/hello-world"]["pyproject.toml"] = b'[tool.dependency-dash."requirements.txt"]\norder = 1\n'
+
+	for _ in range(2):
+		assert get_our_config("octocat/hello-world", "master") == {"requirements.txt": {"order": 1}}
+	assert len(parsed) == 1
+
+	# The file is parsed again when it changes.
+	github.files["octocat/hello-world"]["pyproject.toml"] = b'[tool.dependency-dash."requirements.txt"]\norder = 2\n'
+	github.max_age = 0
+	get_cache().delete("github/octocat/hello-world/raw/master/pyproject.toml.json")
+
+	assert get_our_config("octocat/hello-world", "master") == {"requirements.txt": {"order": 2}}
+	assert len(parsed) == 2
@@ -0,0 +1,138 @@
+# stdlib
+import json
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Union
+
+# 3rd party
+import pytest
+import requests
+
+# this package
+import dependency_dash.github
+from dependency_dash.github import REPOSITORY_CACHE, RepositoryMetadata, get_repository
+from dependency_dash.github._env import GITHUB
+from dependency_dash.storage import get_cache
+
+
+def make_response(status_code: int, data: Any = None, etag: str = '"v1"') -> requests.Response:
+	response = requests.Response()
+	response.status_code = status_code
+	response.headers["ETag"] = etag
+	if data is not None:
+		response._content = json.dumps(data).encode("UTF-8")
+	return response
+
+
+@pytest.fixture()
+def responses(monkeypatch: pytest.MonkeyPatch) -> list[Union[requests.Response, requests.RequestException]]:
+	# The responses to return (or errors to raise), in order.
+	queue: list[Union[requests.Response, requests.RequestException]] = []
+
+	def get(url: str, headers: dict[str, str], timeout: float) -> requests.Response:
+		response = queue.pop(0)
+		if isinstance(response, requests.RequestException):
+			raise response
+		return response
+
+	monkeypatch.setattr(GITHUB.session, "get", get)
+	return queue
+
+
+def expire(key: str) -> None:
+	REPOSITORY_CACHE.pop(key)
+
+	cache_key = f"github/{key}/repository.json"
+	data = get_cache().get_json(cache_key)
+	data["expires"] = (datetime.fromisoformat(data["expires"]) - timedelta(days=1)).isoformat()
+	get_cache().set_json(cache_key, data)
+
+
+@pytest.mark.parametrize("status_code", [403, 429, 500, 502])
+def test_stale_repository_on_error(responses: list[Union[requests.Response, requests.RequestException]], status_code: int):
+	name = f"stale-{status_code}"
+	responses.append(make_response(200, {"full_name": f"Octocat/{name}", "default_branch": "main"}))
+	assert get_repository("octocat", name) == RepositoryMetadata(f"Octocat/{name}", "main")
+
+	expire(f"octocat/{name}")
+	responses.append(make_response(status_code))
+	assert get_repository("octocat", name) == RepositoryMetadata(f"Octocat/{name}", "main")
+	assert responses == []
+
+
+@pytest.mark.parametrize("error", [requests.ConnectionError, requests.Timeout])
+def test_stale_repository_when_unreachable(
+		responses: list[Union[requests.Response, requests.RequestException]],
+		error: type[requests.RequestException],
+		):
+	name = f"unreachable-{error.__name__.lower()}"
+	responses.append(make_response(200, {"full_name": f"octocat/{name}", "default_branch": "main"}))
+	get_repository("octocat", name)
+
+	expire(f"octocat/{name}")
+	responses.append(error("GitHub is unreachable"))
+	assert get_repository("octocat", name) == RepositoryMetadata(f"octocat/{name}", "main")
+
+
+def test_unreachable_without_cached_repository(
+		responses: list[Union[requests.Response, requests.RequestException]],
+		):
+	responses.append(requests.ConnectionError("GitHub is unreachable"))
+
+	with pytest.raises(requests.ConnectionError):
+		get_repository("octocat", "unreachable-uncached")
+
+
+def test_error_without_cached_repository(responses: list[Union[requests.Response, requests.RequestException]]):
+	responses.append(make_response(502))
+
+	with pytest.raises(requests.HTTPError, match="HTTP Status 502") as exc_info:
+		get_repository("octocat", "uncached")
+
+	assert exc_info.value.response is not None
+	assert exc_info.value.response.status_code == 502
+
+
+def test_other_error_with_cached_repository(responses: list[Union[requests.Response, requests.RequestException]]):
+	responses.append(make_response(200, {"full_name": "octocat/unauthorized", "default_branch": "main"}))
+	get_repository("octocat", "unauthorized")
+
+	expire("octocat/unauthorized")
+	responses.append(make_response(401))
+
+	with pytest.raises(requests.HTTPError, match="HTTP Status 401"):
+		get_repository("octocat", "unauthorized")
+
+
+def test_fresh_repository_not_locked(responses: list[Union[requests.Response, requests.RequestException]], monkeypatch: pytest.MonkeyPatch):
+	responses.append(make_response(200, {"full_name": "octocat/fresh", "default_branch": "main"}))
+	get_repository("octocat", "fresh")
+
+	# Another worker only has the repository in the shared cache.
+	REPOSITORY_CACHE.pop("octocat/fresh")
+
+	def single_flight(key: str) -> Iterator[None]:
+		raise AssertionError("Unexpected lock")
+
+	monkeypatch.setattr(dependency_dash.github, "single_flight", single_flight)
+	assert get_repository("octocat", "fresh") == RepositoryMetadata("octocat/fresh", "main")
+
+
+def test_repository_fetched_while_waiting(responses: list[Union[requests.Response, requests.RequestException]], monkeypatch: pytest.MonkeyPatch):
+	responses.append(make_response(200, {"full_name": "octocat/waiting", "default_branch": "main"}))
+	get_repository("octocat", "waiting")
+	expire("octocat/waiting")
+
+	@contextmanager
+	def single_flight(key: str) -> Iterator[None]:
+		# Another process revalidates the repository while this one waits for the lock.
+		cache_key = "github/octocat/waiting/repository.json"
+		data = get_cache().get_json(cache_key)
+		data["expires"] = (datetime.fromisoformat(data["expires"]) + timedelta(days=2)).isoformat()
+		get_cache().set_json(cache_key, data)
+		yield
+
+	monkeypatch.setattr(dependency_dash.github, "single_flight", single_flight)
+	assert get_repository("octocat", "waiting") == RepositoryMetadata("octocat/waiting", "main")
+	assert responses == []
@@ -0,0 +1,95 @@
+# stdlib
+from types import SimpleNamespace
+
+# 3rd party
+import pytest
+
+# this package
+from dependency_dash import app
+from dependency_dash.github import routes
+
+
+def test_skeleton_file_urls(monkeypatch: pytest.MonkeyPatch):
+	files = [(None, "requirements.txt", True), (None, "doc/requirements #1?.txt", False)]
+	monkeypatch.setattr(routes, "get_parse_functions", lambda repository_name, default_branch: files)
+
+	response = app.test_client().get("/htmx/github/octocat/hello-world/feature+x/")
+	assert response.status_code == 200
+	html = response.get_data(as_text=True)
+
+	assert 'hx-get="/htmx/github/octocat/hello-world/feature+x/badge/"' in html
+	assert 'hx-get="/htmx/github/octocat/hello-world/feature+x/files/requirements.txt"' in html
+	assert 'hx-get="/htmx/github/octocat/hello-world/feature+x/files/doc/requirements%20%231%3F.txt"' in html
+
+
+@pytest.fixture()
+def user_repos(monkeypatch: pytest.MonkeyPatch) -> None:
+	repos = [
+			SimpleNamespace(full_name="octocat/hello-world", default_branch="main"),
+			SimpleNamespace(full_name="octocat/spoon-knife", default_branch="fix&#1+2"),
+			]
+	monkeypatch.setattr(routes, "GITHUB", SimpleNamespace(user=lambda username: username))
+	monkeypatch.setattr(routes, "iter_repos_for_user", lambda user, page: iter(repos))
+
+
+@pytest.mark.usefixtures("user_repos")
+@pytest.mark.parametrize("mode", ["row", "batch"])
+def test_repositories_table_status_urls(monkeypatch: pytest.MonkeyPatch, mode: str):
+	monkeypatch.setattr(routes, "STATUS_MODE", mode)
+
+	html = app.test_client().get("/htmx/github/octocat/").get_data(as_text=True)
+
+	assert "/htmx/github/octocat/?repo=octocat%2Fhello-world&amp;branch=main" in html
+	assert "/htmx/github/octocat/?repo=octocat%2Fspoon-knife&amp;branch=fix%26%231%2B2" in html
+
+
+@pytest.mark.filterwarnings("error")
+def test_batch_failure_replaces_cells(monkeypatch: pytest.MonkeyPatch):
+	monkeypatch.setattr(routes, "STATUS_MODE", "batch")
+
+	def fail(*args, **kwargs):
+		raise RuntimeError("Oops")
+
+	monkeypatch.setattr(routes, "map_concurrently", fail)
+
+	query = "repo=octocat%2Fhello-world&branch=main&repo=octocat%2Fspoon-knife&branch=fix%26%231%2B2"
+	html = app.test_client().get(f"/htmx/github/octocat/?{query}").get_data(as_text=True)
+
+	assert html.count('hx-swap-oob="true"') == 2
+	assert html.count(">error</td>") == 2
+
+
+def test_batch_repository_errors_isolated(monkeypatch: pytest.MonkeyPatch):
+	monkeypatch.setattr(routes, "STATUS_MODE", "batch")
+
+	def get_status(full_name: str, branch: str) -> tuple[str, str]:
+		if full_name == "octocat/hello-world":
+			raise RuntimeError("Oops")
+		return "up-to-date", "status-up-to-date"
+
+	monkeypatch.setattr(routes, "_get_repository_status", get_status)
+
+	query = "repo=octocat%2Fhello-world&branch=main&repo=octocat%2Fspoon-knife&branch=main"
+	html = app.test_client().get(f"/htmx/github/octocat/?{query}").get_data(as_text=True)
+
+	assert html.index(">error</td>") < html.index(">up-to-date</td>")
+
+
+@pytest.mark.filterwarnings("error")
+def test_batch_failure_stops_pending(monkeypatch: pytest.MonkeyPatch):
+	# Once the batch has failed, the repositories not yet started aren't evaluated.
+	monkeypatch.setattr(routes, "STATUS_MODE", "batch")
+	monkeypatch.setattr(routes, "STATUS_WORKERS", 1)
+	evaluated = []
+
+	def get_status_or_error(full_name: str, branch: str) -> tuple[str, str]:
+		evaluated.append(full_name)
+		raise RuntimeError("Oops")
+
+	monkeypatch.setattr(routes, "_get_repository_status_or_error", get_status_or_error)
+
+	query = '&'.join(f"repo=octocat%2Frepo-{idx}&branch=main" for idx in range(5))
+	html = app.test_client().get(f"/htmx/github/octocat/?{query}").get_data(as_text=True)
+
+	assert html.count(">error</td>") == 5
+	assert evaluated == ["octocat/repo-0"]
@@ -0,0 +1,116 @@
+# stdlib
+from collections.abc import Iterator
+
+# 3rd party
+import pytest
+from shippinglabel.requirements import ComparableRequirement
+
+# this package
+import dependency_dash.github
+from dependency_dash.github import get_repo_requirements, graphql
+from dependency_dash.storage import get_cache
+from tests.stand_ins import GitHub, StandIn
+
+PYPROJECT_TOML = '[tool.dependency-dash."requirements/docs.txt"]\ninclude = false\n'
+
+
+@pytest.fixture()
+def github() -> GitHub:
+	return GitHub(
+			{
+					"octocat/snapshot": {"requirements.txt": "requests\n"},
+					"octocat/config": {
+							"requirements.txt": "requests>=2.0\n",
+							"pyproject.toml": PYPROJECT_TOML,
+							"requirements/docs.txt": "sphinx\n",
+							},
+					},
+			default_branch="main",
+			)
+
+
+@pytest.fixture()
+def stand_in(github: GitHub, monkeypatch: pytest.MonkeyPatch) -> Iterator[StandIn]:
+	with StandIn(github) as stand_in:
+		monkeypatch.setattr(graphql, "GRAPHQL_URL", f"{stand_in.url}/graphql")
+		monkeypatch.setattr(dependency_dash.github, "RAW_URL", stand_in.url)
+
+		for key in get_cache().keys("github/"):
+			get_cache().delete(key)
+
+		yield stand_in
+
+
+def test_get_snapshots(github: GitHub, stand_in: StandIn):
+	snapshots = graphql.get_snapshots(["octocat/snapshot", "octocat/missing"])
+
+	assert snapshots["octocat/missing"] is None
+	snapshot = snapshots["octocat/snapshot"]
+	assert snapshot is not None
+	assert snapshot["default_branch"] == "main"
+	assert snapshot["oid"] == github.oid("octocat/snapshot")
+	assert snapshot["config"] is None
+	assert snapshot["files"]["requirements.txt"] == "requests\n"
+	assert snapshot["files"]["setup.py"] is None
+	assert stand_in.requests == ["POST /graphql"]
+
+	# Both are cached, including the repository which doesn't exist.
+	graphql.get_snapshots(["octocat/snapshot", "octocat/missing"])
+	assert stand_in.requests == ["POST /graphql"]
+
+
+def test_truncated_blob(github: GitHub, stand_in: StandIn):
+	github.max_text_length = 10
+
+	snapshot = graphql.get_snapshot("octocat/config")
+
+	assert snapshot is not None
+	assert snapshot["files"]["requirements.txt"] == "requests>=2.0\n"
+
+	# The whole of each truncated file is downloaded from the same commit.
+	oid = github.oid("octocat/config")
+	assert f"GET /octocat/config/{oid}/requirements.txt" in stand_in.requests
+	assert f"GET /octocat/config/{oid}/pyproject.toml" in stand_in.requests
+
+
+def test_config_files(github: GitHub, stand_in: StandIn):
+	snapshot = graphql.get_snapshot("octocat/config")
+
+	assert snapshot is not None
+	assert snapshot["config"] == {"requirements/docs.txt": {"include": False}}
+	assert snapshot["files"]["requirements/docs.txt"] == "sphinx\n"
+
+	# The files listed in the config are fetched from the same commit.
+	assert len(github.queries) == 2
+	assert f"{github.oid('octocat/config')}:requirements/docs.txt" not in github.queries[0]
+	assert stand_in.requests == ["POST /graphql", "POST /graphql"]
+
+
+@pytest.mark.parametrize(
+		"pyproject_toml",
+		[
+				pytest.param("[tool.dependency-dash\n", id="invalid"),
+				pytest.param("tool = 1\n", id="tool_not_table"),
+				pytest.param("[tool]\ndependency-dash = 1\n", id="config_not_table"),
+				pytest.param("[project]\nname = 'config'\n", id="no_config"),
+				],
+		)
+def test_no_usable_config(github: GitHub, stand_in: StandIn, pyproject_toml: str):
+	github.files["octocat/config"]["pyproject.toml"] = pyproject_toml.encode("UTF-8")
+
+	snapshot = graphql.get_snapshot("octocat/config")
+
+	assert snapshot is not None
+	assert snapshot["config"] is None
+	assert snapshot["files"]["pyproject.toml"] == pyproject_toml
+
+
+def test_repo_requirements_from_snapshot(stand_in: StandIn, monkeypatch: pytest.MonkeyPatch):
+	monkeypatch.setattr(graphql, "ENABLED", True)
+
+	assert get_repo_requirements("octocat/config", "main") == [
+			("requirements/docs.txt", {ComparableRequirement("sphinx")}, [], False),
+			]
+
+	# The files came from the snapshot rather than the raw file host.
+	assert stand_in.requests == ["POST /graphql", "POST /graphql"]
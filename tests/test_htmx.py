@@ -0,0 +1,76 @@
+# stdlib
+from collections.abc import Iterable, Iterator
+
+# 3rd party
+import pytest
+from shippinglabel.requirements import ComparableRequirement
+
+# this package
+from dependency_dash import app
+from dependency_dash.pypi import DependencyMetadata, _invalid_metadata
+from dependency_dash.pypi import routes as pypi_routes
+
+Row = tuple[ComparableRequirement, str, DependencyMetadata]
+
+
+def metadata(name: str) -> DependencyMetadata:
+	data = _invalid_metadata(name)
+	data["version"] = "1.0.0"
+	data["all_versions"] = ["1.0.0"]
+	return data
+
+
+@pytest.fixture(autouse=True)
+def requirements(monkeypatch: pytest.MonkeyPatch) -> None:
+
+	def get_package_requirements(name: str) -> list[tuple[str, set[ComparableRequirement], list[str], bool]]:
+		requirements = {ComparableRequirement("click"), ComparableRequirement("jinja2")}
+		return [(f"{name}-3.0.0-py3-none-any.whl", requirements, [], True)]
+
+	monkeypatch.setattr(pypi_routes, "get_package_requirements", get_package_requirements)
+
+
+def test_rows_streamed(monkeypatch: pytest.MonkeyPatch):
+	evaluated = []
+
+	def get_dependency_status(requirements: Iterable[ComparableRequirement]) -> Iterator[Row]:
+		for req in sorted(requirements):
+			evaluated.append(req.name)
+			yield req, "up-to-date", metadata(req.name)
+
+	monkeypatch.setattr(pypi_routes, "get_dependency_status", get_dependency_status)
+
+	response = app.test_client().get("/htmx/pypi/flask/")
+	assert response.is_streamed
+	assert response.headers["X-Accel-Buffering"] == "no"
+
+	body = ''
+	evaluated_when_sent = None
+
+	for chunk in response.response:
+		body += chunk.decode("UTF-8") if isinstance(chunk, bytes) else chunk
+		if evaluated_when_sent is None and 'href="/pypi/click"' in body:
+			evaluated_when_sent = list(evaluated)
+
+	# The first row was sent before the status of the second was determined.
+	assert evaluated_when_sent == ["click"]
+	assert 'href="/pypi/jinja2"' in body
+	assert 'id="badge"' in body
+
+
+def test_error_part_way(monkeypatch: pytest.MonkeyPatch):
+
+	def get_dependency_status(requirements: Iterable[ComparableRequirement]) -> Iterator[Row]:
+		yield ComparableRequirement("click"), "up-to-date", metadata("click")
+		raise ConnectionError("PyPI is down")
+
+	monkeypatch.setattr(pypi_routes, "get_dependency_status", get_dependency_status)
+
+	response = app.test_client().get("/htmx/pypi/flask/")
+	body = response.get_data(as_text=True)
+
+	# The rows already sent are followed by the error.
+	assert response.status_code == 200
+	assert 'href="/pypi/click"' in body
+	assert body.rstrip().endswith("<p>PyPI is down</p>")
+	assert "An error occurred" in body
@@ -0,0 +1,23 @@
+# stdlib
+import os
+import subprocess
+import sys
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+
+
+def test_gc_without_app_configuration(tmp_path: PathPlus):
+	# The maintenance commands don't set up the app, so don't need GITHUB_TOKEN.
+	env = {name: value for name, value in os.environ.items() if name != "GITHUB_TOKEN"}
+	env["DD_CACHE_DIR"] = str(tmp_path)
+
+	code = "import sys; from dependency_dash.__main__ import main; main(['gc']); print('dependency_dash.wsgi' in sys.modules)"
+	process = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+
+	assert process.returncode == 0, process.stderr
+	assert process.stdout.splitlines() == [
+			"Removed 0 expired entries and evicted 0 entries",
+			"Reclaimed 0 bytes",
+			"False",
+			]
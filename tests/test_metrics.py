@@ -0,0 +1,119 @@
+# stdlib
+import multiprocessing
+import os
+import socket
+import time
+
+# 3rd party
+import pytest
+
+# this package
+from dependency_dash import app, metrics
+from dependency_dash.metrics import Registry, publish_metrics, render_shared_metrics
+from dependency_dash.storage import get_cache
+
+
+@pytest.fixture()
+def registry(monkeypatch: pytest.MonkeyPatch) -> Registry:
+	for key in get_cache().keys("metrics/"):
+		get_cache().delete(key)
+
+	registry = Registry()
+	monkeypatch.setattr(metrics, "REGISTRY", registry)
+	monkeypatch.setattr(metrics, "_published", {})
+	return registry
+
+
+def test_combine():
+	# Two workers' registries.
+	registries = [Registry(), Registry()]
+	for registry in registries:
+		registry.counter("requests_total", "Requests.", ["route"]).inc(route='/')
+		registry.gauge("in_flight", "In flight.").inc(2)
+		registry.histogram("latency_seconds", "Latency.", buckets=[0.1, 1]).observe(0.5)
+
+	rendered = registries[0].render(*(registry.export() for registry in registries))
+
+	assert 'requests_total{route="/"} 2\n' in rendered
+	assert "in_flight 4\n" in rendered
+	assert 'latency_seconds_bucket{le="0.1"} 0\n' in rendered
+	assert 'latency_seconds_bucket{le="1"} 2\n' in rendered
+	assert "latency_seconds_sum 1\n" in rendered
+	assert "latency_seconds_count 2\n" in rendered
+
+	# The registry's own values are unchanged.
+	assert 'requests_total{route="/"} 1\n' in registries[0].render()
+
+
+def test_published_once(registry: Registry):
+	counter = registry.counter("requests_total", "Requests.")
+	histogram = registry.histogram("latency_seconds", "Latency.", buckets=[1])
+
+	counter.inc(2)
+	histogram.observe(0.5)
+	publish_metrics()
+	counter.inc()
+	publish_metrics()
+	publish_metrics()
+
+	rendered = render_shared_metrics()
+	assert "requests_total 3\n" in rendered
+	assert "latency_seconds_count 1\n" in rendered
+
+
+def _serve_requests(count: int) -> None:
+	metrics.REQUESTS.inc(count, route="/other-worker", method="GET", status="200")
+	publish_metrics()
+
+
+def test_other_workers_included(registry: Registry):
+	registry.register(metrics.REQUESTS)
+
+	# The other worker has exited, but its counters still count towards the total.
+	process = multiprocessing.get_context("spawn").Process(target=_serve_requests, args=(3, ))
+	process.start()
+	process.join(timeout=60)
+	assert process.exitcode == 0
+
+	rendered = render_shared_metrics()
+	assert 'dependency_dash_requests_total{route="/other-worker",method="GET",status="200"} 3\n' in rendered
+
+
+def test_stale_gauges_dropped(registry: Registry):
+	registry.gauge("in_flight", "In flight.").inc()
+	stale_key = f"{metrics.GAUGES_PREFIX}stale-worker.json"
+	get_cache().set_json(stale_key, {"time": time.time() - 3600, "metrics": {"in_flight": [[[], 5]]}})
+
+	assert "in_flight 1\n" in render_shared_metrics()
+	assert get_cache().get_json(stale_key) is None
+	assert get_cache().get_json(f"{metrics.GAUGES_PREFIX}{socket.gethostname()}-{os.getpid()}.json") is not None
+
+
+@pytest.mark.usefixtures("registry")
+def test_route_disabled(monkeypatch: pytest.MonkeyPatch):
+	monkeypatch.setattr(metrics, "ENABLED", False)
+	assert app.test_client().get("/metrics").status_code == 404
+
+
+@pytest.mark.usefixtures("registry")
+@pytest.mark.parametrize(
+		"token, authorization, status",
+		[
+				pytest.param(None, None, 200, id="no_token"),
+				pytest.param("s3cret", "Bearer s3cret", 200, id="token"),
+				pytest.param("s3cret", None, 401, id="missing"),
+				pytest.param("s3cret", "Bearer wrong", 401, id="wrong"),
+				],
+		)
+def test_route_token(monkeypatch: pytest.MonkeyPatch, token: str, authorization: str, status: int):
+	monkeypatch.setattr(metrics, "ENABLED", True)
+	monkeypatch.setattr(metrics, "TOKEN", token)
+
+	headers = {"Authorization": authorization} if authorization else {}
+	response = app.test_client().get("/metrics", headers=headers)
+
+	assert response.status_code == status
+	if status == 401:
+		assert response.headers["WWW-Authenticate"] == "Bearer"
+	else:
+		assert response.content_type.startswith("text/plain; version=0.0.4")
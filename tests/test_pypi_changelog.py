@@ -0,0 +1,140 @@
+# stdlib
+from collections.abc import Iterator
+
+# 3rd party
+import pytest
+
+# this package
+import dependency_dash.pypi
+from dependency_dash.pypi import MAX_AGE, MEMORY_CACHE, changelog, get_data
+from dependency_dash.storage import get_cache
+from tests.stand_ins import PyPI, StandIn
+
+
+@pytest.fixture()
+def pypi() -> PyPI:
+	return PyPI({"requests": ["2.30.0", "2.31.0"], "flask": ["3.0.0"]})
+
+
+@pytest.fixture()
+def stand_in(pypi: PyPI, monkeypatch: pytest.MonkeyPatch) -> Iterator[StandIn]:
+	with StandIn(pypi) as stand_in:
+		monkeypatch.setattr(dependency_dash.pypi, "PYPI_ENDPOINT", f"{stand_in.url}/pypi")
+		monkeypatch.setattr(changelog, "XMLRPC_URL", f"{stand_in.url}/pypi")
+		monkeypatch.setattr(changelog, "REFRESH_MODE", "serial")
+		monkeypatch.setattr(changelog, "SYNC_INTERVAL", 0)
+		monkeypatch.setattr(changelog, "_state", None)
+
+		for key in get_cache().keys("pypi/"):
+			get_cache().delete(key)
+		MEMORY_CACHE._data.clear()
+
+		# Start tracking changes.
+		assert changelog.sync() is not None
+
+		yield stand_in
+
+
+def expire(project_name: str) -> None:
+	# Make the cached metadata old enough to need refreshing.
+	MEMORY_CACHE.pop(project_name)
+
+	cache_key = f"pypi/{project_name[0]}/{project_name}.json"
+	data = get_cache().get_json(cache_key)
+	data["last_modified"] -= MAX_AGE + 1
+	get_cache().set_json(cache_key, data)
+
+
+def json_requests(stand_in: StandIn) -> list[str]:
+	return [request for request in stand_in.requests if request.endswith("/json")]
+
+
+def test_unchanged_project_not_revalidated(stand_in: StandIn):
+	# Released before tracking started, and not since.
+	assert get_data("requests")["version"] == "2.31.0"
+
+	for _ in range(2):
+		expire("requests")
+		stand_in.requests.clear()
+
+		assert get_data("requests")["version"] == "2.31.0"
+		assert json_requests(stand_in) == []
+		assert "POST /pypi" in stand_in.requests
+
+
+def test_other_project_changed(pypi: PyPI, stand_in: StandIn):
+	get_data("requests")
+
+	pypi.release("flask", "3.1.0")
+	expire("requests")
+	stand_in.requests.clear()
+
+	get_data("requests")
+	assert json_requests(stand_in) == []
+
+
+def test_changed_project_revalidated(pypi: PyPI, stand_in: StandIn):
+	get_data("requests")
+
+	pypi.release("requests", "2.32.0")
+	expire("requests")
+	stand_in.requests.clear()
+
+	assert get_data("requests")["version"] == "2.32.0"
+	assert json_requests(stand_in) == ["GET /pypi/requests/json"]
+
+
+def test_stale_response_not_confirmed(pypi: PyPI, stand_in: StandIn):
+	# A reply cached by the CDN before the latest release is served after the changelog has recorded it.
+	stale = pypi.project("requests")
+	pypi.release("requests", "2.32.0")
+	assert changelog.sync() is not None
+
+	pypi.stale["requests"] = stale
+	assert get_data("requests")["version"] == "2.31.0"
+
+	# The metadata is only as current as the serial the stale reply reported,
+	# so the changelog can't confirm it is unchanged.
+	expire("requests")
+	assert get_data("requests")["version"] == "2.32.0"
+
+
+def test_missing_serial_revalidated(stand_in: StandIn):
+	# Metadata cached by earlier versions has no serials.
+	get_data("requests")
+
+	expire("requests")
+	cache_key = "pypi/r/requests.json"
+	data = get_cache().get_json(cache_key)
+	del data["last_serial"]
+	del data["changelog_serial"]
+	get_cache().set_json(cache_key, data)
+	stand_in.requests.clear()
+
+	assert get_data("requests")["version"] == "2.31.0"
+	assert json_requests(stand_in) == ["GET /pypi/requests/json"]
+
+
+def test_oldest_changes_forgotten(pypi: PyPI, stand_in: StandIn, monkeypatch: pytest.MonkeyPatch):
+	monkeypatch.setattr(changelog, "MAX_TRACKED", 4)
+
+	get_data("requests")
+	pypi.release("requests", "2.32.0")
+
+	for idx in range(5):
+		if idx == 3:
+			get_data("flask")
+		pypi.release(f"project-{idx}", "1.0.0")
+
+	state = changelog.sync()
+	assert state is not None
+	assert sorted(state["changed"]) == ["project-3", "project-4"]
+
+	# Metadata fetched after the forgotten changes can still be confirmed unchanged, but older metadata can't.
+	expire("flask")
+	expire("requests")
+	stand_in.requests.clear()
+
+	get_data("flask")
+	assert get_data("requests")["version"] == "2.32.0"
+	assert json_requests(stand_in) == ["GET /pypi/requests/json"]
@@ -0,0 +1,106 @@
+# stdlib
+import time
+from collections.abc import Iterator
+
+# 3rd party
+import pytest
+from packaging.requirements import InvalidRequirement
+
+# this package
+import dependency_dash.pypi
+from dependency_dash.pypi import MEMORY_CACHE, changelog, get_data
+from dependency_dash.storage import get_cache
+from tests.stand_ins import PyPI, StandIn
+
+
+@pytest.fixture()
+def pypi() -> PyPI:
+	return PyPI({"requests": ["2.30.0", "2.31.0"]})
+
+
+@pytest.fixture()
+def stand_in(pypi: PyPI, monkeypatch: pytest.MonkeyPatch) -> Iterator[StandIn]:
+	with StandIn(pypi) as stand_in:
+		monkeypatch.setattr(dependency_dash.pypi, "PYPI_ENDPOINT", f"{stand_in.url}/pypi")
+		monkeypatch.setattr(changelog, "REFRESH_MODE", "conditional")
+
+		for key in get_cache().keys("pypi/"):
+			get_cache().delete(key)
+		MEMORY_CACHE.clear()
+
+		yield stand_in
+
+
+def test_memory_hit(stand_in: StandIn, monkeypatch: pytest.MonkeyPatch):
+	assert get_data("requests")["version"] == "2.31.0"
+
+	def get_cache():
+		raise AssertionError("Unexpected use of the shared cache")
+
+	monkeypatch.setattr(dependency_dash.pypi, "get_cache", get_cache)
+
+	assert get_data("Requests")["version"] == "2.31.0"
+	assert stand_in.requests == ["GET /pypi/requests/json"]
+
+
+def test_memory_copies(stand_in: StandIn):
+	get_data("requests")["version"] = "0.0.0"
+	assert get_data("requests")["version"] == "2.31.0"
+
+
+def test_memory_expiry(stand_in: StandIn):
+	data = get_data("requests")
+
+	# The entry is still fresh in the shared cache.
+	MEMORY_CACHE.set("requests", data, expires=time.time() - 1)
+	hits = MEMORY_CACHE.stats().hits
+
+	assert get_data("requests")["version"] == "2.31.0"
+	assert stand_in.requests == ["GET /pypi/requests/json"]
+
+	# The memory cache is filled again from the shared cache.
+	assert get_data("requests")["version"] == "2.31.0"
+	assert MEMORY_CACHE.stats().hits == hits + 1
+
+
+def expire_missing(cache_key: str) -> None:
+	get_cache().set_json(f"{cache_key}.missing", time.time() - 1)
+
+
+def test_missing_project_remembered(stand_in: StandIn):
+	for _ in range(2):
+		with pytest.raises(InvalidRequirement, match="No such project 'missing'"):
+			get_data("missing")
+
+	assert stand_in.requests == ["GET /pypi/missing/json"]
+
+
+def test_missing_project_checked_again(pypi: PyPI, stand_in: StandIn):
+	with pytest.raises(InvalidRequirement):
+		get_data("new-project")
+
+	pypi.release("new-project", "1.0.0")
+
+	# The project is treated as missing until the negative cache entry expires.
+	with pytest.raises(InvalidRequirement):
+		get_data("new-project")
+
+	expire_missing("pypi/n/new-project.json")
+
+	assert get_data("new-project")["version"] == "1.0.0"
+	assert stand_in.requests == ["GET /pypi/new-project/json", "GET /pypi/new-project/json"]
+
+
+def test_removed_project_forgotten(pypi: PyPI, stand_in: StandIn):
+	get_data("requests")
+	del pypi.versions["requests"]
+
+	MEMORY_CACHE.pop("requests")
+	data = get_cache().get_json("pypi/r/requests.json")
+	data["last_modified"] = 0
+	get_cache().set_json("pypi/r/requests.json", data)
+
+	with pytest.raises(InvalidRequirement):
+		get_data("requests")
+
+	assert get_cache().get_json("pypi/r/requests.json") is None
@@ -0,0 +1,158 @@
+# stdlib
+import threading
+import time
+
+# 3rd party
+import pytest
+from packaging.requirements import InvalidRequirement
+from packaging.version import Version
+from shippinglabel.requirements import ComparableRequirement
+
+# this package
+import dependency_dash.pypi
+from dependency_dash import concurrency
+from dependency_dash.pypi import (
+		MEMORY_CACHE,
+		VERSION_INDEX_CACHE,
+		DependencyMetadata,
+		_get_status,
+		_invalid_metadata,
+		get_dependency_status,
+		get_version_index
+		)
+
+
+def metadata(name: str, version: str) -> DependencyMetadata:
+	data = _invalid_metadata(name)
+	data["version"] = version
+	data["all_versions"] = ["1.0.0", version]
+	data["etag"] = f'"{name}-{version}"'
+	return data
+
+
+@pytest.fixture(autouse=True)
+def memory_cache():
+	MEMORY_CACHE.clear()
+	VERSION_INDEX_CACHE.clear()
+	yield
+	MEMORY_CACHE.clear()
+	VERSION_INDEX_CACHE.clear()
+
+
+def cache(name: str, version: str) -> None:
+	MEMORY_CACHE.set(name, metadata(name, version), expires=time.time() + 60)
+
+
+def statuses(*requirements: str) -> list[tuple[str, str]]:
+	results = get_dependency_status(map(ComparableRequirement, requirements))
+	return [(str(req), status) for req, status, _ in results]
+
+
+def test_cached_resolved_without_pool(monkeypatch: pytest.MonkeyPatch):
+
+	def fail(*args, **kwargs):
+		raise AssertionError("Unexpected fetch")
+
+	monkeypatch.setattr(concurrency, "get_executor", fail)
+	monkeypatch.setattr(dependency_dash.pypi, "get_data", fail)
+
+	cache("flask", "3.0.0")
+	cache("requests", "2.31.0")
+
+	assert statuses("requests>=2.31", "flask<3") == [
+			("flask<3", "outdated"),
+			("requests>=2.31", "up-to-date"),
+			]
+
+
+def test_misses_fetched_concurrently(monkeypatch: pytest.MonkeyPatch):
+	# Each fetch waits for the others to start, so this only finishes if they are made at the same time.
+	barrier = threading.Barrier(3, timeout=5)
+	fetched = []
+
+	def get_data(project_name: str) -> DependencyMetadata:
+		fetched.append(project_name)
+		barrier.wait()
+		if project_name == "missing":
+			raise InvalidRequirement(project_name)
+		return metadata(project_name, "2.0.0")
+
+	monkeypatch.setattr(dependency_dash.pypi, "get_data", get_data)
+	cache("bravo", "1.0.0")
+
+	assert statuses("delta>=2", "alpha<2", "bravo", "missing") == [
+			("alpha<2", "outdated"),
+			("bravo", "up-to-date"),
+			("delta>=2", "up-to-date"),
+			("missing", "invalid"),
+			]
+	assert sorted(fetched) == ["alpha", "delta", "missing"]
+
+
+def test_error_raised_in_order(monkeypatch: pytest.MonkeyPatch):
+
+	def get_data(project_name: str) -> DependencyMetadata:
+		if project_name == "charlie":
+			raise ConnectionError(project_name)
+		return metadata(project_name, "1.0.0")
+
+	monkeypatch.setattr(dependency_dash.pypi, "get_data", get_data)
+	cache("delta", "1.0.0")
+
+	results = get_dependency_status(map(ComparableRequirement, ["delta", "charlie", "bravo", "alpha"]))
+
+	# The rows before the failing requirement are still produced.
+	assert [str(req) for req, _, _ in (next(results), next(results))] == ["alpha", "bravo"]
+
+	with pytest.raises(ConnectionError, match="charlie"):
+		next(results)
+
+
+def test_version_index():
+	data = metadata("flask", "3.0.0")
+	data["all_versions"] = ["2.0.0", "3.0.0", "3.1.0rc1"]
+
+	index = get_version_index(data)
+	assert index.versions == (Version("2.0.0"), Version("3.0.0"), Version("3.1.0rc1"))
+	assert index.latest_final == Version("3.0.0")
+	assert index.latest_prerelease == Version("3.1.0rc1")
+
+
+def test_version_index_parsed_once_per_etag():
+	data = metadata("flask", "3.0.0")
+	index = get_version_index(data)
+
+	assert get_version_index(dict(data)) is index  # type: ignore[arg-type]
+
+	# New metadata may have new versions.
+	data["etag"] = '"flask-3.1.0"'
+	data["all_versions"].append("3.1.0")
+	assert get_version_index(data).versions[-1] == Version("3.1.0")
+
+	# Metadata without an ETag can't be told apart, so isn't cached.
+	data["etag"] = ''
+	assert get_version_index(data) is not get_version_index(data)
+
+
+def test_prerelease_status():
+	data = metadata("flask", "3.0.0")
+	data["all_versions"] = ["3.0.0", "3.1.0rc1"]
+	data["etag"] = '"flask-3.1.0rc1"'
+	MEMORY_CACHE.set("flask", data, expires=time.time() + 60)
+
+	assert dict(statuses("flask>=3.1.0rc1", "flask>=3", "flask<3")) == {
+			"flask<3": "outdated",
+			"flask>=3": "up-to-date",
+			"flask>=3.1.0rc1": "prerelease",
+			}
+
+
+def test_status_memoized():
+	cache("flask", "3.0.0")
+	statuses("flask>=3.0")
+	hits = _get_status.cache_info().hits
+
+	# Other projects with the same specifier and latest version share the result.
+	cache("quart", "3.0.0")
+	assert statuses("quart>=3.0") == [("quart>=3.0", "up-to-date")]
+	assert _get_status.cache_info().hits == hits + 1
@@ -0,0 +1,158 @@
+# stdlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+# 3rd party
+import pytest
+from shippinglabel.requirements import ComparableRequirement
+
+# this package
+import dependency_dash.pypi
+from dependency_dash.pypi import WHEEL_CACHE_PREFIX, DependencyMetadata, get_package_requirements
+from dependency_dash.storage import get_cache
+
+
+class Wheels:
+	# Stands in for PyPI's metadata and the remote wheels listed in it.
+
+	def __init__(self, version: str, requirements: dict[str, list[str]]):
+		# Maps the filenames of wheels to their requirements. The package has no wheels if empty.
+		self.version = version
+		self.requirements = requirements
+		self.opened: list[str] = []
+
+	def get_client(self) -> Any:
+		return self
+
+	def get_metadata(self, package_name: str) -> Any:
+		return self
+
+	@property
+	def name(self) -> str:
+		return "requests"
+
+	@property
+	def info(self) -> dict[str, str]:
+		return {"version": self.version}
+
+	def get_wheel_tag_mapping(self, version: str) -> tuple[dict[str, str], list[str]]:
+		mapping = {filename: f"https://files.example.com/{filename}" for filename in self.requirements}
+		return mapping, []
+
+	@contextmanager
+	def open_remote_wheel(self, name: str, version: str, url: str) -> Iterator[Any]:
+		filename = url.rsplit('/', 1)[-1]
+		self.opened.append(filename)
+
+		yield _Wheel(self.requirements[filename])
+
+
+class _Wheel:
+	# A remote wheel, and its metadata.
+
+	def __init__(self, requirements: list[str]):
+		self.requirements = requirements
+
+	def get_metadata(self) -> "_Wheel":
+		return self
+
+	def get_all(self, name: str, default: Any = None) -> Any:
+		return self.requirements if name == "Requires-Dist" else default
+
+
+@pytest.fixture()
+def wheels(monkeypatch: pytest.MonkeyPatch) -> Wheels:
+	wheels = Wheels("2.31.0", {"requests-2.31.0-py3-none-any.whl": ["idna<4,>=2.5"]})
+	monkeypatch.setattr(dependency_dash.pypi, "get_client", wheels.get_client)
+	monkeypatch.setattr(dependency_dash.pypi, "_open_remote_wheel", wheels.open_remote_wheel)
+	monkeypatch.setattr(dependency_dash.pypi, "get_data", lambda name: {"version": wheels.version})
+	return wheels
+
+
+@pytest.fixture(autouse=True)
+def latest_version(monkeypatch: pytest.MonkeyPatch) -> None:
+
+	def get_data(project_name: str) -> DependencyMetadata:
+		return {"version": "2.31.0"}  # type: ignore[typeddict-item]
+
+	monkeypatch.setattr(dependency_dash.pypi, "get_data", get_data)
+
+	for key in get_cache().keys(WHEEL_CACHE_PREFIX):
+		get_cache().delete(key)
+
+
+def test_cached_requirements_not_locked(monkeypatch: pytest.MonkeyPatch):
+	wheel = "requests-2.31.0-py3-none-any.whl"
+	get_cache().set_json(f"{WHEEL_CACHE_PREFIX}/latest/requests.json", {"version": "2.31.0", "wheel": wheel})
+	get_cache().set_json(f"{WHEEL_CACHE_PREFIX}/{wheel}.json", ["idna<4,>=2.5", "urllib3<3,>=1.21.1"])
+
+	def single_flight(key: str) -> Iterator[None]:
+		raise AssertionError("Unexpected lock")
+
+	monkeypatch.setattr(dependency_dash.pypi, "single_flight", single_flight)
+
+	assert get_package_requirements("requests") == [
+			(wheel, {ComparableRequirement("idna>=2.5,<4"), ComparableRequirement("urllib3>=1.21.1,<3")}, [], True),
+			]
+
+
+def test_cached_without_wheel_not_locked(monkeypatch: pytest.MonkeyPatch):
+	get_cache().set_json(f"{WHEEL_CACHE_PREFIX}/latest/sdist-only.json", {"version": "2.31.0", "wheel": None})
+
+	def single_flight(key: str) -> Iterator[None]:
+		raise AssertionError("Unexpected lock")
+
+	monkeypatch.setattr(dependency_dash.pypi, "single_flight", single_flight)
+
+	with pytest.raises(NotImplementedError):
+		get_package_requirements("sdist-only")
+
+
+def test_wheel_read_once(wheels: Wheels):
+	for _ in range(2):
+		assert get_package_requirements("requests") == [
+				("requests-2.31.0-py3-none-any.whl", {ComparableRequirement("idna>=2.5,<4")}, [], True),
+				]
+
+	assert wheels.opened == ["requests-2.31.0-py3-none-any.whl"]
+
+
+def test_new_release_read(wheels: Wheels):
+	get_package_requirements("requests")
+
+	wheels.version = "2.32.0"
+	wheels.requirements = {"requests-2.32.0-py3-none-any.whl": ["idna<4,>=2.5", "certifi>=2017.4.17"]}
+
+	assert get_package_requirements("requests") == [(
+			"requests-2.32.0-py3-none-any.whl",
+			{ComparableRequirement("idna>=2.5,<4"), ComparableRequirement("certifi>=2017.4.17")},
+			[],
+			True,
+			)]
+	assert wheels.opened == ["requests-2.31.0-py3-none-any.whl", "requests-2.32.0-py3-none-any.whl"]
+
+
+def test_wheel_cached_by_filename(wheels: Wheels):
+	get_package_requirements("requests")
+
+	# The wheel's requirements are kept even if the record of the latest version is lost.
+	get_cache().delete(f"{WHEEL_CACHE_PREFIX}/latest/requests.json")
+
+	assert get_package_requirements("requests")[0][1] == {ComparableRequirement("idna>=2.5,<4")}
+	assert wheels.opened == ["requests-2.31.0-py3-none-any.whl"]
+
+
+def test_no_wheels_remembered(wheels: Wheels, monkeypatch: pytest.MonkeyPatch):
+	wheels.requirements = {}
+
+	with pytest.raises(NotImplementedError):
+		get_package_requirements("requests")
+
+	def get_client() -> Any:
+		raise AssertionError("Unexpected request")
+
+	monkeypatch.setattr(dependency_dash.pypi, "get_client", get_client)
+
+	with pytest.raises(NotImplementedError):
+		get_package_requirements("requests")
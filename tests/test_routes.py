@@ -0,0 +1,78 @@
+# stdlib
+import json
+import logging
+from typing import Optional
+
+# 3rd party
+import pytest
+
+# this package
+from dependency_dash import app, routes
+from dependency_dash.metrics import REQUEST_LATENCY, REQUESTS
+
+
+def request_count(route: str, status: str) -> float:
+	labels = f'{{route="{route}",method="GET",status="{status}"}}'
+	return sum(value for _, sample_labels, value in REQUESTS.samples() if sample_labels == labels)
+
+
+def latency_count(route: str) -> Optional[float]:
+	for name, labels, value in REQUEST_LATENCY.samples():
+		if name.endswith("_count") and labels == f'{{route="{route}"}}':
+			return value
+	return None
+
+
+def test_server_timing():
+	response = app.test_client().get("/about/")
+
+	assert response.status_code == 200
+	spans = [span.split(';')[0] for span in response.headers["Server-Timing"].split(", ")]
+	assert spans == ["render", "total"]
+	assert 'desc="1 calls"' in response.headers["Server-Timing"]
+
+
+@pytest.mark.parametrize(
+		"path, route, status",
+		[
+				pytest.param("/about/", "/about/", "200", id="matched"),
+				pytest.param("/no-such-page/", "<unmatched>", "404", id="unmatched"),
+				],
+		)
+def test_request_recorded_when_closed(path: str, route: str, status: str):
+	before = request_count(route, status)
+	latency_before = latency_count(route) or 0
+
+	response = app.test_client().get(path)
+	assert response.status_code == int(status)
+
+	# The request is recorded once the response has been sent.
+	assert request_count(route, status) == before
+	response.close()
+	assert request_count(route, status) == before + 1
+	assert latency_count(route) == latency_before + 1
+
+
+def test_slow_request_logged(monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture):
+	monkeypatch.setattr(routes, "SLOW_REQUEST_MS", 0)
+
+	with caplog.at_level(logging.WARNING, logger="dependency_dash.routes"):
+		app.test_client().get("/about/?page=1").close()
+
+	record, = caplog.records
+	event = json.loads(record.getMessage())
+	assert event["event"] == "slow_request"
+	assert event["method"] == "GET"
+	assert event["path"] == "/about/?page=1"
+	assert event["route"] == "/about/"
+	assert event["status"] == 200
+	assert event["spans"]["render"]["count"] == 1
+
+
+def test_fast_request_not_logged(monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture):
+	monkeypatch.setattr(routes, "SLOW_REQUEST_MS", 60_000)
+
+	with caplog.at_level(logging.WARNING, logger="dependency_dash.routes"):
+		app.test_client().get("/about/").close()
+
+	assert caplog.records == []
@@ -0,0 +1,44 @@
+# stdlib
+from urllib.parse import urlsplit
+
+# this package
+from dependency_dash.github._env import GITHUB
+from dependency_dash.metrics import UPSTREAM_REQUESTS
+from dependency_dash.sessions import get_adapter, get_session, pool_stats
+from tests.stand_ins import Reply, StandIn
+
+
+def ok(method: str, path: str, headers: dict[str, str], body: bytes) -> Reply:
+	return Reply(200, {"content-type": "text/plain"}, b"OK")
+
+
+def upstream_requests(host: str, status: str) -> float:
+	labels = f'{{host="{host}",status="{status}"}}'
+	return sum(value for _, sample_labels, value in UPSTREAM_REQUESTS.samples() if sample_labels == labels)
+
+
+def test_shared():
+	assert get_session() is get_session()
+	assert get_session().get_adapter("https://pypi.org/") is get_adapter()
+
+	# The GitHub client shares the same connection pools.
+	assert GITHUB.session.get_adapter("https://api.github.com/") is get_adapter()
+
+
+def test_connections_reused():
+	with StandIn(ok) as stand_in:
+		pool = f"http://127.0.0.1:{urlsplit(stand_in.url).port}"
+		before = pool_stats().get(pool, {"connections": 0, "requests": 0})
+		requests_before = upstream_requests("127.0.0.1", "200")
+
+		for _ in range(3):
+			assert get_session().get(stand_in.url).text == "OK"
+
+			# Libraries which close the session they're given don't close the pooled connections.
+			get_session().close()
+
+		stats = pool_stats()[pool]
+		assert stats["connections"] - before["connections"] == 1
+		assert stats["requests"] - before["requests"] == 3
+		assert stats["idle"] >= 1
+		assert upstream_requests("127.0.0.1", "200") == requests_before + 3
@@ -0,0 +1,144 @@
+# stdlib
+import os
+import threading
+import time
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from dependency_dash.storage import CacheBackend, FileBackend, SQLiteBackend, collect_garbage, import_file_cache
+
+
+@pytest.fixture(params=[FileBackend, SQLiteBackend])
+def backend(tmp_path: PathPlus, request: pytest.FixtureRequest) -> CacheBackend:
+	if request.param is FileBackend:
+		return FileBackend(PathPlus(tmp_path))
+	else:
+		return SQLiteBackend(PathPlus(tmp_path) / "cache.db")
+
+
+def test_round_trip(backend: CacheBackend):
+	assert backend.get("pypi/r/requests.json") is None
+	assert backend.get_json("pypi/r/requests.json") is None
+
+	backend.set("github/octocat/hello-world/raw/master/requirements.txt.dat", b"requests\n")
+	backend.set_json("pypi/r/requests.json", {"version": "2.31.0", "all_versions": ["2.30.0", "2.31.0"]})
+
+	assert backend.get("github/octocat/hello-world/raw/master/requirements.txt.dat") == b"requests\n"
+	assert backend.peek("github/octocat/hello-world/raw/master/requirements.txt.dat") == b"requests\n"
+	assert backend.get_json("pypi/r/requests.json") == {"version": "2.31.0", "all_versions": ["2.30.0", "2.31.0"]}
+
+	backend.set_json("pypi/r/requests.json", {"version": "2.32.0"})
+	assert backend.get_json("pypi/r/requests.json") == {"version": "2.32.0"}
+
+	assert sorted(backend.keys()) == [
+			"github/octocat/hello-world/raw/master/requirements.txt.dat",
+			"pypi/r/requests.json",
+			]
+	assert list(backend.keys("pypi/")) == ["pypi/r/requests.json"]
+
+	backend.delete("pypi/r/requests.json")
+	backend.delete("pypi/f/flask.json")
+	assert backend.get("pypi/r/requests.json") is None
+	assert list(backend.keys("pypi/")) == []
+
+
+def test_large_values(backend: CacheBackend):
+	value = b"requests>=2.31\n" * 1000
+	backend.set("github/octocat/hello-world/raw/master/requirements.txt.dat", value)
+
+	assert backend.get("github/octocat/hello-world/raw/master/requirements.txt.dat") == value
+
+	entry = next(backend.entries("github/"))
+	if isinstance(backend, SQLiteBackend):
+		# Large values are compressed.
+		assert entry.size < len(value)
+	else:
+		assert entry.size == len(value)
+
+
+def test_sqlite_shared(tmp_path: PathPlus):
+	# Workers each have their own backend for the same database.
+	SQLiteBackend(PathPlus(tmp_path) / "cache.db").set_json("pypi/r/requests.json", {"version": "2.31.0"})
+	assert SQLiteBackend(PathPlus(tmp_path) / "cache.db").get_json("pypi/r/requests.json") == {"version": "2.31.0"}
+
+
+def test_import_file_cache(tmp_path: PathPlus):
+	files = FileBackend(PathPlus(tmp_path) / "files")
+	files.set_json("pypi/r/requests.json", {"version": "2.31.0"})
+	files.set("github/octocat/hello-world/raw/master/setup.cfg.dat", b"[options]\n")
+	files.set("locks/pypi-requests", b'')
+
+	backend = SQLiteBackend(PathPlus(tmp_path) / "cache.db")
+	assert import_file_cache(PathPlus(tmp_path) / "files", backend) == 2
+
+	assert backend.get_json("pypi/r/requests.json") == {"version": "2.31.0"}
+	assert backend.get("github/octocat/hello-world/raw/master/setup.cfg.dat") == b"[options]\n"
+	assert backend.get("locks/pypi-requests") is None
+
+
+def test_sqlite_reuses_connections(tmp_path: PathPlus):
+	backend = SQLiteBackend(PathPlus(tmp_path) / "cache.db", max_idle=2)
+
+	opened = []
+	open_connection = backend._open
+
+	def _open():
+		opened.append(open_connection())
+		return opened[-1]
+
+	backend._open = _open  # type: ignore[method-assign]
+	backend.set("pypi/requests", b"{}")
+
+	# Each short-lived thread borrows an idle connection rather than opening its own.
+	for _ in range(20):
+		thread = threading.Thread(target=backend.get, args=("pypi/requests", ))
+		thread.start()
+		thread.join()
+
+	assert len(opened) == 1
+
+	# Connections opened when all are in use are closed once there are more than ``max_idle`` unused.
+	barrier = threading.Barrier(4)
+
+	def _use() -> None:
+		with backend._connect() as connection:
+			barrier.wait()
+			connection.execute("SELECT 1")
+
+	threads = [threading.Thread(target=_use) for _ in range(4)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+	assert len(opened) == 4
+	assert len(backend._pool) == 2
+	assert backend.get("pypi/requests") == b"{}"
+
+
+@pytest.mark.parametrize("backend_type", [FileBackend, SQLiteBackend])
+def test_gc_doesnt_use_missing_markers(tmp_path: PathPlus, backend_type: type[CacheBackend]):
+	backend: CacheBackend
+	if backend_type is FileBackend:
+		backend = FileBackend(PathPlus(tmp_path))
+	else:
+		backend = SQLiteBackend(PathPlus(tmp_path) / "cache.db")
+
+	key = "pypi/not-a-project.json.missing"
+	backend.set_json(key, time.time() + 3600)
+
+	if isinstance(backend, FileBackend):
+		# Make the marker look unused for an hour.
+		os.utime(backend.directory / key, (time.time() - 3600, time.time() - 3600))
+
+	before = next(backend.entries(key))
+
+	# The marker hasn't expired yet, so it is kept, but checking it isn't a use of it.
+	for _ in range(2):
+		assert collect_garbage(backend, max_bytes=None, max_idle=None).expired == 0
+
+	backend.flush()
+	assert next(backend.entries(key)) == before
@@ -0,0 +1,87 @@
+# stdlib
+from collections.abc import Iterator
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+from shippinglabel.requirements import ComparableRequirement
+
+# this package
+import dependency_dash.pypi
+from dependency_dash import warm
+from dependency_dash.__main__ import main
+from dependency_dash.pypi import MEMORY_CACHE, changelog
+from dependency_dash.storage import get_cache
+from dependency_dash.warm import read_targets
+from tests.stand_ins import PyPI, StandIn
+
+
+@pytest.fixture()
+def stand_in(monkeypatch: pytest.MonkeyPatch) -> Iterator[StandIn]:
+	with StandIn(PyPI({"requests": ["2.31.0"], "idna": ["3.6"], "sdist-only": ["1.0.0"]})) as stand_in:
+		monkeypatch.setattr(dependency_dash.pypi, "PYPI_ENDPOINT", f"{stand_in.url}/pypi")
+		monkeypatch.setattr(changelog, "REFRESH_MODE", "conditional")
+
+		def get_package_requirements(name: str) -> list[tuple[str, set[ComparableRequirement], list[str], bool]]:
+			if name == "sdist-only":
+				raise NotImplementedError
+			return [(f"{name}-1.0.0-py3-none-any.whl", {ComparableRequirement("idna>=2.5")}, [], True)]
+
+		monkeypatch.setattr(warm, "get_package_requirements", get_package_requirements)
+
+		for key in get_cache().keys("pypi/"):
+			get_cache().delete(key)
+		MEMORY_CACHE.clear()
+
+		yield stand_in
+
+
+def test_read_targets(tmp_path: PathPlus):
+	targets = PathPlus(tmp_path) / "targets.txt"
+	targets.write_lines([
+			"# Repositories",
+			"octocat/hello-world",
+			"https://github.com/repo-helper/dependency-dash",
+			'',
+			"requests",
+			])
+
+	assert read_targets(targets) == (["octocat/hello-world", "repo-helper/dependency-dash"], ["requests"])
+
+
+def test_invalid_target(tmp_path: PathPlus, capsys: pytest.CaptureFixture[str]):
+	targets = PathPlus(tmp_path) / "targets.txt"
+	targets.write_lines(["requests", "octocat/hello-world/extra"])
+
+	with pytest.raises(SystemExit) as exc_info:
+		main(["warm", str(targets)])
+
+	assert exc_info.value.code == 2
+	assert "targets.txt:2: Not a repository or package name: 'octocat/hello-world/extra'" in capsys.readouterr().err
+
+
+@pytest.mark.usefixtures("stand_in")
+def test_warm(tmp_path: PathPlus, capsys: pytest.CaptureFixture[str]):
+	targets = PathPlus(tmp_path) / "targets.txt"
+	targets.write_lines(["requests", "sdist-only"])
+
+	assert main(["warm", str(targets), "--pypi-rate", '0']) == 0
+
+	assert get_cache().get_json("pypi/r/requests.json")["version"] == "2.31.0"
+	assert get_cache().get_json("pypi/i/idna.json")["version"] == "3.6"
+	assert capsys.readouterr().out.splitlines()[-1] == "Cached 2 repositories and packages and 1 dependencies, 0 failed"
+
+
+@pytest.mark.usefixtures("stand_in")
+def test_warm_failure(tmp_path: PathPlus, capsys: pytest.CaptureFixture[str]):
+	targets = PathPlus(tmp_path) / "targets.txt"
+	targets.write_lines(["not-a-project", "requests"])
+
+	assert main(["warm", str(targets), "--pypi-rate", '0', "--quiet"]) == 1
+
+	# The other packages are still cached.
+	assert get_cache().get_json("pypi/r/requests.json")["version"] == "2.31.0"
+
+	out, err = capsys.readouterr()
+	assert out.splitlines() == ["Cached 1 repositories and packages and 1 dependencies, 1 failed"]
+	assert "pypi/not-a-project: No such project 'not-a-project'" in err